@@ -1,11 +1,16 @@
-import cv2
-import numpy as np
-import requests
+import time
+STARTED = time.perf_counter()  # Reported as part of the startup time
+
+import argparse
+import os
+import sys
 import tkinter as tk
 from tkinter import ttk, messagebox
-from PIL import Image, ImageTk
-import time
-import mediapipe as mp
+
+from compositor import VideoCompositor
+from engine import PerceptionEngine
+
+IMPORT_SECONDS = time.perf_counter() - STARTED
 
 # ESP32-CAM configuration
 ESP32_IP = "192.168.4.1"
@@ -13,6 +18,58 @@ ESP32_STREAM_PORT = "81"
 ESP32_CONTROL_PORT = "80"
 STREAM_URL = f"http://{ESP32_IP}:{ESP32_STREAM_PORT}/stream"
 CONTROL_URL = f"http://{ESP32_IP}:{ESP32_CONTROL_PORT}/control"
+# Binary motor control channel (control_udp.cpp), None to always use CONTROL_URL
+CONTROL_UDP_PORT = 8082
+
+# Detector configuration, see MODEL_PRESETS in detectors.py
+# Set DETECTOR_MODEL to "auto" to benchmark the available engines at startup
+# and use the fastest one that meets DETECTOR_MIN_ACCURACY (COCO mAP@0.5)
+DETECTOR_MODEL = "yolov3"
+DETECTOR_BACKEND = "opencv"  # default, opencv, openvino, cuda
+DETECTOR_TARGET = "cpu"  # cpu, opencl, opencl_fp16, cuda, cuda_fp16
+DETECTOR_THREADS = None  # None keeps the OpenCV/ONNX Runtime default
+DETECTOR_MIN_ACCURACY = 30.0
+
+# "inline" runs YOLO and MediaPipe in the GUI process, "process" moves them to
+# worker processes that read frames from shared memory
+INFERENCE_MODE = "inline"
+HANDS_IN_WORKER = True  # MediaPipe Hands in a worker process too when INFERENCE_MODE is "process", a thread otherwise
+HAND_ROI_TRACKING = True  # Run MediaPipe on a crop around the last palm position
+# YOLO on native-resolution crops around the target, with a tiled full-frame
+# pass every second; pays off at SVGA and above. Inline inference only.
+REGION_DETECTION = False
+
+# Read http MJPEG streams with mjpeg_stream.MjpegStream (newest frame only,
+# reduced-scale JPEG decode) instead of cv2.VideoCapture
+NATIVE_MJPEG = True
+
+# Sessions recorded with the Record button go to a timestamped directory here,
+# replay one with: python app.py --headless --source recordings/<session>
+RECORDINGS_DIR = "recordings"
+
+# Metrics export: Prometheus text at http://127.0.0.1:METRICS_PORT/metrics
+# and/or a snapshot appended to METRICS_JSONL every METRICS_INTERVAL seconds
+METRICS_PORT = 9108  # None to disable
+METRICS_JSONL = None  # e.g. "metrics.jsonl"
+METRICS_INTERVAL = 5.0
+
+# Adaptive stream quality: the camera frame size and JPEG quality are stepped
+# within these inclusive ranges to what the link and CPU sustain at
+# STREAM_TARGET_FPS. With it on, the Resolution and Quality controls set the
+# largest frame size and the best quality the governor may use.
+ADAPTIVE_STREAM = True
+STREAM_FRAMESIZE_RANGE = (5, 10)  # QCIF(176x144) to XGA(1024x768), see RESOLUTIONS
+STREAM_QUALITY_RANGE = (10, 40)  # Lower is better
+STREAM_TARGET_FPS = 15.0
+
+# Camera frame sizes offered in the UI, label -> firmware framesize value
+RESOLUTIONS = {
+    "UXGA(1600x1200)": 13, "SXGA(1280x1024)": 12,
+    "HD(1280x720)": 11, "XGA(1024x768)": 10,
+    "SVGA(800x600)": 9, "VGA(640x480)": 8,
+    "CIF(400x296)": 7, "QVGA(320x240)": 6,
+    "QCIF(176x144)": 5
+}
 
 # Add these configurations at the top
 CAMERA_SOURCES = {
@@ -28,6 +85,32 @@ CAMERA_SOURCES = {
     }
 }
 
+def create_engine_from_config(render=True, send_commands=True,
+                              metrics_port=METRICS_PORT, metrics_jsonl=METRICS_JSONL):
+    """Build the perception engine from the configuration above"""
+    engine = PerceptionEngine(
+        CONTROL_URL,
+        detector_model=DETECTOR_MODEL,
+        detector_backend=DETECTOR_BACKEND,
+        detector_target=DETECTOR_TARGET,
+        detector_threads=DETECTOR_THREADS,
+        detector_min_accuracy=DETECTOR_MIN_ACCURACY,
+        inference_mode=INFERENCE_MODE,
+        hands_in_worker=HANDS_IN_WORKER,
+        hand_roi=HAND_ROI_TRACKING,
+        native_mjpeg=NATIVE_MJPEG,
+        control_udp_port=CONTROL_UDP_PORT,
+        adaptive_stream=ADAPTIVE_STREAM,
+        stream_framesizes=STREAM_FRAMESIZE_RANGE,
+        stream_qualities=STREAM_QUALITY_RANGE,
+        stream_target_fps=STREAM_TARGET_FPS,
+        region_detection=REGION_DETECTION,
+        render=render,
+        send_commands=send_commands
+    )
+    engine.start_metrics_export(metrics_port, metrics_jsonl, METRICS_INTERVAL)
+    return engine
+
 class ObjectDetectionGUI:
     def __init__(self, root):
         self.root = root
@@ -37,68 +120,46 @@ class ObjectDetectionGUI:
         self.current_source = "Webcam"
         self.stream_url = ""  # For custom stream URL
         
-        # Initialize video capture with error checking
-        self.cap = None
-        if not self.connect_to_camera():
-            print("Failed to connect to camera on startup")
+        # Perception and robot control, shared with the headless runner
+        try:
+            self.engine = create_engine_from_config(render=True)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to start the perception engine: {str(e)}")
+            self.root.quit()
+            return
+        self.classes = self.engine.classes
+        
+        # YOLO loads in the background while the window comes up, the camera
+        # is connected from process_video so the window never waits for it
+        self.engine.preload()
+        self.last_connect_attempt = 0.0
+        self.first_frame_shown = False
+        self.reported_load_errors = set()
         
         # Initialize variables
-        self.is_detecting = True
         self.show_boxes = True
-        self.auto_control = False  # Flag for autonomous control
         self.fps = 0
         self.last_frame_time = time.time()
+        self.frames_since_fps = 0  # Frames displayed since the last FPS update
         self.detected_objects_count = {}
-        self.target_object = "person"  # Object to track
-        
-        # Load YOLO
-        try:
-            self.net = cv2.dnn.readNet("yolov3.weights", "yolov3.cfg")
-            with open("coco.names", "r") as f:
-                self.classes = [line.strip() for line in f.readlines()]
-            self.layer_names = self.net.getLayerNames()
-            self.output_layers = [self.layer_names[i - 1] for i in self.net.getUnconnectedOutLayers()]
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load YOLO model: {str(e)}")
-            self.root.quit()
-            return
-        
-        # Optimize performance settings
-        self.process_every_n_frames = 2  # Process every 2nd frame instead of 3
-        self.frame_count = 0
-        self.detection_size = (320, 320)  # Keep small detection size
-        self.confidence_threshold = 0.5
-        self.display_size = (640, 480)  # Smaller display size for better performance
-        
-        # Initialize MediaPipe Hands with optimized settings
-        self.mp_hands = mp.solutions.hands
-        self.hands = self.mp_hands.Hands(
-            static_image_mode=False,
-            max_num_hands=1,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.3,  # Lower tracking confidence for better performance
-            model_complexity=0  # Use simpler model (0, 1, or 2)
-        )
-        self.mp_draw = mp.solutions.drawing_utils
+        self.target_object = self.engine.target_label  # Object to track
+        self.frame_poll_interval = 5  # ms between checks for a new frame
         
-        # Add hand following mode
-        self.hand_following = False
+        # Held arrow keys, used to filter out OS key auto-repeat
+        self.held_keys = set()
+        self.key_release_jobs = {}
+        self.key_release_delay = 50  # ms to wait for an auto-repeat press
         
         # Add status buffer for stable display
         self.current_status = ""
-        self.status_buffer = ""
         self.status_update_time = time.time()
         self.status_update_interval = 1.0  # Update status every 1 second
         
         # Add detection buffer
-        self.detection_buffer = []
+        self.current_detection = ""
         self.detection_update_time = time.time()
         self.detection_update_interval = 2.0  # Update detections every 2 seconds
         
-        # Add overlay settings
-        self.overlay_alpha = 0.3
-        self.overlay_color = (0, 0, 0)  # Black background for text
-        
         # Create GUI elements
         self.create_gui()
         
@@ -107,6 +168,16 @@ class ObjectDetectionGUI:
         
         # Add keyboard bindings
         self.setup_keyboard_bindings()
+        
+        self.root.after_idle(self.report_startup)
+        self.root.after(500, self.sync_controls)
+    
+    def report_startup(self):
+        """Print how long the window took to appear, and the imports within that"""
+        window = time.perf_counter() - STARTED
+        print(f"Startup: window after {window * 1000:.0f} ms (imports {IMPORT_SECONDS * 1000:.0f} ms)")
+        self.engine.metrics.set_gauge("startup_imports_seconds", IMPORT_SECONDS)
+        self.engine.metrics.set_gauge("startup_window_seconds", window)
     
     def create_gui(self):
         # Create style configuration at the beginning of create_gui
@@ -162,6 +233,17 @@ class ObjectDetectionGUI:
             fill='white',
             font=('Arial', 12)
         )
+
+        self.governor_label = self.video_canvas.create_text(
+            10, 120,  # Position below status
+            anchor='w',
+            text="",
+            fill='white',
+            font=('Arial', 12)
+        )
+
+        # Single persistent image item under the labels, reused every frame
+        self.compositor = VideoCompositor(self.video_canvas)
         
         # Right panel for controls with fixed width
         right_panel = ttk.Frame(main_container, width=300)
@@ -196,6 +278,13 @@ class ObjectDetectionGUI:
         )
         self.auto_button.pack(fill=tk.X, padx=5, pady=5)
         
+        self.record_button = ttk.Button(
+            controls_frame,
+            text="Start Recording",
+            command=self.toggle_recording
+        )
+        self.record_button.pack(fill=tk.X, padx=5, pady=5)
+        
         # Object selection
         ttk.Label(controls_frame, text="Target Object:").pack(pady=5)
         self.target_var = tk.StringVar(value=self.target_object)
@@ -205,6 +294,7 @@ class ObjectDetectionGUI:
             values=self.classes
         )
         self.target_combo.pack(fill=tk.X, padx=5, pady=5)
+        self.target_var.trace_add('write', self.update_target)
         
         # Status frame
         status_frame = ttk.LabelFrame(scrollable_frame, text="Status")
@@ -216,6 +306,12 @@ class ObjectDetectionGUI:
         self.fps_var = tk.StringVar(value="FPS: 0")
         ttk.Label(status_frame, textvariable=self.fps_var).pack(pady=5)
         
+        self.capture_var = tk.StringVar(value="Frames: 0 recv / 0 dropped / 0 used")
+        ttk.Label(status_frame, textvariable=self.capture_var).pack(pady=5)
+        
+        self.command_var = tk.StringVar(value="Commands: 0 sent")
+        ttk.Label(status_frame, textvariable=self.command_var).pack(pady=5)
+        
         # Manual Control Panel
         manual_frame = ttk.LabelFrame(scrollable_frame, text="Manual Control")
         manual_frame.pack(fill=tk.X, padx=5, pady=5)
@@ -309,16 +405,11 @@ class ObjectDetectionGUI:
 
         # Resolution Dropdown
         ttk.Label(camera_frame, text="Resolution:").pack(pady=2)
-        resolutions = [
-            "UXGA(1600x1200)", "SXGA(1280x1024)", "HD(1280x720)", 
-            "XGA(1024x768)", "SVGA(800x600)", "VGA(640x480)", 
-            "CIF(400x296)", "QVGA(320x240)", "QCIF(176x144)"
-        ]
         self.resolution_var = tk.StringVar(value="VGA(640x480)")
         resolution_combo = ttk.Combobox(
             camera_frame, 
             textvariable=self.resolution_var,
-            values=resolutions,
+            values=list(RESOLUTIONS),
             state="readonly"
         )
         resolution_combo.pack(fill=tk.X, padx=5, pady=2)
@@ -448,221 +539,146 @@ class ObjectDetectionGUI:
         )
         self.close_btn.pack(fill=tk.X)
     
+    def update_target(self, *args):
+        self.engine.target_label = self.target_var.get()
+    
     def toggle_auto_control(self):
-        self.auto_control = not self.auto_control
+        self.engine.auto_control = not self.engine.auto_control
         self.auto_button.configure(
-            text="Stop Auto Control" if self.auto_control else "Start Auto Control"
+            text="Stop Auto Control" if self.engine.auto_control else "Start Auto Control"
         )
     
-    def send_command(self, command):
-        """Send command with better error handling"""
-        try:
-            response = requests.get(
-                f"{self.CONTROL_URL}?command={command}", 
-                timeout=2
-            )
-            if response.status_code == 200:
-                print(f"Command sent: {command}")
-                return True
-            else:
-                print(f"Command failed with status: {response.status_code}")
-                return False
-        except requests.exceptions.Timeout:
-            print("Command timed out")
-            return False
-        except requests.exceptions.ConnectionError:
-            print("Connection failed")
-            return False
-        except Exception as e:
-            print(f"Error sending command: {e}")
-            return False
-    
-    def control_robot(self, target_x, frame_width):
-        # Simple control logic based on target position
-        center = frame_width // 2
-        margin = frame_width // 6  # Tolerance margin
-        
-        if target_x < (center - margin):
-            self.send_command('2')  # Turn left
-        elif target_x > (center + margin):
-            self.send_command('4')  # Turn right
+    def toggle_recording(self):
+        if self.engine.recorder is None:
+            session = time.strftime("%Y%m%d-%H%M%S")
+            self.engine.start_recording(os.path.join(RECORDINGS_DIR, session))
         else:
-            self.send_command('1')  # Move forward
+            self.engine.stop_recording()
+        self.record_button.configure(
+            text="Stop Recording" if self.engine.recorder is not None else "Start Recording"
+        )
     
-    def connect_to_camera(self):
-        """Attempt to connect to the selected camera source"""
-        try:
-            if self.cap is not None:
-                self.cap.release()
-                
-            source = CAMERA_SOURCES[self.current_source]
-            
-            if source["type"] == "webcam":
-                self.cap = cv2.VideoCapture(source["source"])
-            elif source["type"] == "stream":
-                if not self.stream_url:
-                    print("No stream URL provided")
-                    return False
-                self.cap = cv2.VideoCapture(self.stream_url)
-            
-            if not self.cap.isOpened():
-                print(f"Error: Could not open {self.current_source}")
-                return False
-                
-            # Try to get a frame
-            ret, frame = self.cap.read()
-            if ret and frame is not None:
-                print(f"Successfully connected to {self.current_source}")
-                return True
-                
-            print("Error: Could not read frame")
-            self.cap.release()
-            return False
-            
-        except Exception as e:
-            print(f"Error in connect_to_camera: {str(e)}")
-            if self.cap is not None:
-                self.cap.release()
+    def send_command(self, command):
+        """Queue command on the dispatcher, repeats of the current command are dropped"""
+        return self.engine.send_command(command)
+    
+    def connect_to_camera(self, background=False):
+        """Attempt to connect to the selected camera source.
+
+        With background=True the attempt runs on a thread and only whether
+        it was started is returned.
+        """
+        source = CAMERA_SOURCES[self.current_source]
+        connect = self.engine.connect_in_background if background else self.engine.connect
+        
+        if source["type"] == "webcam":
+            return connect(source["source"])
+        if not self.stream_url:
+            print("No stream URL provided")
             return False
+        return connect(self.stream_url)
+
+    def reconnect_in_background(self, on_done=None):
+        """Connect to the selected source off the Tk thread, then call on_done(connected) on it"""
+        if self.engine.connecting:
+            # An attempt for the previous source is still running, go after it
+            self.root.after(100, self.reconnect_in_background, on_done)
+            return
+        self.last_connect_attempt = time.time()
+        if not self.connect_to_camera(background=True):
+            if on_done is not None:
+                on_done(False)
+            return
+        self.wait_for_connect(on_done)
+
+    def wait_for_connect(self, on_done):
+        if self.engine.connecting:
+            self.root.after(100, self.wait_for_connect, on_done)
+        elif on_done is not None:
+            on_done(self.engine.is_connected())
     
     def process_video(self):
         try:
-            if not self.cap or not self.cap.isOpened():
-                if not self.connect_to_camera():
-                    self.root.after(2000, self.process_video)
-                    return
-
-            ret, frame = self.cap.read()
-            if not ret or frame is None:
-                if not self.connect_to_camera():
-                    self.root.after(2000, self.process_video)
-                    return
-
-            # Resize frame immediately for faster processing
-            frame = cv2.resize(frame, self.display_size)
-
-            # Process based on active mode
-            if self.hand_following and (self.frame_count % 2 == 0):
-                frame, status = self.process_hand_detection(frame)
-                # Buffer the status
-                if status:
-                    self.status_buffer = status
-            
-            elif self.is_detecting and (self.frame_count % self.process_every_n_frames == 0):
-                # YOLO detection code remains the same but works with smaller frame
-                detection_frame = cv2.resize(frame, self.detection_size)
-                
-                # YOLO detection
-                blob = cv2.dnn.blobFromImage(
-                    detection_frame, 
-                    1/255.0, 
-                    self.detection_size, 
-                    swapRB=True, 
-                    crop=False
-                )
-                self.net.setInput(blob)
-                outs = self.net.forward(self.output_layers)
-
-                # Process detections
-                boxes = []
-                confidences = []
-                class_ids = []
-                height, width = frame.shape[:2]
-                
-                # Scale factors for original frame size
-                x_scale = width / self.detection_size[0]
-                y_scale = height / self.detection_size[1]
-
-                for out in outs:
-                    for detection in out:
-                        scores = detection[5:]
-                        class_id = np.argmax(scores)
-                        confidence = scores[class_id]
-                        
-                        if confidence > self.confidence_threshold:
-                            # Scale back to original frame size
-                            center_x = int(detection[0] * self.detection_size[0] * x_scale)
-                            center_y = int(detection[1] * self.detection_size[1] * y_scale)
-                            w = int(detection[2] * self.detection_size[0] * x_scale)
-                            h = int(detection[3] * self.detection_size[1] * y_scale)
-                            x = int(center_x - w/2)
-                            y = int(center_y - h/2)
-                            
-                            boxes.append([x, y, w, h])
-                            confidences.append(float(confidence))
-                            class_ids.append(class_id)
-
-                # Non-max suppression
-                indexes = cv2.dnn.NMSBoxes(boxes, confidences, 0.5, 0.4)
-                
-                # Create text overlay for detections
-                overlay = frame.copy()
-                overlay_height = 120
-                cv2.rectangle(overlay, (0, 0), (frame.shape[1], overlay_height), 
-                             self.overlay_color, -1)
-                cv2.addWeighted(overlay, self.overlay_alpha, frame, 1 - self.overlay_alpha, 
-                               0, frame)
-
-                # Draw boxes and labels with better visibility
-                font = cv2.FONT_HERSHEY_SIMPLEX
-                for i in range(len(boxes)):
-                    if i in indexes:
-                        x, y, w, h = boxes[i]
-                        label = str(self.classes[class_ids[i]])
-                        confidence = confidences[i]
-                        
-                        # Different colors for different objects
-                        color = (0, 255, 0) if label == self.target_var.get() else (255, 0, 0)
-                        
-                        # Draw box
-                        cv2.rectangle(frame, (x, y), (x + w, y + h), color, 2)
-                        
-                        # Draw text with better visibility
-                        text = f'{label} {confidence:.2f}'
-                        cv2.putText(frame, text, (x, y - 5), font, 0.5, (255, 255, 255), 2)
-
-                # After processing detections, update detection buffer
-                current_detections = []
-                for i in range(len(boxes)):
-                    if i in indexes:
-                        label = str(self.classes[class_ids[i]])
-                        confidence = confidences[i]
-                        current_detections.append(f"{label}: {confidence:.2f}")
-                
-                if current_detections:
-                    self.detection_buffer = current_detections[:3]  # Keep top 3 detections
-
-            # Update frame counter
-            self.frame_count += 1
-
-            # Convert to RGB and display (no need to resize again)
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            img = Image.fromarray(frame_rgb)
-            imgtk = ImageTk.PhotoImage(image=img)
-            self.video_canvas.create_image(0, 0, anchor=tk.NW, image=imgtk)
-            self.video_canvas.imgtk = imgtk
+            if not self.engine.is_connected():
+                # Connect on a thread, the window stays responsive meanwhile
+                if (not self.engine.connecting
+                        and time.time() - self.last_connect_attempt >= 2.0):
+                    self.last_connect_attempt = time.time()
+                    self.connect_to_camera(background=True)
+                self.root.after(100, self.process_video)
+                return
+
+            # While the window is minimized or hidden the engine skips all
+            # drawing, detection and robot control keep running
+            self.engine.render = self.compositor.visible()
+
+            # Detection, hand following and control all happen in the engine
+            frame = self.engine.step()
+            if frame is None:
+                self.root.after(self.frame_poll_interval, self.process_video)
+                return
+
+            # Paste into the persistent canvas image (no need to resize again)
+            with self.engine.metrics.timer("render"):
+                shown = self.compositor.show(frame)
+            if shown:
+                self.frames_since_fps += 1
+                if not self.first_frame_shown:
+                    self.first_frame_shown = True
+                    first_frame = time.perf_counter() - STARTED
+                    print(f"Startup: first frame after {first_frame * 1000:.0f} ms")
+                    self.engine.metrics.set_gauge("startup_first_frame_seconds", first_frame)
 
             # Update FPS less frequently
             current_time = time.time()
             if current_time - self.last_frame_time > 0.5:  # Update every 0.5 seconds
-                fps = 1.0 / (current_time - self.last_frame_time)
+                # Frames shown over the window, not the window's update rate
+                fps = self.frames_since_fps / (current_time - self.last_frame_time)
+                self.frames_since_fps = 0
                 self.video_canvas.itemconfig(
                     self.fps_label,
                     text=f"FPS: {fps:.1f}"
                 )
                 self.last_frame_time = current_time
+                
+                stats = self.engine.grabber.stats()
+                self.capture_var.set(
+                    f"Frames: {stats['received']} recv / {stats['dropped']} dropped / "
+                    f"{stats['consumed']} used"
+                )
+                
+                for name, loader in self.engine.loaders.items():
+                    if loader.error is not None and name not in self.reported_load_errors:
+                        self.reported_load_errors.add(name)
+                        messagebox.showerror("Error", f"Failed to load {name} model: {loader.error}")
+                
+                if self.engine.use_governor and self.engine.is_detecting:
+                    self.video_canvas.itemconfig(
+                        self.governor_label,
+                        text=f"Governor: {self.engine.governor.decision} | "
+                             f"Gate: {self.engine.motion_gate.decision}"
+                    )
+                
+                cmd_stats = self.engine.dispatcher.stats()
+                latency = cmd_stats['last_ms']
+                end_to_end = self.engine.latency.stats()['end_to_end_ms']
+                self.command_var.set(
+                    f"Commands: {cmd_stats['sent']} sent / {cmd_stats['duplicates']} skipped"
+                    + (f" / {latency:.0f} ms" if latency is not None else "")
+                    + (f" / e2e {end_to_end:.0f} ms" if end_to_end is not None else "")
+                )
 
             # Update status text less frequently and with smoother transitions
             if current_time - self.status_update_time > self.status_update_interval:
-                if self.hand_following:
-                    new_status = f"Mode: Hand Following - {self.status_buffer}"
+                if self.engine.hand_following:
+                    new_status = f"Mode: Hand Following - {self.engine.status_buffer}"
                     if new_status != self.current_status:
                         self.current_status = new_status
                         self.video_canvas.itemconfig(
                             self.status_label,
                             text=self.current_status
                         )
-                elif self.auto_control:
+                elif self.engine.auto_control:
                     self.video_canvas.itemconfig(
                         self.status_label,
                         text="Mode: Auto Control"
@@ -676,8 +692,11 @@ class ObjectDetectionGUI:
 
             # Update detection text with smoother transitions
             if current_time - self.detection_update_time > self.detection_update_interval:
-                if self.is_detecting and self.detection_buffer:
-                    new_detection = "Detected: " + ", ".join(self.detection_buffer)
+                if self.engine.is_detecting and self.engine.loaders["detector"].state == "loading":
+                    self.current_detection = "Detected: loading model..."
+                    self.video_canvas.itemconfig(self.detection_label, text=self.current_detection)
+                elif self.engine.is_detecting and self.engine.detection_buffer:
+                    new_detection = "Detected: " + ", ".join(self.engine.detection_buffer)
                     if new_detection != self.current_detection:
                         self.current_detection = new_detection
                         self.video_canvas.itemconfig(
@@ -686,8 +705,8 @@ class ObjectDetectionGUI:
                         )
                 self.detection_update_time = current_time
 
-            # Schedule next update with longer interval
-            self.root.after(30, self.process_video)  # 30ms instead of 20ms
+            # Schedule next update, the grabber always has the newest frame ready
+            self.root.after(self.frame_poll_interval, self.process_video)
 
         except Exception as e:
             print(f"Error in process_video: {e}")
@@ -698,40 +717,22 @@ class ObjectDetectionGUI:
     
     # Add methods for controls
     def update_speed(self, value):
-        try:
-            requests.get(
-                f"{CONTROL_URL}?var=speed&val={int(float(value))}",
-                timeout=1
-            )
-            print(f"Speed updated to {value}")
-        except Exception as e:
-            print(f"Error updating speed: {e}")
+        # Called on every tick of the drag, only the settled value is applied.
+        # It goes out on the dispatcher thread, followed by the current command
+        # since the new speed only applies from the next one
+        self.engine.settings.set("speed", int(float(value)))
 
     def update_flash(self, value):
-        """Update flash with better error handling"""
-        try:
-            # Convert value to int and ensure it's between 0-255
-            flash_value = max(0, min(255, int(float(value))))
-            response = requests.get(
-                f"{self.CONTROL_URL}?var=flash&val={flash_value}",
-                timeout=2
-            )
-            if response.status_code == 200:
-                print(f"Flash updated to {flash_value}")
-                return True
-            else:
-                print(f"Flash update failed: {response.status_code}")
-                return False
-        except Exception as e:
-            print(f"Error updating flash: {e}")
-            return False
+        """Queue the flash brightness, sent once the slider settles"""
+        flash_value = max(0, min(255, int(float(value))))
+        self.engine.settings.set("flash", flash_value)
 
     def toggle_flash(self):
         """Toggle flash between off and full brightness"""
         current = self.flash_var.get()
         new_value = 0 if current > 0 else 255
         self.flash_var.set(new_value)
-        self.update_flash(new_value)
+        self.engine.settings.set("flash", new_value, settle=False)
 
     # Add keyboard bindings
     def setup_keyboard_bindings(self):
@@ -739,7 +740,16 @@ class ObjectDetectionGUI:
         self.root.bind('<KeyRelease>', self.handle_keyrelease)
 
     def handle_keypress(self, event):
-        if not self.auto_control:  # Only handle manual controls when auto is off
+        if event.keysym in ['Up', 'Left', 'Right', 'Down', 'space']:
+            # OS auto-repeat sends release/press pairs, cancel the pending release
+            job = self.key_release_jobs.pop(event.keysym, None)
+            if job is not None:
+                self.root.after_cancel(job)
+            if event.keysym in self.held_keys:
+                return
+            self.held_keys.add(event.keysym)
+        
+        if not self.engine.auto_control:  # Only handle manual controls when auto is off
             if event.keysym == 'Up':
                 self.send_command('1')
                 self.btn_forward.state(['pressed'])
@@ -757,53 +767,68 @@ class ObjectDetectionGUI:
                 self.btn_backward.state(['pressed'])
 
     def handle_keyrelease(self, event):
-        if not self.auto_control:
-            if event.keysym in ['Up', 'Left', 'Right', 'Down', 'space']:
-                self.send_command('3')  # Stop on key release
-                for btn in [self.btn_forward, self.btn_left, self.btn_right, 
-                          self.btn_backward, self.btn_stop]:
-                    btn.state(['!pressed'])
+        if event.keysym in ['Up', 'Left', 'Right', 'Down', 'space']:
+            # Wait briefly, an auto-repeat press will cancel this release
+            job = self.key_release_jobs.pop(event.keysym, None)
+            if job is not None:
+                self.root.after_cancel(job)
+            self.key_release_jobs[event.keysym] = self.root.after(
+                self.key_release_delay,
+                lambda key=event.keysym: self.release_key(key)
+            )
+
+    def release_key(self, key):
+        """Handle a real (not auto-repeat) key release"""
+        self.key_release_jobs.pop(key, None)
+        self.held_keys.discard(key)
+        if not self.engine.auto_control:
+            self.send_command('3')  # Stop on key release
+            for btn in [self.btn_forward, self.btn_left, self.btn_right, 
+                      self.btn_backward, self.btn_stop]:
+                btn.state(['!pressed'])
 
     def update_resolution(self, event=None):
-        resolution_map = {
-            "UXGA(1600x1200)": 13, "SXGA(1280x1024)": 12,
-            "HD(1280x720)": 11, "XGA(1024x768)": 10,
-            "SVGA(800x600)": 9, "VGA(640x480)": 8,
-            "CIF(400x296)": 7, "QVGA(320x240)": 6,
-            "QCIF(176x144)": 5
-        }
-        value = resolution_map.get(self.resolution_var.get(), 8)
-        try:
-            requests.get(
-                f"{CONTROL_URL}?var=framesize&val={value}",
-                timeout=1
-            )
-            print(f"Resolution updated to {self.resolution_var.get()}")
-        except Exception as e:
-            print(f"Error updating resolution: {e}")
+        value = RESOLUTIONS.get(self.resolution_var.get(), 8)
+        if self.engine.use_stream_governor:
+            self.engine.set_stream_bounds(max_framesize=value)
+        else:
+            self.engine.settings.set("framesize", value, settle=False)
 
     def update_quality(self, value):
-        try:
-            requests.get(
-                f"{CONTROL_URL}?var=quality&val={int(float(value))}",
-                timeout=1
-            )
-            print(f"Quality updated to {value}")
-        except Exception as e:
-            print(f"Error updating quality: {e}")
+        # Sent once the slider settles, the video keeps running meanwhile
+        if self.engine.use_stream_governor:
+            self.engine.set_stream_bounds(best_quality=int(float(value)))
+        else:
+            self.engine.settings.set("quality", int(float(value)))
+
+    def sync_controls(self, attempts=20):
+        """Show the rover's current settings on the controls once they have been read"""
+        settings = self.engine.settings
+        if not settings.loaded:
+            if attempts > 1:
+                self.root.after(500, lambda: self.sync_controls(attempts - 1))
+            return
+        # Setting the variables doesn't call the slider commands
+        names = {value: name for name, value in RESOLUTIONS.items()}
+        if settings.get("framesize") in names:
+            self.resolution_var.set(names[settings.get("framesize")])
+        for name, var in [("quality", self.quality_var), ("flash", self.flash_var),
+                          ("speed", self.speed_var)]:
+            if settings.get(name) is not None:
+                var.set(settings.get(name))
 
     def toggle_follow(self):
-        self.auto_control = not self.auto_control
+        self.engine.auto_control = not self.engine.auto_control
         self.follow_btn.config(
-            text="Stop Following" if self.auto_control else "Start Following"
+            text="Stop Following" if self.engine.auto_control else "Start Following"
         )
         
         # Disable manual controls when auto-following
         for btn in [self.btn_forward, self.btn_left, self.btn_right, 
                    self.btn_backward, self.btn_stop]:
-            btn.state(['disabled'] if self.auto_control else ['!disabled'])
+            btn.state(['disabled'] if self.engine.auto_control else ['!disabled'])
         
-        print(f"Auto follow {'enabled' if self.auto_control else 'disabled'}")
+        print(f"Auto follow {'enabled' if self.engine.auto_control else 'disabled'}")
 
     def switch_camera(self):
         """Switch camera source"""
@@ -814,122 +839,51 @@ class ObjectDetectionGUI:
                 if source == "Custom Stream" and not self.stream_url:
                     messagebox.showinfo("Info", "Please enter a stream URL and click 'Connect to Stream'")
                     return
-                
-                if self.connect_to_camera():
-                    print("Successfully switched camera")
-                else:
-                    print("Failed to connect to new camera")
-                    messagebox.showerror("Error", f"Could not connect to {source}")
+
+                def switched(connected):
+                    if connected:
+                        print("Successfully switched camera")
+                    else:
+                        print("Failed to connect to new camera")
+                        messagebox.showerror("Error", f"Could not connect to {source}")
+
+                self.reconnect_in_background(switched)
         except Exception as e:
             print(f"Error switching camera: {str(e)}")
 
     def reconnect_camera(self):
         """Manually reconnect to current camera source"""
-        if hasattr(self, 'cap'):
-            self.cap.release()
-        self.connect_to_camera()
+        self.engine.stop_capture()
+        self.reconnect_in_background()
 
     def cleanup(self):
         """Cleanup resources"""
-        if hasattr(self, 'cap') and self.cap is not None:
-            self.cap.release()
+        if hasattr(self, 'engine'):
+            self.engine.stop_capture()
 
     def toggle_hand_following(self):
         """Toggle hand following mode"""
-        self.hand_following = not self.hand_following
+        # Object detection keeps running alongside as a safety monitor
+        self.engine.set_hand_following(not self.engine.hand_following)
         
         # Update button text
         self.hand_btn.config(
-            text="Stop Hand Following" if self.hand_following else "Start Hand Following"
+            text="Stop Hand Following" if self.engine.hand_following else "Start Hand Following"
         )
         
-        # Disable object detection when hand following is active
-        if self.hand_following:
-            self.is_detecting = False
-            self.auto_control = False
+        if self.engine.hand_following:
             # Update status
             self.video_canvas.itemconfig(
                 self.status_label,
                 text="Mode: Hand Following"
             )
         else:
-            # Stop the robot when disabling hand following
-            self.send_command('3')
             self.video_canvas.itemconfig(
                 self.status_label,
                 text="Mode: Manual Control"
             )
         
-        print(f"Hand following {'enabled' if self.hand_following else 'disabled'}")
-
-    def process_hand_detection(self, frame):
-        try:
-            # Convert BGR to RGB without copying
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            
-            # Process the frame with MediaPipe
-            rgb_frame.flags.writeable = False  # Performance optimization
-            results = self.hands.process(rgb_frame)
-            rgb_frame.flags.writeable = True
-            
-            height, width = frame.shape[:2]
-            center_x = width // 2
-            margin = width // 6
-
-            status = ""
-            if results.multi_hand_landmarks:
-                hand_landmarks = results.multi_hand_landmarks[0]
-                
-                # Draw minimal hand landmarks
-                self.mp_draw.draw_landmarks(
-                    frame,
-                    hand_landmarks,
-                    self.mp_hands.HAND_CONNECTIONS,
-                    self.mp_draw.DrawingSpec(color=(0, 255, 0), thickness=1, circle_radius=1),
-                    self.mp_draw.DrawingSpec(color=(0, 0, 255), thickness=1)
-                )
-                
-                palm_x = int(hand_landmarks.landmark[9].x * width)
-                palm_y = int(hand_landmarks.landmark[9].y * height)
-                
-                cv2.circle(frame, (palm_x, palm_y), 5, (0, 255, 255), -1)
-                
-                if palm_y > height * 0.6:
-                    self.send_command('5')
-                    status = "BACKWARD"
-                else:
-                    if palm_x < (center_x - margin):
-                        self.send_command('2')
-                        status = "LEFT"
-                    elif palm_x > (center_x + margin):
-                        self.send_command('4')
-                        status = "RIGHT"
-                    else:
-                        self.send_command('1')
-                        status = "FORWARD"
-                
-                # Create text overlay
-                overlay = frame.copy()
-                overlay_height = 120  # Height of overlay area
-                cv2.rectangle(overlay, (0, 0), (frame.shape[1], overlay_height), 
-                             self.overlay_color, -1)
-                cv2.addWeighted(overlay, self.overlay_alpha, frame, 1 - self.overlay_alpha, 
-                               0, frame)
-
-                # Draw status on frame with better visibility
-                cv2.putText(frame, status, (10, 30), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-            else:
-                self.send_command('3')
-                status = "NO HAND"
-                cv2.putText(frame, status, (10, 30), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-            
-            return frame, status
-            
-        except Exception as e:
-            print(f"Error in hand detection: {e}")
-            return frame, "ERROR"
+        print(f"Hand following {'enabled' if self.engine.hand_following else 'disabled'}")
 
     def connect_to_stream(self):
         """Connect to custom stream URL"""
@@ -938,28 +892,15 @@ class ObjectDetectionGUI:
             self.stream_url = url
             self.current_source = "Custom Stream"
             self.source_var.set("Custom Stream")
-            self.connect_to_camera()
+            self.reconnect_in_background()
         else:
             messagebox.showerror("Error", "Please enter a stream URL")
 
     def close_application(self):
         """Properly clean up and close the application"""
         try:
-            # Stop any ongoing operations
-            self.is_detecting = False
-            self.auto_control = False
-            self.hand_following = False
-            
-            # Send stop command to robot
-            self.send_command('3')
-            
-            # Release camera
-            if self.cap is not None:
-                self.cap.release()
-            
-            # Release MediaPipe resources
-            if hasattr(self, 'hands'):
-                self.hands.close()
+            # Stop the robot, camera, models and inference workers
+            self.engine.close()
             
             # Destroy the root window
             self.root.quit()
@@ -979,5 +920,90 @@ def main():
     except Exception as e:
         print(f"Error in main: {str(e)}")
 
+def headless_main(argv=None):
+    """Run detection or hand following without Tkinter and without any rendering"""
+    parser = argparse.ArgumentParser(
+        prog="app.py --headless",
+        description="Run the perception and control pipeline without the GUI"
+    )
+    parser.add_argument("--source", default="0",
+                        help="webcam index, stream URL or recorded session directory (default: 0)")
+    parser.add_argument("--record", metavar="DIR",
+                        help="record raw stream JPEGs, commands and detections to DIR")
+    parser.add_argument("--fast", action="store_true",
+                        help="replay a recorded session as fast as possible instead of in real time")
+    parser.add_argument("--mode", choices=["detect", "hand"], default="detect",
+                        help="object detection or hand following (default: detect)")
+    parser.add_argument("--follow", action="store_true",
+                        help="steer the rover towards the target object")
+    parser.add_argument("--target", default="person",
+                        help="object class to follow (default: person)")
+    parser.add_argument("--no-control", action="store_true",
+                        help="never send motor commands, useful for benchmarking")
+    parser.add_argument("--duration", type=float, default=None,
+                        help="stop after this many seconds")
+    parser.add_argument("--stats-interval", type=float, default=5.0,
+                        help="seconds between printed stats (default: 5)")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT,
+                        help=f"Prometheus endpoint port, 0 to disable (default: {METRICS_PORT})")
+    parser.add_argument("--metrics-jsonl", default=METRICS_JSONL,
+                        help="append metrics snapshots to this JSONL file")
+    args = parser.parse_args(argv)
+
+    source = int(args.source) if args.source.isdigit() else args.source
+    engine = create_engine_from_config(
+        render=False,
+        send_commands=not args.no_control,
+        metrics_port=args.metrics_port,
+        metrics_jsonl=args.metrics_jsonl
+    )
+    engine.target_label = args.target
+    engine.replay_realtime = not args.fast
+    replaying = isinstance(source, str) and os.path.isdir(source)
+    if args.record:
+        engine.start_recording(args.record)
+    if args.mode == "hand":
+        engine.set_hand_following(True)
+    else:
+        engine.auto_control = args.follow
+    # Nothing to show while waiting, load the models up front so replays
+    # and benchmarks see every frame with the models ready
+    engine.preload(wait=True)
+
+    start = time.time()
+    last_stats = start
+    last_frames = 0
+    try:
+        while args.duration is None or time.time() - start < args.duration:
+            if not engine.is_connected():
+                if replaying and engine.grabber is not None:
+                    break  # End of the recorded session
+                if not engine.connect(source):
+                    time.sleep(2)
+                    continue
+
+            if engine.step() is None:
+                time.sleep(0.002)  # No new frame yet
+                continue
+
+            now = time.time()
+            if now - last_stats >= args.stats_interval:
+                fps = (engine.frame_count - last_frames) / (now - last_stats)
+                stats = engine.stats()
+                print(
+                    f"FPS: {fps:.1f} | {stats['governor']['decision']} | "
+                    f"gate: {stats['motion_gate']['decision']} | "
+                    f"latency: {stats['latency']['estimate_ms']:.0f} ms | "
+                    f"{args.mode}: {engine.status_buffer or ', '.join(engine.detection_buffer)}"
+                )
+                last_stats, last_frames = now, engine.frame_count
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.close()
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if len(sys.argv) > 1 and sys.argv[1] == "--headless":
+        headless_main(sys.argv[2:])
+    else:
+        main()
\ No newline at end of file
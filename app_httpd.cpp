@@ -29,6 +29,8 @@ static esp_err_t index_handler(httpd_req_t *req);
 static esp_err_t stream_handler(httpd_req_t *req);
 static esp_err_t cmd_handler(httpd_req_t *req);
 static esp_err_t capture_handler(httpd_req_t *req);
+static esp_err_t status_handler(httpd_req_t *req);
+static esp_err_t settings_handler(httpd_req_t *req);
 
 // Define URI handlers after forward declarations
 httpd_uri_t index_uri = {
@@ -59,6 +61,20 @@ httpd_uri_t capture_uri = {
     .user_ctx  = NULL
 };
 
+httpd_uri_t status_uri = {
+    .uri       = "/status",
+    .method    = HTTP_GET,
+    .handler   = status_handler,
+    .user_ctx  = NULL
+};
+
+httpd_uri_t settings_uri = {
+    .uri       = "/settings",
+    .method    = HTTP_GET,
+    .handler   = settings_handler,
+    .user_ctx  = NULL
+};
+
 static size_t jpg_encode_stream(void * arg, size_t index, const void* data, size_t len){
     jpg_chunking_t *j = (jpg_chunking_t *)arg;
     if(!index){
@@ -202,6 +218,38 @@ static esp_err_t stream_handler(httpd_req_t *req) {
 enum state {fwd,rev,stp};
 state actstate = stp;
 
+static int flash = 0;
+
+// Settings accepted by /control?var=&val= and /settings
+static const char* SETTING_NAMES[] = {"flash", "speed", "framesize", "quality"};
+
+static bool applySetting(const char *variable, int val) {
+    if(!strcmp(variable, "flash")) {
+        flash = val;
+        ledcWrite(7, val);  // LED control
+        Serial.printf("Flash set to %d\n", val);
+    }
+    else if(!strcmp(variable, "speed")) {
+        speed = val;
+    }
+    else if(!strcmp(variable, "framesize") || !strcmp(variable, "quality")) {
+        sensor_t * s = esp_camera_sensor_get();
+        if (!s) {
+            return false;
+        }
+        if (variable[0] == 'f') {
+            s->set_framesize(s, (framesize_t)val);
+        } else {
+            s->set_quality(s, val);
+        }
+        Serial.printf("%s set to %d\n", variable, val);
+    }
+    else {
+        return false;
+    }
+    return true;
+}
+
 static esp_err_t cmd_handler(httpd_req_t *req) {
     char*  buf;
     size_t buf_len;
@@ -225,15 +273,7 @@ static esp_err_t cmd_handler(httpd_req_t *req) {
             else if (httpd_query_key_value(buf, "var", variable, sizeof(variable)) == ESP_OK &&
                      httpd_query_key_value(buf, "val", value, sizeof(value)) == ESP_OK) {
                 
-                int val = atoi(value);
-                
-                if(!strcmp(variable, "flash")) {
-                    ledcWrite(7, val);  // LED control
-                    Serial.printf("Flash set to %d\n", val);
-                }
-                else if(!strcmp(variable, "speed")) {
-                    speed = val;
-                }
+                applySetting(variable, atoi(value));
             }
         }
         free(buf);
@@ -248,7 +288,14 @@ static esp_err_t status_handler(httpd_req_t *req) {
     *p++ = '{';
     p += sprintf(p, "\"status\":%d,", 1);
     p += sprintf(p, "\"stream_active\":%d,", (stream_httpd != NULL));
-    p += sprintf(p, "\"web_active\":%d", (camera_httpd != NULL));
+    p += sprintf(p, "\"web_active\":%d,", (camera_httpd != NULL));
+    sensor_t * s = esp_camera_sensor_get();
+    if (s) {
+        p += sprintf(p, "\"framesize\":%u,", s->status.framesize);
+        p += sprintf(p, "\"quality\":%u,", s->status.quality);
+    }
+    p += sprintf(p, "\"flash\":%d,", flash);
+    p += sprintf(p, "\"speed\":%d", speed);
     *p++ = '}';
     *p++ = 0;
     httpd_resp_set_type(req, "application/json");
@@ -256,6 +303,32 @@ static esp_err_t status_handler(httpd_req_t *req) {
     return httpd_resp_send(req, json_response, strlen(json_response));
 }
 
+// Several settings in one request, e.g. /settings?framesize=8&quality=20,
+// answered with the status JSON so the client sees the resulting state
+static esp_err_t settings_handler(httpd_req_t *req) {
+    char*  buf;
+    size_t buf_len;
+    char value[32] = {0,};
+
+    buf_len = httpd_req_get_url_query_len(req) + 1;
+    if (buf_len > 1) {
+        buf = (char*)malloc(buf_len);
+        if(!buf){
+            httpd_resp_send_500(req);
+            return ESP_FAIL;
+        }
+        if (httpd_req_get_url_query_str(req, buf, buf_len) == ESP_OK) {
+            for (int i = 0; i < sizeof(SETTING_NAMES) / sizeof(SETTING_NAMES[0]); i++) {
+                if (httpd_query_key_value(buf, SETTING_NAMES[i], value, sizeof(value)) == ESP_OK) {
+                    applySetting(SETTING_NAMES[i], atoi(value));
+                }
+            }
+        }
+        free(buf);
+    }
+    return status_handler(req);
+}
+
 static const char PROGMEM INDEX_HTML[] = R"rawliteral(
 <!doctype html>
 <html>
@@ -522,5 +595,7 @@ void startCameraServer() {
         httpd_register_uri_handler(camera_httpd, &index_uri);
         httpd_register_uri_handler(camera_httpd, &cmd_uri);
         httpd_register_uri_handler(camera_httpd, &capture_uri);
+        httpd_register_uri_handler(camera_httpd, &status_uri);
+        httpd_register_uri_handler(camera_httpd, &settings_uri);
     }
 }
@@ -0,0 +1,403 @@
+"""Run the detector over recorded footage offline, on all cores.
+
+Inputs are video files, MJPEG dumps (.mjpeg/.mjpg/.jpegs) and session directories
+written by the Record button. Videos and sessions are split into ranges of
+--chunk frames; a pool of worker processes each loads the network once and
+detects on every --stride'th frame of the ranges it is handed. Detection
+uses the same engines, decoding and NMS as the app.
+
+Results stream to one output file as ranges finish, in no particular order:
+    jsonl  one line per frame with detections:
+           {"file", "frame", "time", "detections": [{"label", "class_id", "confidence", "box"}]}
+    csv    one row per detection: file, frame, time, label, class_id, confidence, x, y, w, h
+Boxes are x, y, w, h in source pixels, time is seconds into the video or
+the recording timestamp for sessions.
+
+Finished ranges are logged to <output>.progress.jsonl. Running the same
+command again resumes: finished ranges are skipped and anything written
+after the last finished range is cut off first.
+
+Usage:
+    python batch_detect.py footage/*.mp4 recordings/20241212-073445 --output tags.jsonl
+    python batch_detect.py dump.mjpeg --format csv --output tags.csv --workers 8 --stride 5
+"""
+import argparse
+import csv
+import io
+import json
+import multiprocessing as mp
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from benchmark import MJPEG_EXTENSIONS, iter_mjpeg_frames
+from detectors import MODEL_PRESETS, create_engine, load_classes
+from recorder import SessionReader
+from roi_detection import RegionDetector
+
+CSV_COLUMNS = ["file", "frame", "time", "label", "class_id", "confidence", "x", "y", "w", "h"]
+
+# Per worker process, set by _init_worker
+_detector = None
+_regions = None
+_classes = None
+_load_error = None
+
+
+def plan_units(paths, chunk=600):
+    """Split the inputs into (path, start, end) frame ranges, end None meaning to the end"""
+    units = []
+    for path in paths:
+        if os.path.isdir(path):
+            reader = SessionReader(path)
+            count = len(reader)
+            reader.close()
+        elif path.lower().endswith(MJPEG_EXTENSIONS):
+            count = None  # No index to seek with, one range for the whole dump
+        else:
+            cap = cv2.VideoCapture(path)
+            if not cap.isOpened():
+                raise IOError(f"Could not open {path}")
+            count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            cap.release()
+            if count <= 0:
+                count = None  # Frame count unknown, don't split
+        if count is None or not chunk:
+            units.append((path, 0, None))
+            continue
+        for start in range(0, count, chunk):
+            units.append((path, start, min(count, start + chunk)))
+    return units
+
+
+def unit_id(unit):
+    path, start, end = unit
+    return f"{os.path.abspath(path)}:{start}-{'' if end is None else end}"
+
+
+def iter_unit_frames(path, start, end, stride):
+    """Yield (frame index, time in seconds, frame) for frames in [start, end) that are multiples of stride"""
+    first = start + (-start) % stride  # Same frames whatever the chunk size
+    if os.path.isdir(path):
+        reader = SessionReader(path)
+        try:
+            for i in range(first, len(reader) if end is None else end, stride):
+                frame = reader.frame(i)
+                if frame is not None:
+                    yield i, reader.timestamp(i), frame
+        finally:
+            reader.close()
+        return
+
+    if path.lower().endswith(MJPEG_EXTENSIONS):
+        for i, jpeg in enumerate(iter_mjpeg_frames(path)):
+            if i < first or i % stride:
+                continue
+            if end is not None and i >= end:
+                break
+            frame = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if frame is not None:
+                yield i, None, frame
+        return
+
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"Could not open {path}")
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or None
+        if first:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, first)
+        i = first
+        while end is None or i < end:
+            # grab() skips the frames between strides without decoding them
+            if i % stride:
+                if not cap.grab():
+                    break
+            else:
+                ret, frame = cap.read()
+                if not ret or frame is None:
+                    break
+                yield i, i / fps if fps else None, frame
+            i += 1
+    finally:
+        cap.release()
+
+
+def _init_worker(preset, options, tiles, classes_path):
+    """Pool initializer: load the network once per worker process"""
+    global _detector, _regions, _classes, _load_error
+    try:
+        _classes = load_classes(classes_path)
+        _detector = create_engine(preset, **options)
+        _detector.load()
+    except Exception as e:
+        # Raising here would make the pool respawn the worker forever, the
+        # error is handed back with the first range instead
+        _load_error = f"Could not load {preset}: {e}"
+        return
+    if tiles:
+        _regions = RegionDetector(_detector)
+
+
+def _detect_unit(unit, stride):
+    """Worker: detect on one frame range, returns (unit, rows, stats)"""
+    path, start, end = unit
+    rows = []
+    frames = 0
+    read_time = detect_time = 0.0
+    started = time.perf_counter()
+    frames_iter = iter_unit_frames(path, start, end, stride)
+    while True:
+        read_start = time.perf_counter()
+        item = next(frames_iter, None)
+        read_time += time.perf_counter() - read_start
+        if item is None:
+            break
+        index, timestamp, frame = item
+
+        detect_start = time.perf_counter()
+        if _regions is not None:
+            height, width = frame.shape[:2]
+            detections = _detector.detect_regions(frame, _regions.full_regions(width, height))
+        else:
+            detections = _detector.detect(frame)
+        detect_time += time.perf_counter() - detect_start
+        frames += 1
+
+        if len(detections.boxes):
+            rows.append({
+                "file": path,
+                "frame": index,
+                "time": None if timestamp is None else round(timestamp, 3),
+                "detections": [
+                    {
+                        "label": _classes[class_id],
+                        "class_id": int(class_id),
+                        "confidence": round(float(confidence), 4),
+                        "box": [int(v) for v in box],
+                    }
+                    for box, confidence, class_id in zip(
+                        detections.boxes, detections.confidences, detections.class_ids)
+                ],
+            })
+    stats = {
+        "frames": frames,
+        "frames_with_detections": len(rows),
+        "seconds": time.perf_counter() - started,
+        "read_seconds": read_time,
+        "detect_seconds": detect_time,
+    }
+    return unit, rows, stats
+
+
+def _run_unit(args):
+    unit, stride = args
+    if _load_error is not None:
+        return unit, None, {"error": _load_error, "load_failed": True}
+    try:
+        return _detect_unit(unit, stride)
+    except Exception as e:
+        return unit, None, {"error": str(e)}
+
+
+def format_rows(rows, output_format):
+    if output_format == "jsonl":
+        return "".join(json.dumps(row) + "\n" for row in rows)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        for detection in row["detections"]:
+            writer.writerow([row["file"], row["frame"], row["time"], detection["label"],
+                             detection["class_id"], detection["confidence"], *detection["box"]])
+    return buffer.getvalue()
+
+
+class Progress:
+    """Append-only log of finished ranges next to the output file.
+
+    The first line holds the job settings, every other line one finished
+    range with its stats and the output file size right after its rows
+    were written.
+    """
+
+    def __init__(self, path, job):
+        self.path = path
+        self.job = job
+        self.done = {}
+        self.output_size = 0
+        if os.path.exists(path):
+            with open(path) as f:
+                lines = [json.loads(line) for line in f if line.strip()]
+            if lines and lines[0].get("job") != job:
+                raise ValueError(f"{path} belongs to a job with different settings, "
+                                 f"use --restart to start over")
+            for entry in lines[1:]:
+                self.done[entry["unit"]] = entry
+                self.output_size = max(self.output_size, entry["output_size"])
+            self.file = open(path, "a")
+        else:
+            self.file = open(path, "w")
+            self.write({"job": job})
+
+    def write(self, entry):
+        self.file.write(json.dumps(entry) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+
+def summarize_files(entries):
+    """Per input file totals and throughput from progress entries"""
+    files = {}
+    for entry in entries:
+        stats = files.setdefault(entry["file"], {"ranges": 0, "frames": 0,
+                                                 "frames_with_detections": 0,
+                                                 "detect_seconds": 0.0, "seconds": 0.0})
+        stats["ranges"] += 1
+        for key in ("frames", "frames_with_detections", "detect_seconds", "seconds"):
+            stats[key] += entry["stats"][key]
+    for stats in files.values():
+        # Frames per second of worker time, comparable across runs with different pools
+        stats["fps"] = stats["frames"] / stats["seconds"] if stats["seconds"] else 0.0
+    return files
+
+
+def run_batch(paths, output, output_format="jsonl", preset="yolov3", input_size=320,
+              workers=None, threads=None, chunk=600, stride=1, tiles=False,
+              confidence_threshold=0.5, nms_threshold=0.4, backend="opencv", target="cpu",
+              classes_path="coco.names", restart=False):
+    """Detect on every input and write the results to output, returns the summary dict"""
+    workers = workers or os.cpu_count() or 1
+    # One thread per worker by default, the pool already fills the cores
+    threads = threads or max(1, (os.cpu_count() or 1) // workers)
+    options = dict(input_size=(input_size, input_size), backend=backend, target=target,
+                   threads=threads, confidence_threshold=confidence_threshold,
+                   nms_threshold=nms_threshold)
+    job = {"model": preset, "input_size": input_size, "stride": stride, "chunk": chunk,
+           "tiles": tiles, "format": output_format, "confidence": confidence_threshold,
+           "nms": nms_threshold}
+
+    progress_path = output + ".progress.jsonl"
+    if restart:
+        for path in (output, progress_path):
+            if os.path.exists(path):
+                os.remove(path)
+    progress = Progress(progress_path, job)
+
+    # Cut off rows of ranges that were being written when the last run stopped
+    mode = "r+" if os.path.exists(output) else "w"
+    out = open(output, mode, newline="")
+    out.truncate(progress.output_size)
+    out.seek(progress.output_size)
+    if output_format == "csv" and progress.output_size == 0:
+        csv.writer(out).writerow(CSV_COLUMNS)
+        out.flush()
+
+    units = [unit for unit in plan_units(paths, chunk) if unit_id(unit) not in progress.done]
+    entries = list(progress.done.values())
+    print(f"{len(units)} ranges to process, {len(progress.done)} already done, "
+          f"{workers} workers x {threads} threads")
+
+    started = time.perf_counter()
+    frames = 0
+    failed = []
+    ctx = mp.get_context("spawn")  # Workers load their own network, nothing to fork
+    pool = ctx.Pool(workers, initializer=_init_worker,
+                    initargs=(preset, options, tiles, classes_path))
+    try:
+        for unit, rows, stats in pool.imap_unordered(_run_unit, [(u, stride) for u in units]):
+            if rows is None:
+                if stats.get("load_failed"):
+                    pool.terminate()
+                    raise RuntimeError(stats["error"])
+                print(f"Failed {unit_id(unit)}: {stats['error']}")
+                failed.append(unit_id(unit))
+                continue
+            out.write(format_rows(rows, output_format))
+            out.flush()
+            os.fsync(out.fileno())
+            entry = {"unit": unit_id(unit), "file": unit[0], "stats": stats,
+                     "output_size": out.tell()}
+            progress.write(entry)
+            entries.append(entry)
+            frames += stats["frames"]
+            elapsed = time.perf_counter() - started
+            print(f"{unit_id(unit)}: {stats['frames']} frames in {stats['seconds']:.1f} s, "
+                  f"total {frames / elapsed:.1f} FPS")
+        pool.close()
+    except KeyboardInterrupt:
+        print("Interrupted, run the same command again to resume")
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+        out.close()
+        progress.close()
+
+    elapsed = time.perf_counter() - started
+    return {
+        "output": output,
+        "frames": frames,
+        "seconds": elapsed,
+        "throughput_fps": frames / elapsed if elapsed > 0 else 0.0,
+        "workers": workers,
+        "failed": failed,
+        "files": summarize_files(entries),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline batch detection over recorded footage")
+    parser.add_argument("inputs", nargs="+",
+                        help="video files, MJPEG dumps (.mjpeg/.mjpg/.jpegs) or session directories")
+    parser.add_argument("--output", required=True, help="results file")
+    parser.add_argument("--format", default="jsonl", choices=["jsonl", "csv"])
+    parser.add_argument("--model", default="yolov3", choices=sorted(MODEL_PRESETS))
+    parser.add_argument("--size", type=int, default=320, help="detector input size (default: 320)")
+    parser.add_argument("--backend", default="opencv")
+    parser.add_argument("--target", default="cpu")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="threads per worker (default: CPUs / workers)")
+    parser.add_argument("--chunk", type=int, default=600,
+                        help="frames per range handed to a worker (default: 600)")
+    parser.add_argument("--stride", type=int, default=1, help="detect on every Nth frame")
+    parser.add_argument("--tiles", action="store_true",
+                        help="detect on overlapping tiles plus the whole frame, for high resolutions")
+    parser.add_argument("--confidence", type=float, default=0.5)
+    parser.add_argument("--nms", type=float, default=0.4)
+    parser.add_argument("--restart", action="store_true",
+                        help="discard the results and progress of an earlier run")
+    parser.add_argument("--summary", help="also write the summary JSON here")
+    args = parser.parse_args(argv)
+
+    try:
+        summary = run_batch(
+            args.inputs, args.output, output_format=args.format, preset=args.model,
+            input_size=args.size, workers=args.workers, threads=args.threads, chunk=args.chunk,
+            stride=max(1, args.stride), tiles=args.tiles, confidence_threshold=args.confidence,
+            nms_threshold=args.nms, backend=args.backend, target=args.target,
+            restart=args.restart
+        )
+    except (ValueError, RuntimeError) as e:
+        print(e)
+        return 2
+    except KeyboardInterrupt:
+        return 130
+
+    text = json.dumps(summary, indent=2)
+    if args.summary:
+        with open(args.summary, "w") as f:
+            f.write(text + "\n")
+    print(text)
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
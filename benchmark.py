@@ -0,0 +1,305 @@
+"""Replay recorded footage through the perception pipeline and report per-stage latency.
+
+Runs the same stages the engine uses for every frame:
+    capture  - reading the next frame (video decode, or JPEG decode for MJPEG dumps)
+    resize   - scaling to the display size
+    blob     - cv2.dnn.blobFromImage at the detector input size
+    forward  - the network forward pass
+    decode   - thresholding and scaling the YOLO output rows
+    nms      - non-maximum suppression
+    hands    - MediaPipe Hands (only with --hands)
+    render   - overlay band, boxes and the BGR->RGBA conversion into the reused
+               buffer the GUI pastes from (the Tk paste itself needs a display)
+
+Usage:
+    python benchmark.py run footage.mp4 stream_dump.mjpeg --output run.json
+    python benchmark.py compare baseline.json run.json --threshold 0.1
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from detection import (decode_yolo_candidates, draw_detections, draw_overlay_band,
+                       non_max_suppression)
+from detectors import MODEL_PRESETS, create_engine, load_classes
+
+try:
+    from compositor import RgbaFrame
+except ImportError:  # No Tk or Pillow, render then times the drawing alone
+    RgbaFrame = None
+
+STAGES = ["capture", "resize", "blob", "forward", "decode", "nms", "hands", "render", "total"]
+MJPEG_EXTENSIONS = (".mjpeg", ".mjpg", ".jpegs")
+
+
+def iter_mjpeg_frames(path, chunk_size=1 << 20):
+    """Yield the JPEG images in a recorded MJPEG dump.
+
+    Works on raw multipart stream captures as well as plain concatenated
+    JPEGs, since it only looks for the JPEG start and end markers.
+    """
+    buffer = bytearray()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            buffer += chunk
+            while True:
+                start = buffer.find(b"\xff\xd8")
+                if start < 0:
+                    buffer.clear()
+                    break
+                end = buffer.find(b"\xff\xd9", start + 2)
+                if end < 0:
+                    del buffer[:start]
+                    break
+                yield bytes(buffer[start:end + 2])
+                del buffer[:end + 2]
+
+
+def iter_frames(path):
+    """Yield (frame, seconds spent producing it) for a video file or MJPEG dump"""
+    if path.lower().endswith(MJPEG_EXTENSIONS):
+        for jpeg in iter_mjpeg_frames(path):
+            start = time.perf_counter()
+            frame = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+            elapsed = time.perf_counter() - start
+            if frame is not None:
+                yield frame, elapsed
+        return
+
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"Could not open {path}")
+    try:
+        while True:
+            start = time.perf_counter()
+            ret, frame = cap.read()
+            elapsed = time.perf_counter() - start
+            if not ret or frame is None:
+                break
+            yield frame, elapsed
+    finally:
+        cap.release()
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(q / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples):
+    """Latency summary in milliseconds for a list of durations in seconds"""
+    values = sorted(samples)
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean_ms": sum(values) / len(values) * 1000,
+        "p50_ms": percentile(values, 50) * 1000,
+        "p95_ms": percentile(values, 95) * 1000,
+        "p99_ms": percentile(values, 99) * 1000,
+        "max_ms": values[-1] * 1000,
+    }
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_benchmark(paths, preset="yolov3", input_size=320, display_size=(640, 480),
+                  hands=False, max_frames=None, warmup=5, classes_path="coco.names",
+                  confidence_threshold=0.5, nms_threshold=0.4):
+    """Replay every file through the pipeline and return the report dict"""
+    classes = load_classes(classes_path)
+    engine = create_engine(
+        preset, input_size=(input_size, input_size),
+        confidence_threshold=confidence_threshold, nms_threshold=nms_threshold
+    )
+    load_start = time.perf_counter()
+    engine.load()
+    load_time = time.perf_counter() - load_start
+
+    hand_detector = None
+    if hands:
+        from hands import HandTracker
+        hand_detector = HandTracker()
+
+    rgba = RgbaFrame() if RgbaFrame is not None else None
+    samples = {stage: [] for stage in STAGES}
+    frames = 0
+    measured_time = 0.0
+
+    for path in paths:
+        for raw_frame, capture_time in iter_frames(path):
+            if max_frames is not None and frames >= max_frames + warmup:
+                break
+            timings = {"capture": capture_time}
+
+            start = time.perf_counter()
+            frame = cv2.resize(raw_frame, display_size)
+            timings["resize"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            blob = engine.make_blob(frame)
+            timings["blob"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            outs = engine.forward(blob)
+            timings["forward"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            candidates = decode_yolo_candidates(outs, display_size, confidence_threshold)
+            timings["decode"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            detections = non_max_suppression(candidates, confidence_threshold, nms_threshold)
+            timings["nms"] = time.perf_counter() - start
+
+            if hand_detector is not None:
+                start = time.perf_counter()
+                hand_detector.process(frame)
+                timings["hands"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            draw_overlay_band(frame)
+            draw_detections(frame, detections, classes)
+            if rgba is not None:
+                rgba.update(frame)
+            timings["render"] = time.perf_counter() - start
+
+            timings["total"] = sum(timings.values())
+            frames += 1
+            if frames <= warmup:
+                continue  # First runs include lazy allocations, leave them out
+            for stage, seconds in timings.items():
+                samples[stage].append(seconds)
+            measured_time += timings["total"]
+
+    if hand_detector is not None:
+        hand_detector.close()
+
+    measured = max(0, frames - warmup)
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "inputs": [os.path.basename(p) for p in paths],
+        "engine": engine.name,
+        "input_size": input_size,
+        "display_size": list(display_size),
+        "frames": measured,
+        "warmup_frames": min(frames, warmup),
+        "model_load_ms": load_time * 1000,
+        "throughput_fps": measured / measured_time if measured_time > 0 else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+        "stages": {stage: summarize(values) for stage, values in samples.items() if values},
+        "system": {
+            "python": platform.python_version(),
+            "opencv": cv2.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+        },
+    }
+
+
+def compare_reports(baseline, current, threshold=0.1):
+    """Compare two reports, returns a dict listing regressions and improvements.
+
+    A stage regresses when its p50 or p95 is more than threshold (a fraction)
+    slower than the baseline; throughput regresses when it drops by more
+    than threshold, and peak RSS when it grows by more than threshold.
+    """
+    regressions = []
+    improvements = []
+
+    def check(name, old, new, higher_is_better=False):
+        if old is None or new is None or old <= 0:
+            return
+        change = (new - old) / old
+        if higher_is_better:
+            change = -change
+        entry = {"metric": name, "baseline": old, "current": new, "change": change}
+        if change > threshold:
+            regressions.append(entry)
+        elif change < -threshold:
+            improvements.append(entry)
+
+    for stage in STAGES:
+        old = baseline.get("stages", {}).get(stage)
+        new = current.get("stages", {}).get(stage)
+        if not old or not new:
+            continue
+        for key in ("p50_ms", "p95_ms"):
+            check(f"{stage}.{key}", old.get(key), new.get(key))
+    check("throughput_fps", baseline.get("throughput_fps"), current.get("throughput_fps"),
+          higher_is_better=True)
+    check("peak_rss_mb", baseline.get("peak_rss_mb"), current.get("peak_rss_mb"))
+
+    return {
+        "threshold": threshold,
+        "baseline_engine": baseline.get("engine"),
+        "current_engine": current.get("engine"),
+        "regressions": regressions,
+        "improvements": improvements,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Perception pipeline benchmark")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="replay footage and report stage latencies")
+    run.add_argument("inputs", nargs="+", help="video files or MJPEG dumps (.mjpeg/.mjpg)")
+    run.add_argument("--model", default="yolov3", choices=sorted(MODEL_PRESETS))
+    run.add_argument("--size", type=int, default=320, help="detector input size (default: 320)")
+    run.add_argument("--hands", action="store_true", help="also time MediaPipe Hands")
+    run.add_argument("--max-frames", type=int, default=None)
+    run.add_argument("--warmup", type=int, default=5, help="frames left out of the stats")
+    run.add_argument("--output", help="write the JSON report here instead of stdout")
+
+    compare = commands.add_parser("compare", help="flag regressions between two reports")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--threshold", type=float, default=0.1,
+                         help="allowed relative slowdown (default: 0.1 = 10%%)")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        report = run_benchmark(
+            args.inputs, preset=args.model, input_size=args.size, hands=args.hands,
+            max_frames=args.max_frames, warmup=args.warmup
+        )
+        text = json.dumps(report, indent=2)
+        if args.output:
+            with open(args.output, "w") as f:
+                f.write(text + "\n")
+            print(f"Wrote {args.output}: {report['frames']} frames, "
+                  f"{report['throughput_fps']:.1f} FPS")
+        else:
+            print(text)
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    result = compare_reports(baseline, current, args.threshold)
+    print(json.dumps(result, indent=2))
+    return 1 if result["regressions"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+import threading
+import time
+
+
+class FrameGrabber:
+    """Reads frames from a cv2.VideoCapture on its own thread, keeping only the newest one"""
+
+    def __init__(self, cap, max_failed_reads=30, metrics=None):
+        self.cap = cap
+        self.max_failed_reads = max_failed_reads
+        self.metrics = metrics  # Optional Metrics, gets a "capture" timing per read
+
+        self._lock = threading.Lock()
+        self._frame = None
+        self._frame_time = 0.0
+        self.frame_time = None  # Arrival time of the frame last returned by read()
+        self._has_new_frame = False
+        self._running = False
+        self._thread = None
+
+        # Counters
+        self.frames_received = 0
+        self.frames_dropped = 0
+        self.frames_consumed = 0
+        self.failed_reads = 0
+        self.failed = False  # Set when the source stops delivering frames
+
+    def start(self):
+        """Start the capture thread"""
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="FrameGrabber", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        """Stop the capture thread (does not release the capture)"""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def release(self):
+        """Stop the thread and release the underlying capture"""
+        self.stop()
+        if self.cap is not None:
+            self.cap.release()
+
+    def _run(self):
+        consecutive_failures = 0
+        while self._running:
+            start = time.perf_counter()
+            try:
+                ret, frame = self.cap.read()
+            except Exception as e:
+                print(f"Error in frame grabber: {e}")
+                ret, frame = False, None
+            if self.metrics is not None and ret:
+                self.metrics.observe("capture", time.perf_counter() - start)
+
+            if not ret or frame is None:
+                self.failed_reads += 1
+                consecutive_failures += 1
+                if consecutive_failures >= self.max_failed_reads:
+                    print("Frame grabber: source stopped delivering frames")
+                    self.failed = True
+                    self._running = False
+                    break
+                time.sleep(0.01)
+                continue
+
+            consecutive_failures = 0
+            with self._lock:
+                # Latest frame wins, an unconsumed older frame is dropped
+                if self._has_new_frame:
+                    self.frames_dropped += 1
+                self._frame = frame
+                self._frame_time = time.time()
+                self._has_new_frame = True
+                self.frames_received += 1
+
+    def read(self):
+        """Return the newest frame not yet consumed, or None if there is none"""
+        with self._lock:
+            if not self._has_new_frame:
+                return None
+            self._has_new_frame = False
+            self.frames_consumed += 1
+            self.frame_time = self._frame_time
+            return self._frame
+
+    def is_running(self):
+        return self._running
+
+    def stats(self):
+        """Return a snapshot of the capture counters"""
+        return {
+            "received": self.frames_received,
+            "dropped": self.frames_dropped,
+            "consumed": self.frames_consumed,
+            "failed_reads": self.failed_reads,
+        }
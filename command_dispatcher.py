@@ -0,0 +1,218 @@
+import threading
+import time
+from collections import deque
+
+import requests
+
+from control_channel import CONTROL_PORT, RoverClient
+
+STOP_COMMAND = '3'
+
+
+class CommandDispatcher:
+    """Sends motor commands to the rover from a background thread.
+
+    Only the newest command is kept waiting to go out, repeats of the command the
+    rover is already executing are dropped, and stop jumps ahead of everything else.
+    Commands go over the rover's UDP control channel (control_channel.py), or
+    over one keep-alive HTTP session to the /control endpoint where that isn't
+    available.
+    """
+
+    def __init__(self, control_url, timeout=1.0, history_size=200, udp_port=CONTROL_PORT):
+        self.control_url = control_url
+        self.timeout = timeout
+        self.client = RoverClient(control_url, udp_port=udp_port, timeout=timeout)
+
+        self._cond = threading.Condition()
+        self._pending = None  # Newest movement command not yet sent
+        self._pending_stop = False  # Stop waiting to go out, always sent first
+        self._in_flight = None
+        self._last_sent = None  # Last command the rover acknowledged
+        self._pending_speed = None  # Motor speed to set before the next command
+        self.speed = None  # Last speed queued with set_speed()
+        self._running = False
+        self._thread = None
+        self._listeners = []
+
+        # Counters
+        self.sent = 0
+        self.failed = 0
+        self.duplicates = 0  # Dropped because the rover is already doing it
+        self.coalesced = 0  # Replaced by a newer command before going out
+        self.latencies = deque(maxlen=history_size)  # Round-trip times in seconds
+        self.last_latency = None
+
+    def start(self):
+        """Start the sender thread"""
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="CommandDispatcher", daemon=True)
+        self._thread.start()
+
+    def close(self, timeout=2.0):
+        """Flush queued commands, then stop the sender thread and close the session"""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.client.close()
+
+    def add_listener(self, callback):
+        """Register callback(command, ok, latency) called after every send attempt"""
+        self._listeners.append(callback)
+
+    def _active_command(self):
+        return self._in_flight if self._in_flight is not None else self._last_sent
+
+    def _latest_command(self):
+        """The command the rover will end up executing once the queue drains"""
+        if self._pending is not None:
+            return self._pending
+        if self._pending_stop:
+            return STOP_COMMAND
+        return self._active_command()
+
+    def send(self, command):
+        """Queue a command, returns False if it was dropped as a repeat"""
+        command = str(command)
+        with self._cond:
+            if command == self._latest_command():
+                self.duplicates += 1
+                return False
+
+            if command == STOP_COMMAND:
+                # Stop cancels any movement still waiting and goes out first
+                if self._pending is not None:
+                    self.coalesced += 1
+                    self._pending = None
+                if self._active_command() != STOP_COMMAND:
+                    self._pending_stop = True
+            else:
+                if self._pending is not None:
+                    self.coalesced += 1
+                self._pending = command
+                if not self._pending_stop and command == self._active_command():
+                    # Back to what the rover is already doing, nothing to send
+                    self._pending = None
+
+            self._cond.notify_all()
+            return True
+
+    def stop(self):
+        """Queue a priority stop"""
+        return self.send(STOP_COMMAND)
+
+    def set_speed(self, speed):
+        """Queue a motor speed (0-255), returns False if it is already set.
+
+        The firmware applies speed on the next motor command, so the current
+        movement is sent again right after the new speed.
+        """
+        speed = max(0, min(255, int(speed)))
+        with self._cond:
+            if speed == self.speed:
+                return False
+            self.speed = speed
+            self._pending_speed = speed
+            latest = self._latest_command()
+            if self._pending is None and latest not in (None, STOP_COMMAND):
+                self._pending = latest
+            self._cond.notify_all()
+            return True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while (self._running and not self._pending_stop and self._pending is None
+                       and self._pending_speed is None):
+                    self._cond.wait()
+
+                if self._pending_stop:
+                    command = STOP_COMMAND
+                    self._pending_stop = False
+                elif self._pending_speed is not None:
+                    command = None
+                    speed = self._pending_speed
+                    self._pending_speed = None
+                elif self._pending is not None:
+                    command = self._pending
+                    self._pending = None
+                else:
+                    break  # Closed and fully drained
+                self._in_flight = command
+
+            if command is None:
+                ok, _ = self._post_speed(speed)
+                with self._cond:
+                    if not ok and self._pending_speed is None:
+                        self.speed = None  # Let the next set_speed() try again
+                    self._cond.notify_all()
+                continue
+
+            ok, latency = self._post(command)
+
+            with self._cond:
+                self._in_flight = None
+                self._last_sent = command if ok else None
+                if not ok and command == STOP_COMMAND and self._pending is None:
+                    # Never lose a stop, retry until it gets through or is superseded
+                    self._pending_stop = self._running
+                self._cond.notify_all()
+
+            for callback in self._listeners:
+                try:
+                    callback(command, ok, latency)
+                except Exception as e:
+                    print(f"Error in command listener: {e}")
+
+    def _post(self, command):
+        start = time.perf_counter()
+        try:
+            if self.client.send_command(command):
+                latency = time.perf_counter() - start
+                self.sent += 1
+                self.last_latency = latency
+                self.latencies.append(latency)
+                print(f"Command sent: {command} ({latency * 1000:.0f} ms, {self.client.transport})")
+                return True, latency
+        except requests.exceptions.Timeout:
+            print("Command timed out")
+        except requests.exceptions.ConnectionError:
+            print("Connection failed")
+            time.sleep(0.2)  # Don't spin while the rover is unreachable
+        except Exception as e:
+            print(f"Error sending command: {e}")
+        self.failed += 1
+        return False, time.perf_counter() - start
+
+    def _post_speed(self, speed):
+        start = time.perf_counter()
+        try:
+            if self.client.set_speed(speed):
+                return True, time.perf_counter() - start
+        except requests.exceptions.RequestException as e:
+            print(f"Error setting speed: {e}")
+        return False, time.perf_counter() - start
+
+    def stats(self):
+        """Return counters and round-trip latency summary in milliseconds"""
+        latencies = sorted(self.latencies)
+        summary = {
+            "sent": self.sent,
+            "failed": self.failed,
+            "duplicates": self.duplicates,
+            "coalesced": self.coalesced,
+            "transport": self.client.transport,
+            "last_ms": None,
+            "avg_ms": None,
+            "max_ms": None,
+        }
+        if latencies:
+            summary["last_ms"] = self.last_latency * 1000
+            summary["avg_ms"] = sum(latencies) / len(latencies) * 1000
+            summary["max_ms"] = latencies[-1] * 1000
+        return summary
@@ -2,6 +2,12 @@
 #define COMMANDS_H
 
 #include <Arduino.h>
+
+// UDP port of the binary control channel, see control_udp.cpp
+#define CONTROL_UDP_PORT 8082
+
 void handleCommand(String command);
+void driveMotors(int direction, int duty);
+void startControlChannel();
 
-#endif 
\ No newline at end of file
+#endif
@@ -0,0 +1,76 @@
+import time
+
+import cv2
+import numpy as np
+import tkinter as tk
+from PIL import Image, ImageTk
+
+
+class RgbaFrame:
+    """Reused RGBA buffer and a PIL image sharing it, refilled from BGR frames.
+
+    Pillow only maps 4-byte pixel buffers without copying, hence RGBA.
+    """
+
+    def __init__(self):
+        self.array = None
+        self.image = None
+
+    def update(self, frame):
+        """Convert a BGR frame into the buffer, returns True if it was (re)allocated"""
+        height, width = frame.shape[:2]
+        resized = self.array is None or self.array.shape[:2] != (height, width)
+        if resized:
+            # The PIL image shares the buffer, both are replaced together
+            self.array = np.empty((height, width, 4), dtype=np.uint8)
+            self.image = Image.frombuffer("RGBA", (width, height), self.array, "raw", "RGBA", 0, 1)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGBA, dst=self.array)
+        return resized
+
+
+class VideoCompositor:
+    """Shows frames on a Tk canvas without allocating per frame.
+
+    One canvas image item and one PhotoImage live for the whole session;
+    each frame is converted into a reused RgbaFrame and pasted into the
+    PhotoImage. The image item stays below the canvas text labels.
+    """
+
+    def __init__(self, canvas, visibility_interval=0.5):
+        self.canvas = canvas
+        self.image_item = canvas.create_image(0, 0, anchor=tk.NW)
+        canvas.tag_lower(self.image_item)  # Keep the text labels on top
+        self.photo = None
+        self._rgba = RgbaFrame()
+
+        # Window visibility is polled, not checked on every frame
+        self.visibility_interval = visibility_interval
+        self._visible = True
+        self._visibility_checked = 0.0
+
+        self.frames_shown = 0
+        self.frames_skipped = 0
+
+    def visible(self):
+        """False while the window is minimized, withdrawn or unmapped"""
+        now = time.monotonic()
+        if now - self._visibility_checked >= self.visibility_interval:
+            self._visibility_checked = now
+            top = self.canvas.winfo_toplevel()
+            self._visible = (top.state() not in ("iconic", "withdrawn")
+                             and bool(self.canvas.winfo_viewable()))
+        return self._visible
+
+    def show(self, frame):
+        """Display a BGR frame, returns False if the window is hidden"""
+        if not self.visible():
+            self.frames_skipped += 1
+            return False
+
+        if self._rgba.update(frame):
+            # New frame size, the PhotoImage is sized to match
+            self.photo = ImageTk.PhotoImage(self._rgba.image)
+            self.canvas.itemconfig(self.image_item, image=self.photo)
+        self.photo.paste(self._rgba.image)
+        self.frames_shown += 1
+        return True
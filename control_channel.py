@@ -0,0 +1,229 @@
+"""Binary motor control over UDP, falling back to the HTTP /control API.
+
+Every message is one 16 byte little-endian frame:
+
+    magic      2s  b"RC"
+    version    B   1
+    type       B   MSG_DRIVE or MSG_PING; replies have ACK_FLAG set, and
+                   STALE_FLAG too if the rover ignored the frame because
+                   it already applied a newer one
+    seq        I   per-client sequence number, increases with every frame
+    timestamp  I   sender's clock in ms, echoed back in the reply
+    direction  B   command code, 1 forward, 2 left, 3 stop, 4 right, 5 backward
+    speed      B   motor PWM duty 0-255
+    session    H   random per client, a new session resets the sequence
+
+The rover answers every frame with the same frame, type changed to the
+reply type. The client has one frame in flight and resends it until the
+reply with its sequence number arrives, so a lost stop is never silently
+dropped and a late duplicate can't undo a newer command.
+"""
+import random
+import socket
+import struct
+import time
+from collections import namedtuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+CONTROL_PORT = 8082
+FRAME = struct.Struct("<2sBBIIBBH")
+MAGIC = b"RC"
+VERSION = 1
+
+MSG_DRIVE = 1
+MSG_PING = 2
+ACK_FLAG = 0x80
+STALE_FLAG = 0x40
+
+ControlFrame = namedtuple("ControlFrame", ["type", "seq", "timestamp", "direction", "speed",
+                                           "session"])
+
+
+def pack_frame(msg_type, seq, timestamp, direction=0, speed=0, session=0):
+    return FRAME.pack(MAGIC, VERSION, msg_type, seq & 0xFFFFFFFF, timestamp & 0xFFFFFFFF,
+                      direction, speed, session)
+
+
+def unpack_frame(data):
+    """Decode a frame, None if it isn't one"""
+    if len(data) != FRAME.size:
+        return None
+    magic, version, msg_type, seq, timestamp, direction, speed, session = FRAME.unpack(data)
+    if magic != MAGIC or version != VERSION:
+        return None
+    return ControlFrame(msg_type, seq, timestamp, direction, speed, session)
+
+
+def now_ms():
+    return int(time.time() * 1000) & 0xFFFFFFFF
+
+
+class UdpControlChannel:
+    """One UDP socket to the rover's control port, frames acknowledged by sequence number"""
+
+    def __init__(self, host, port=CONTROL_PORT, timeout=0.1, retries=3):
+        self.address = (host, port)
+        self.timeout = timeout  # Seconds to wait for a reply before resending
+        self.retries = retries
+        self.session = random.randrange(1, 0x10000)
+        self.seq = 0
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.connect(self.address)  # Only replies from the rover are received
+
+        self.resends = 0
+        self.stale = 0
+
+    def request(self, msg_type, direction=0, speed=0):
+        """Send one frame and wait for its reply, returns the reply frame or None"""
+        self.seq += 1
+        data = pack_frame(msg_type, self.seq, now_ms(), direction, speed, self.session)
+        for attempt in range(self.retries):
+            if attempt:
+                self.resends += 1
+            try:
+                self.sock.send(data)
+                deadline = time.perf_counter() + self.timeout
+                while True:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self.sock.settimeout(remaining)
+                    reply = unpack_frame(self.sock.recv(64))
+                    # Replies to earlier, already given up frames are skipped
+                    if reply is not None and reply.seq == self.seq and reply.type & ACK_FLAG:
+                        if reply.type & STALE_FLAG:
+                            self.stale += 1
+                        return reply
+            except socket.timeout:
+                continue
+            except OSError:
+                # ICMP port unreachable shows up as a refused connection
+                time.sleep(self.timeout)
+        return None
+
+    def ping(self, send_only=False):
+        """Round trip without touching the motors; send_only fires it and returns at once"""
+        if send_only:
+            self.seq += 1
+            try:
+                self.sock.send(pack_frame(MSG_PING, self.seq, now_ms(), session=self.session))
+            except OSError:
+                pass
+            return None
+        return self.request(MSG_PING)
+
+    def answered(self):
+        """Drain replies without waiting, True if any reply from the rover was waiting"""
+        seen = False
+        self.sock.settimeout(0)
+        try:
+            while True:
+                reply = unpack_frame(self.sock.recv(64))
+                seen = seen or (reply is not None and reply.type & ACK_FLAG)
+        except (BlockingIOError, socket.timeout, OSError):
+            pass
+        return bool(seen)
+
+    def close(self):
+        self.sock.close()
+
+
+class RoverClient:
+    """Motor commands and speed for one rover, over UDP when it answers there.
+
+    Falls back to GET /control?command= (and ?var=speed&val=) on rovers
+    without the UDP channel or when it stops answering. While on HTTP a
+    ping goes out every retry_interval seconds without waiting for it;
+    as soon as a reply shows up, commands move back to UDP.
+    """
+
+    def __init__(self, control_url, udp_port=CONTROL_PORT, use_udp=True, timeout=1.0,
+                 udp_timeout=0.1, udp_retries=3, retry_interval=5.0):
+        self.control_url = control_url
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.channel = None
+        if use_udp and udp_port:
+            host = urlparse(control_url).hostname
+            try:
+                self.channel = UdpControlChannel(host, udp_port, udp_timeout, udp_retries)
+            except OSError as e:
+                print(f"UDP control channel unavailable: {e}")
+        self.udp_up = self.channel is not None  # Tried first until it fails once
+        self.last_ping = 0.0
+        self.speed = 255  # The firmware's default
+        self.udp_fallbacks = 0
+
+    @property
+    def transport(self):
+        return "udp" if self.udp_up else "http"
+
+    def _check_udp(self):
+        """While on HTTP, see if the UDP channel has come back"""
+        if self.channel is None or self.udp_up:
+            return
+        if self.channel.answered():
+            self.udp_up = True
+            print("UDP control channel is back")
+            return
+        now = time.time()
+        if now - self.last_ping >= self.retry_interval:
+            self.last_ping = now
+            self.channel.ping(send_only=True)
+
+    def send_command(self, command):
+        """Send a motor command, returns True once the rover acknowledged it"""
+        self._check_udp()
+        if self.udp_up:
+            reply = self.channel.request(MSG_DRIVE, int(command), self.speed)
+            if reply is not None:
+                return True
+            self.udp_up = False
+            self.udp_fallbacks += 1
+            self.last_ping = time.time()
+            print("UDP control channel not answering, falling back to HTTP")
+        response = self.session.get(self.control_url, params={"command": command},
+                                    timeout=self.timeout)
+        if response.status_code != 200:
+            print(f"Command failed with status: {response.status_code}")
+            return False
+        return True
+
+    def set_speed(self, speed):
+        """Set the motor speed, it takes effect with the next command.
+
+        Over UDP the speed travels in every drive frame, so nothing is sent here.
+        """
+        self._check_udp()
+        if self.udp_up:
+            self.speed = speed
+            return True
+        response = self.session.get(self.control_url, params={"var": "speed", "val": speed},
+                                    timeout=self.timeout)
+        if response.status_code != 200:
+            print(f"Speed update failed with status: {response.status_code}")
+            return False
+        self.speed = speed
+        return True
+
+    def close(self):
+        self.session.close()
+        if self.channel is not None:
+            self.channel.close()
+
+    def stats(self):
+        stats = {"transport": self.transport, "udp_fallbacks": self.udp_fallbacks}
+        if self.channel is not None:
+            stats["udp_resends"] = self.channel.resends
+            stats["udp_stale"] = self.channel.stale
+        return stats
@@ -0,0 +1,82 @@
+// Binary motor control channel over UDP, see control_channel.py for the client side
+#include <Arduino.h>
+#include "lwip/sockets.h"
+#include "globals.h"
+#include "commands.h"
+
+#define CONTROL_MAGIC_0 'R'
+#define CONTROL_MAGIC_1 'C'
+#define CONTROL_VERSION 1
+#define MSG_DRIVE 1
+#define ACK_FLAG 0x80
+#define STALE_FLAG 0x40
+
+typedef struct __attribute__((packed)) {
+    uint8_t magic[2];
+    uint8_t version;
+    uint8_t type;
+    uint32_t seq;
+    uint32_t timestamp;
+    uint8_t direction;
+    uint8_t speed;
+    uint16_t session;
+} control_frame_t;
+
+static void control_task(void *arg) {
+    int sock = socket(AF_INET, SOCK_DGRAM, IPPROTO_UDP);
+    if (sock < 0) {
+        Serial.println("Control channel: socket failed");
+        vTaskDelete(NULL);
+        return;
+    }
+    struct sockaddr_in addr = {};
+    addr.sin_family = AF_INET;
+    addr.sin_port = htons(CONTROL_UDP_PORT);
+    addr.sin_addr.s_addr = htonl(INADDR_ANY);
+    if (bind(sock, (struct sockaddr *)&addr, sizeof(addr)) < 0) {
+        Serial.println("Control channel: bind failed");
+        close(sock);
+        vTaskDelete(NULL);
+        return;
+    }
+    Serial.printf("Control channel on udp port %d\n", CONTROL_UDP_PORT);
+
+    uint16_t session = 0;
+    uint32_t last_seq = 0;
+    control_frame_t frame;
+    while (true) {
+        struct sockaddr_in source;
+        socklen_t source_len = sizeof(source);
+        int len = recvfrom(sock, &frame, sizeof(frame), 0, (struct sockaddr *)&source, &source_len);
+        if (len != sizeof(frame) || frame.magic[0] != CONTROL_MAGIC_0
+                || frame.magic[1] != CONTROL_MAGIC_1 || frame.version != CONTROL_VERSION) {
+            continue;
+        }
+
+        // A client that restarted starts counting from 1 again
+        if (frame.session != session) {
+            session = frame.session;
+            last_seq = 0;
+        }
+        uint8_t reply_type = frame.type | ACK_FLAG;
+        if (frame.type == MSG_DRIVE) {
+            if (frame.seq > last_seq) {
+                last_seq = frame.seq;
+                speed = frame.speed;
+                driveMotors(frame.direction, frame.speed);
+            } else {
+                // Resent or reordered frame, a newer command was already applied
+                reply_type |= STALE_FLAG;
+            }
+        }
+
+        // Echo the frame back as the acknowledgement, the client matches it by seq
+        frame.type = reply_type;
+        sendto(sock, &frame, sizeof(frame), 0, (struct sockaddr *)&source, source_len);
+    }
+}
+
+void startControlChannel() {
+    // Above the HTTP server tasks (priority 5) so commands don't wait behind stream frames
+    xTaskCreatePinnedToCore(control_task, "control_udp", 4096, NULL, 6, NULL, 1);
+}
@@ -0,0 +1,137 @@
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+# Detections after NMS, sorted by confidence (highest first)
+#   boxes:       (N, 4) int32 array of x, y, w, h in frame pixels
+#   confidences: (N,) float32 array
+#   class_ids:   (N,) int32 array
+Detections = namedtuple("Detections", ["boxes", "confidences", "class_ids"])
+
+
+def empty_detections():
+    return Detections(
+        np.empty((0, 4), dtype=np.int32),
+        np.empty((0,), dtype=np.float32),
+        np.empty((0,), dtype=np.int32)
+    )
+
+
+def decode_yolo_candidates(outs, frame_size, confidence_threshold=0.5):
+    """Threshold and scale raw YOLO output layers, before NMS.
+
+    Returns Detections in no particular order, boxes in frame_size (w, h) pixels.
+    """
+    width, height = frame_size
+
+    # Stack every output head into one (rows, 5 + classes) array
+    if len(outs) == 1:
+        predictions = outs[0].reshape(-1, outs[0].shape[-1])
+    else:
+        predictions = np.concatenate([out.reshape(-1, out.shape[-1]) for out in outs])
+
+    # Class scores are already scaled by objectness, so rows below the threshold
+    # on objectness can never pass and are dropped before the argmax
+    predictions = predictions[predictions[:, 4] > confidence_threshold]
+    if len(predictions) == 0:
+        return empty_detections()
+
+    scores = predictions[:, 5:]
+    class_ids = scores.argmax(axis=1)
+    confidences = scores[np.arange(len(scores)), class_ids]
+
+    keep = confidences > confidence_threshold
+    if not keep.any():
+        return empty_detections()
+    predictions = predictions[keep]
+    class_ids = class_ids[keep].astype(np.int32)
+    confidences = confidences[keep].astype(np.float32)
+
+    # Scale normalized center/size to frame pixels and convert to top-left corner
+    scale = np.array([width, height, width, height], dtype=np.float32)
+    boxes = predictions[:, :4] * scale
+    boxes[:, :2] -= boxes[:, 2:] / 2
+    boxes = boxes.astype(np.int32)
+
+    return Detections(boxes, confidences, class_ids)
+
+
+def non_max_suppression(candidates, confidence_threshold=0.5, nms_threshold=0.4):
+    """Run NMS over candidate detections, result is sorted by confidence"""
+    if len(candidates.boxes) == 0:
+        return candidates
+    indexes = cv2.dnn.NMSBoxes(
+        candidates.boxes.tolist(), candidates.confidences.tolist(),
+        confidence_threshold, nms_threshold
+    )
+    indexes = np.asarray(indexes, dtype=np.int64).reshape(-1)
+    if len(indexes) == 0:
+        return empty_detections()
+
+    return Detections(
+        candidates.boxes[indexes], candidates.confidences[indexes], candidates.class_ids[indexes]
+    )
+
+
+def decode_yolo_outputs(outs, frame_size, confidence_threshold=0.5, nms_threshold=0.4):
+    """Turn raw YOLO output layers into NMS-filtered detections scaled to frame_size (w, h)"""
+    candidates = decode_yolo_candidates(outs, frame_size, confidence_threshold)
+    return non_max_suppression(candidates, confidence_threshold, nms_threshold)
+
+
+def detection_labels(detections, classes, limit=None):
+    """Return "label: confidence" strings for the detections"""
+    labels = []
+    for class_id, confidence in zip(detections.class_ids[:limit], detections.confidences[:limit]):
+        labels.append(f"{classes[class_id]}: {confidence:.2f}")
+    return labels
+
+
+def find_target(detections, classes, target_label, track_id=None):
+    """Return the index of the target_label detection to follow, or None.
+
+    For tracked results the track with track_id is kept while it exists,
+    otherwise the most confident detection of target_label is picked.
+    """
+    if target_label not in classes:
+        return None
+    matches = np.flatnonzero(detections.class_ids == classes.index(target_label))
+    if len(matches) == 0:
+        return None
+    if track_id is not None and hasattr(detections, "track_ids"):
+        same_track = matches[detections.track_ids[matches] == track_id]
+        if len(same_track):
+            return int(same_track[0])
+    return int(matches[0])  # Detections are sorted by confidence
+
+
+_band_fills = {}
+
+
+def draw_overlay_band(frame, alpha=0.3, color=(0, 0, 0), height=120):
+    """Darken the top of the frame so overlay text stays readable.
+
+    Only the band rows are blended, in place, against a cached solid fill.
+    """
+    band = frame[:height + 1]  # cv2.rectangle's bottom edge is inclusive
+    key = (band.shape, tuple(color))
+    fill = _band_fills.get(key)
+    if fill is None:
+        fill = _band_fills[key] = np.full(band.shape, color, dtype=frame.dtype)
+    cv2.addWeighted(fill, alpha, band, 1 - alpha, 0, band)
+    return frame
+
+
+def draw_detections(frame, detections, classes, target_label=None):
+    """Draw boxes and labels, the target class in green and the rest in blue"""
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    track_ids = getattr(detections, "track_ids", [None] * len(detections.boxes))
+    for (x, y, w, h), confidence, class_id, track_id in zip(
+            detections.boxes, detections.confidences, detections.class_ids, track_ids):
+        label = str(classes[class_id])
+        color = (0, 255, 0) if label == target_label else (255, 0, 0)
+        cv2.rectangle(frame, (int(x), int(y)), (int(x + w), int(y + h)), color, 2)
+        text = f'{label} {confidence:.2f}' if track_id is None else f'{label} #{track_id} {confidence:.2f}'
+        cv2.putText(frame, text, (int(x), int(y) - 5), font, 0.5, (255, 255, 255), 2)
+    return frame
@@ -0,0 +1,347 @@
+import os
+import time
+
+import cv2
+import numpy as np
+
+from concurrent.futures import ThreadPoolExecutor
+
+from detection import Detections, decode_yolo_candidates, empty_detections, non_max_suppression
+
+# Known models. "accuracy" is the published COCO mAP@0.5 and is what the
+# auto-benchmark compares against the configured accuracy floor.
+MODEL_PRESETS = {
+    "yolov3": {
+        "type": "darknet",
+        "cfg": "yolov3.cfg",
+        "weights": "yolov3.weights",
+        "accuracy": 55.3,
+    },
+    "yolov4-tiny": {
+        "type": "darknet",
+        "cfg": "yolov4-tiny.cfg",
+        "weights": "yolov4-tiny.weights",
+        "accuracy": 40.2,
+    },
+    "yolov3-tiny": {
+        "type": "darknet",
+        "cfg": "yolov3-tiny.cfg",
+        "weights": "yolov3-tiny.weights",
+        "accuracy": 33.1,
+    },
+    "yolov3-onnx": {
+        "type": "onnx",
+        "model": "yolov3.onnx",
+        "accuracy": 55.3,
+    },
+}
+
+DNN_BACKENDS = {
+    "default": "DNN_BACKEND_DEFAULT",
+    "opencv": "DNN_BACKEND_OPENCV",
+    "openvino": "DNN_BACKEND_INFERENCE_ENGINE",
+    "cuda": "DNN_BACKEND_CUDA",
+}
+
+DNN_TARGETS = {
+    "cpu": "DNN_TARGET_CPU",
+    "opencl": "DNN_TARGET_OPENCL",
+    "opencl_fp16": "DNN_TARGET_OPENCL_FP16",
+    "cuda": "DNN_TARGET_CUDA",
+    "cuda_fp16": "DNN_TARGET_CUDA_FP16",
+}
+
+
+def load_classes(path="coco.names"):
+    with open(path, "r") as f:
+        return [line.strip() for line in f.readlines()]
+
+
+class DetectorEngine:
+    """Base class for YOLO engines: load() once, then detect(frame) per frame"""
+
+    name = "base"
+
+    def __init__(self, input_size=(320, 320), confidence_threshold=0.5, nms_threshold=0.4,
+                 accuracy=None):
+        self.input_size = input_size
+        self.confidence_threshold = confidence_threshold
+        self.nms_threshold = nms_threshold
+        self.accuracy = accuracy
+        self.resizable = True  # input_size may be changed between frames
+        self.batchable = True  # forward() accepts a blob of several frames
+        self.thread_safe = False  # forward() may run on several threads at once
+        self.loaded = False
+        self._pool = None
+
+    def is_available(self):
+        """True if the model files and runtime needed by this engine are present"""
+        return False
+
+    def load(self):
+        raise NotImplementedError
+
+    def make_blob(self, frame):
+        return cv2.dnn.blobFromImage(
+            frame,
+            1/255.0,
+            self.input_size,
+            swapRB=True,
+            crop=False
+        )
+
+    def make_batch_blob(self, frames):
+        return cv2.dnn.blobFromImages(
+            frames,
+            1/255.0,
+            self.input_size,
+            swapRB=True,
+            crop=False
+        )
+
+    def forward(self, blob):
+        """Run the network on a blob and return the raw darknet-style output layers"""
+        raise NotImplementedError
+
+    def infer(self, frame):
+        return self.forward(self.make_blob(frame))
+
+    def candidates(self, outs, frame):
+        """Thresholded detections scaled to the frame size, before NMS"""
+        height, width = frame.shape[:2]
+        return decode_yolo_candidates(outs, (width, height), self.confidence_threshold)
+
+    def decode(self, outs, frame):
+        """Turn raw output layers into Detections scaled to the frame size"""
+        return non_max_suppression(
+            self.candidates(outs, frame), self.confidence_threshold, self.nms_threshold
+        )
+
+    def detect(self, frame):
+        """Return Detections scaled to the frame size"""
+        return self.decode(self.infer(frame), frame)
+
+    def detect_batch(self, frames):
+        """Return one Detections per frame, from a single forward pass when batchable"""
+        if len(frames) == 1 or not self.batchable:
+            return [self.detect(frame) for frame in frames]
+        outs = self.forward(self.make_batch_blob(frames))
+        return [self.decode(frame_outs, frame)
+                for frame_outs, frame in zip(split_batch_outputs(outs, len(frames)), frames)]
+
+    def detect_regions(self, frame, regions):
+        """Detect in each (x, y, w, h) region of frame, merged by one NMS in frame pixels.
+
+        Each region is resized to input_size on its own, so small regions are
+        seen at full resolution. The regions run as one batched forward pass
+        when batchable, otherwise concurrently when thread_safe.
+        """
+        crops = [frame[y:y + h, x:x + w] for x, y, w, h in regions]
+        if len(crops) > 1 and self.batchable:
+            outs = self.forward(self.make_batch_blob(crops))
+            per_crop = split_batch_outputs(outs, len(crops))
+        elif len(crops) > 1 and self.thread_safe:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="regions")
+            per_crop = list(self._pool.map(self.infer, crops))
+        else:
+            per_crop = [self.infer(crop) for crop in crops]
+
+        boxes, confidences, class_ids = [], [], []
+        for (x, y, _, _), crop, outs in zip(regions, crops, per_crop):
+            found = self.candidates(outs, crop)
+            if len(found.boxes):
+                boxes.append(found.boxes + np.array([x, y, 0, 0], dtype=np.int32))
+                confidences.append(found.confidences)
+                class_ids.append(found.class_ids)
+        if not boxes:
+            return empty_detections()
+        merged = Detections(np.concatenate(boxes), np.concatenate(confidences),
+                            np.concatenate(class_ids))
+        # Objects cut by a region border or seen by overlapping regions collapse here
+        return non_max_suppression(merged, self.confidence_threshold, self.nms_threshold)
+
+
+def split_batch_outputs(outs, batch_size):
+    """Split the output layers of a batched forward pass into per-frame layers.
+
+    Layers come back either as (batch, rows, values) or with the batch
+    flattened into the rows, both are handled.
+    """
+    per_frame = [[] for _ in range(batch_size)]
+    for out in outs:
+        out = out.reshape(batch_size, -1, out.shape[-1])
+        for i in range(batch_size):
+            per_frame[i].append(out[i])
+    return per_frame
+
+
+class OpenCVDarknetEngine(DetectorEngine):
+    """Darknet cfg/weights through cv2.dnn with explicit backend, target and thread count"""
+
+    def __init__(self, cfg, weights, backend="opencv", target="cpu", threads=None, **kwargs):
+        super().__init__(**kwargs)
+        self.cfg = cfg
+        self.weights = weights
+        self.backend = backend
+        self.target = target
+        self.threads = threads
+        self.name = f"{os.path.splitext(os.path.basename(cfg))[0]}/{backend}/{target}"
+        self.net = None
+        self.output_layers = None
+
+    def is_available(self):
+        return os.path.exists(self.cfg) and os.path.exists(self.weights)
+
+    def load(self):
+        if self.threads:
+            cv2.setNumThreads(self.threads)
+        self.net = cv2.dnn.readNetFromDarknet(self.cfg, self.weights)
+        self.net.setPreferableBackend(getattr(cv2.dnn, DNN_BACKENDS[self.backend]))
+        self.net.setPreferableTarget(getattr(cv2.dnn, DNN_TARGETS[self.target]))
+        layer_names = self.net.getLayerNames()
+        unconnected = np.asarray(self.net.getUnconnectedOutLayers()).reshape(-1)
+        self.output_layers = [layer_names[i - 1] for i in unconnected]
+        self.loaded = True
+
+    def forward(self, blob):
+        self.net.setInput(blob)
+        return self.net.forward(self.output_layers)
+
+
+class OnnxRuntimeEngine(DetectorEngine):
+    """YOLO exported to ONNX, run with ONNX Runtime on the CPU.
+
+    The model must output rows of (cx, cy, w, h, objectness, class scores...).
+    Set pixel_boxes if boxes are in input pixels rather than normalized, and
+    raw_class_scores if class scores are not yet multiplied by objectness
+    (as in YOLOv5 style exports).
+    """
+
+    def __init__(self, model, threads=None, pixel_boxes=False, raw_class_scores=False, **kwargs):
+        super().__init__(**kwargs)
+        self.model = model
+        self.threads = threads
+        self.pixel_boxes = pixel_boxes
+        self.raw_class_scores = raw_class_scores
+        self.name = f"{os.path.splitext(os.path.basename(model))[0]}/onnxruntime/cpu"
+        self.session = None
+        self.input_name = None
+
+    def is_available(self):
+        if not os.path.exists(self.model):
+            return False
+        try:
+            import onnxruntime  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def load(self):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self.threads:
+            options.intra_op_num_threads = self.threads
+        self.session = ort.InferenceSession(
+            self.model, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        # A fixed batch dimension means one frame per run
+        self.batchable = not isinstance(model_input.shape[0], int)
+        self.thread_safe = True  # InferenceSession.run may be called concurrently
+        # Models exported with a fixed input size can't be resized at runtime
+        height, width = model_input.shape[2:4]
+        if isinstance(width, int) and isinstance(height, int):
+            self.input_size = (width, height)
+            self.resizable = False
+        self.loaded = True
+
+    def forward(self, blob):
+        outs = self.session.run(None, {self.input_name: blob})
+        outs = [out.reshape(-1, out.shape[-1]) for out in outs]
+        if self.pixel_boxes or self.raw_class_scores:
+            outs = [out.astype(np.float32, copy=True) for out in outs]
+            for out in outs:
+                if self.pixel_boxes:
+                    out[:, [0, 2]] /= self.input_size[0]
+                    out[:, [1, 3]] /= self.input_size[1]
+                if self.raw_class_scores:
+                    out[:, 5:] *= out[:, 4:5]
+        return outs
+
+
+def create_engine(preset, backend="opencv", target="cpu", threads=None, **kwargs):
+    """Build an engine from a MODEL_PRESETS entry"""
+    config = MODEL_PRESETS[preset]
+    kwargs.setdefault("accuracy", config["accuracy"])
+    if config["type"] == "darknet":
+        return OpenCVDarknetEngine(
+            config["cfg"], config["weights"], backend=backend, target=target,
+            threads=threads, **kwargs
+        )
+    if config["type"] == "onnx":
+        return OnnxRuntimeEngine(config["model"], threads=threads, **kwargs)
+    raise ValueError(f"Unknown engine type: {config['type']}")
+
+
+def benchmark_engine(engine, frame, runs=10, warmup=2):
+    """Load the engine if needed and time detect() on frame, returns a result dict"""
+    result = {"name": engine.name, "accuracy": engine.accuracy}
+    if not engine.loaded:
+        start = time.perf_counter()
+        engine.load()
+        result["load_ms"] = (time.perf_counter() - start) * 1000
+
+    for _ in range(warmup):
+        engine.detect(frame)
+
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        engine.detect(frame)
+        times.append(time.perf_counter() - start)
+    times.sort()
+
+    result["mean_ms"] = sum(times) / len(times) * 1000
+    result["p50_ms"] = times[len(times) // 2] * 1000
+    result["fps"] = 1000.0 / result["mean_ms"]
+    return result
+
+
+def auto_select_engine(presets=None, min_accuracy=0.0, frame=None, runs=10, **engine_kwargs):
+    """Benchmark every available preset and return (fastest engine, results).
+
+    Engines whose nominal accuracy is below min_accuracy are skipped. The
+    returned engine is already loaded. Returns (None, results) if none qualify.
+    """
+    if frame is None:
+        frame = np.random.randint(0, 256, (480, 640, 3), dtype=np.uint8)
+
+    best, best_time = None, None
+    results = []
+    for preset in (presets or MODEL_PRESETS.keys()):
+        engine = create_engine(preset, **engine_kwargs)
+        if not engine.is_available():
+            print(f"Benchmark: {preset} not available, skipping")
+            continue
+        if engine.accuracy is not None and engine.accuracy < min_accuracy:
+            print(f"Benchmark: {preset} below accuracy floor ({engine.accuracy} < {min_accuracy})")
+            continue
+        try:
+            result = benchmark_engine(engine, frame, runs=runs)
+        except Exception as e:
+            print(f"Benchmark: {preset} failed: {e}")
+            continue
+        result["preset"] = preset
+        results.append(result)
+        print(f"Benchmark: {engine.name} {result['mean_ms']:.1f} ms ({result['fps']:.1f} FPS)")
+
+        if best_time is None or result["mean_ms"] < best_time:
+            best, best_time = engine, result["mean_ms"]
+
+    if best is not None:
+        print(f"Benchmark: selected {best.name}")
+    return best, results
@@ -0,0 +1,196 @@
+"""Camera and flash settings kept in sync with the rover from a background thread.
+
+The sliders call set() on every tick of a drag. Nothing goes out until the
+values have stopped changing for `settle` seconds, then only the fields
+that differ from the rover's known state are sent, all in one request:
+
+    GET /settings?framesize=8&quality=20   -> status JSON
+
+The known state comes from GET /status when the thread starts and from the
+answer to every /settings request. Firmware without /settings gets one
+GET /control?var=&val= per field instead.
+"""
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class DeviceSettings:
+    """Coalesces setting changes and sends the settled values without blocking the caller"""
+
+    def __init__(self, control_url, settle=0.3, timeout=2.0, local=None):
+        self.control_url = control_url
+        base_url = control_url.rsplit("/", 1)[0]
+        self.status_url = f"{base_url}/status"
+        self.settings_url = f"{base_url}/settings"
+        self.settle = settle  # Seconds without changes before anything is sent
+        self.timeout = timeout
+        # Settings that aren't sent here but handed to a callable(value) once
+        # settled, e.g. speed, which travels with the motor commands
+        self.local = dict(local or {})
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.state = {}  # Last known value of every setting on the rover
+        self.loaded = False  # state has been read from /status
+        self.batch_supported = True  # Cleared when the firmware has no /settings
+        self._desired = {}  # Values set since the last send
+        self._changed_at = 0.0
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+        self._listeners = []
+
+        # Counters
+        self.changes = 0  # set() calls
+        self.batches = 0  # Requests sent
+        self.fields_sent = 0
+        self.unchanged = 0  # Settled on the value the rover already had
+        self.failed = 0
+
+    def start(self):
+        """Start the sync thread, it reads the rover's state first"""
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="DeviceSettings", daemon=True)
+        self._thread.start()
+
+    def close(self, timeout=2.0):
+        """Send what is still waiting, then stop the sync thread"""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.session.close()
+
+    def add_listener(self, callback):
+        """Register callback(state) called on the sync thread whenever state is updated"""
+        self._listeners.append(callback)
+
+    def set(self, name, value, settle=True):
+        """Queue a setting, never blocks. settle=False sends it without waiting for more changes."""
+        value = int(value)
+        with self._cond:
+            self._desired[name] = value
+            self._changed_at = time.perf_counter() if settle else 0.0
+            self.changes += 1
+            self._cond.notify_all()
+
+    def get(self, name, default=None):
+        """The value a setting has or is about to have"""
+        with self._cond:
+            if name in self._desired:
+                return self._desired[name]
+            return self.state.get(name, default)
+
+    def pending(self):
+        with self._cond:
+            return dict(self._desired)
+
+    def _run(self):
+        self._load_state()
+        while True:
+            with self._cond:
+                while self._running:
+                    if self._desired:
+                        remaining = self._changed_at + self.settle - time.perf_counter()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                    else:
+                        self._cond.wait()
+                if not self._desired:
+                    break  # Closed and fully drained
+                settled, self._desired = self._desired, {}
+                # Local settings are always applied: others change them too
+                # (the follow controller sets the motor speed), so the state
+                # cached from the rover's replies can't say they are in place
+                changed = {name: value for name, value in settled.items()
+                           if name in self.local or self.state.get(name) != value}
+                self.unchanged += len(settled) - len(changed)
+
+            for name in [name for name in changed if name in self.local]:
+                value = changed.pop(name)
+                try:
+                    self.local[name](value)
+                    self._update_state({name: value})
+                except Exception as e:
+                    print(f"Error applying {name}: {e}")
+            if changed:
+                self._send(changed)
+
+    def _load_state(self):
+        try:
+            response = self.session.get(self.status_url, timeout=self.timeout)
+            if response.status_code == 200:
+                self._update_state(response.json())
+                self.loaded = True
+        except Exception as e:
+            print(f"Could not read the device state: {e}")
+
+    def _send(self, changed):
+        start = time.perf_counter()
+        try:
+            if self.batch_supported:
+                response = self.session.get(self.settings_url, params=changed,
+                                            timeout=self.timeout)
+                if response.status_code == 404:
+                    self.batch_supported = False
+                    print("No /settings on the rover, sending settings one by one")
+            if not self.batch_supported:
+                for name, value in changed.items():
+                    response = self.session.get(self.control_url,
+                                                params={"var": name, "val": value},
+                                                timeout=self.timeout)
+                    if response.status_code != 200:
+                        break
+            if response.status_code != 200:
+                print(f"Settings update failed with status: {response.status_code}")
+                self.failed += 1
+                return False
+        except Exception as e:
+            # state keeps the old values, setting the same value again retries it
+            print(f"Error updating settings: {e}")
+            self.failed += 1
+            return False
+
+        self.batches += 1
+        self.fields_sent += len(changed)
+        state = dict(changed)
+        if self.batch_supported:
+            try:
+                state.update(response.json())  # What the rover actually ended up with
+            except ValueError:
+                pass
+        self._update_state(state)
+        print(f"Settings updated: {changed} ({(time.perf_counter() - start) * 1000:.0f} ms)")
+        return True
+
+    def _update_state(self, values):
+        with self._cond:
+            self.state.update(values)
+            state = dict(self.state)
+        for callback in self._listeners:
+            try:
+                callback(state)
+            except Exception as e:
+                print(f"Error in settings listener: {e}")
+
+    def stats(self):
+        return {
+            "loaded": self.loaded,
+            "changes": self.changes,
+            "batches": self.batches,
+            "fields_sent": self.fields_sent,
+            "unchanged": self.unchanged,
+            "failed": self.failed,
+            "pending": len(self._desired),
+        }
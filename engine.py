@@ -0,0 +1,929 @@
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from capture import FrameGrabber
+from command_dispatcher import CommandDispatcher
+from control_channel import CONTROL_PORT
+from device_settings import DeviceSettings
+from detection import Detections, detection_labels, draw_detections, draw_overlay_band, find_target
+from detectors import auto_select_engine, create_engine, load_classes
+from follow_controller import FollowController
+from governor import DetectionGovernor, StreamGovernor
+from hands import PALM_LANDMARK, HandTracker, draw_hand_landmarks
+from inference_worker import InferenceWorker
+from latency import LatencyTracker
+from metrics import JsonlMetricsWriter, Metrics, MetricsServer
+from mjpeg_stream import MjpegStream
+from model_loader import BackgroundLoader
+from roi_detection import RegionDetector
+from motion_gate import MotionGate
+from recorder import SessionRecorder, SessionReplay
+from scheduler import StageScheduler
+from tracker import MultiObjectTracker
+
+
+class PerceptionEngine:
+    """Capture, object detection, hand following and robot control without any UI.
+
+    The GUI is one front end; headless runs create the engine with
+    render=False, which skips all drawing and overlay compositing.
+    Call step() as often as possible, it returns None until a new frame
+    has arrived.
+    """
+
+    def __init__(self, control_url, detector_model="yolov3", detector_backend="opencv",
+                 detector_target="cpu", detector_threads=None, detector_min_accuracy=30.0,
+                 inference_mode="inline", hands_in_worker=True, hand_roi=True, render=True,
+                 send_commands=True, native_mjpeg=True, control_udp_port=CONTROL_PORT,
+                 adaptive_stream=False, stream_framesizes=(5, 10), stream_qualities=(10, 40),
+                 stream_target_fps=15.0, region_detection=False, classes_path="coco.names"):
+        self.render = render
+        self.send_commands = send_commands
+        self.detector_model = detector_model
+        self.detector_backend = detector_backend
+        self.detector_target = detector_target
+        self.detector_threads = detector_threads
+        self.detector_min_accuracy = detector_min_accuracy
+
+        # Capture
+        self.cap = None
+        self.grabber = None  # Background capture thread, latest frame wins
+        self.source = None
+        self.connecting = False  # A connect_in_background attempt is running
+        # Read http streams with MjpegStream instead of cv2.VideoCapture
+        self.native_mjpeg = native_mjpeg
+        # Recorded sessions (directories) replay at their original pace unless False
+        self.replay_realtime = True
+
+        # Raw JPEGs and per-frame events go to a SessionRecorder while recording
+        self.recorder = None
+        self.recording_warned = False
+
+        # Modes
+        self.is_detecting = True
+        self.auto_control = False  # Flag for autonomous control
+        self.hand_following = False
+        self.target_label = "person"  # Object to track
+
+        # Per-stage timings and counters, exported by start_metrics_export()
+        self.metrics = Metrics()
+        self.metrics_server = None
+        self.metrics_writer = None
+
+        # Motor commands go out on a background thread, over the UDP control
+        # channel when the rover answers on control_udp_port, HTTP otherwise
+        self.dispatcher = CommandDispatcher(control_url, udp_port=control_udp_port)
+        self.dispatcher.add_listener(self.on_command_sent)
+        self.dispatcher.start()
+
+        # Frame arrival -> decision -> command ack timing, feeds latency compensation
+        self.latency = LatencyTracker()
+        self.frame_arrival = None  # Arrival time of the frame being processed
+        self.result_arrival = None  # Arrival time of the frame the current result is from
+        self.submitted_arrivals = {}  # Worker frame_id -> arrival time
+
+        # Steering runs on its own fixed-rate tick, perception only reports the target
+        self.use_controller = True
+        self.speed = 255  # Motor speed setting, the controller's top speed
+        self.controller = FollowController(self.send_command, self.set_motor_speed)
+        self.controller.start()
+
+        # Camera, flash and speed settings from the UI: the known device state
+        # is cached and only settled, changed values go out, batched
+        self.settings = DeviceSettings(control_url, local={"speed": self.set_speed})
+        if send_commands:
+            self.settings.start()
+
+        # Tracker keeps boxes and ids alive between detection passes
+        self.use_tracker = True
+        self.tracker = MultiObjectTracker()
+        self.target_track_id = None  # Track currently being followed
+
+        # Optimize performance settings
+        # With the tracker filling in, YOLO only needs to run every few frames
+        self.process_every_n_frames = 5 if self.use_tracker else 2
+        self.frame_count = 0
+        self.detection_size = (320, 320)  # Keep small detection size
+        self.confidence_threshold = 0.5
+        self.nms_threshold = 0.4
+        self.display_size = (640, 480)  # Smaller display size for better performance
+
+        # Results, read by the front end
+        self.last_detections = None  # Most recent decoded YOLO or tracker result
+        self.status_buffer = ""
+        self.detection_buffer = []
+
+        # Add overlay settings
+        self.overlay_alpha = 0.3
+        self.overlay_color = (0, 0, 0)  # Black background for text
+
+        # Models load on first use, on a background thread with a warmup pass:
+        # YOLO once detection is on, MediaPipe once hand following is. Until
+        # a model is ready its stage doesn't run, frames keep flowing. In
+        # process mode the worker process loads its own copy.
+        self.detector = None
+        self.detector_worker = None
+        self.hands = None
+        self.hands_worker = None
+        self.classes = load_classes(classes_path)
+        self.hand_options = dict(
+            track_roi=hand_roi,  # Search a crop around the last palm position
+            max_num_hands=1,
+            min_detection_confidence=0.5,
+            min_tracking_confidence=0.3,
+            model_complexity=0
+        )
+        hands_in_process = inference_mode == "process" and hands_in_worker
+        self.loaders = {
+            "detector": BackgroundLoader(
+                "detector",
+                self.start_detector_worker if inference_mode == "process" else self.load_detector,
+                warmup=None if inference_mode == "process" else self.warm_up_detector,
+                close=lambda model: model.close() if isinstance(model, InferenceWorker) else None
+            ),
+            "hands": BackgroundLoader(
+                "hands",
+                self.start_hands_worker if hands_in_process else self.load_hands,
+                warmup=None if hands_in_process else self.warm_up_hands,
+                close=lambda model: model.close(),
+                imports=() if hands_in_process else ("mediapipe",)
+            ),
+        }
+
+        # With region detection YOLO runs on the native-resolution frame: on a
+        # crop around the target most of the time, on tiles plus an overview
+        # every full_interval seconds. Only for the in-process detector.
+        self.region_detection = region_detection and inference_mode != "process"
+        self.region_detector = None
+        self.target_box = None  # Box of the target_label detection in display pixels
+
+        # On a static scene the detector is skipped and its last result reused
+        self.use_motion_gate = True
+        self.motion_gate = MotionGate()
+        self.detector_result = None  # Most recent Detections straight from YOLO
+
+        # Governor retunes detection interval and input size to the CPU load
+        self.use_governor = True
+        self.governor = DetectionGovernor(
+            sizes=(224, 320, 416),
+            size=self.detection_size[0],
+            interval=self.process_every_n_frames
+        )
+
+        # Stream governor steps the camera frame size and JPEG quality down
+        # when frames arrive late or the loop can't keep up, and back up when
+        # there is room. Bounds are inclusive (min, max) ranges.
+        self.use_stream_governor = adaptive_stream and send_commands
+        self.stream_governor = StreamGovernor(
+            framesizes=range(stream_framesizes[0], stream_framesizes[1] + 1),
+            qualities=stream_qualities,
+            target_fps=stream_target_fps
+        )
+
+        # Hands and YOLO run concurrently off the calling (UI) thread, the hand
+        # gesture first. While a hand is followed YOLO keeps running at a low
+        # rate as a safety monitor: a person this close in front of the rover,
+        # other than the one showing the hand, blocks forward motion.
+        self.safety_interval = 0.5  # Seconds between detector passes while following a hand
+        self.safety_labels = ("person",)
+        self.safety_area = 0.25  # Fraction of the frame the box has to cover
+        self.safety_stop = False
+        self.palm = None  # Last palm position in pixels
+        self.scheduler = StageScheduler(workers=2)
+        self.scheduler.start()
+
+        self.metrics.add_collector(self.collect_metrics)
+
+    # Model loading
+
+    def engine_options(self):
+        return dict(
+            backend=self.detector_backend,
+            target=self.detector_target,
+            threads=self.detector_threads,
+            input_size=self.detection_size,
+            confidence_threshold=self.confidence_threshold,
+            nms_threshold=self.nms_threshold
+        )
+
+    def load_detector(self):
+        """Create and load the configured YOLO engine"""
+        if self.detector_model == "auto":
+            detector, _ = auto_select_engine(
+                min_accuracy=self.detector_min_accuracy, **self.engine_options()
+            )
+            if detector is None:
+                raise RuntimeError("No detector engine available above the accuracy floor")
+        else:
+            detector = create_engine(self.detector_model, **self.engine_options())
+            detector.load()
+        self.detection_size = detector.input_size
+        print(f"Using detector: {detector.name}")
+        return detector
+
+    def preload(self, wait=False):
+        """Start loading the models of the modes that are on, optionally waiting for them"""
+        names = [name for name, on in (("detector", self.is_detecting),
+                                       ("hands", self.hand_following)) if on]
+        for name in names:
+            self.loaders[name].start()
+        if wait:
+            for name in names:
+                self.loaders[name].wait()
+                self.require(name)
+
+    def require(self, name):
+        """True once the model behind stage name is ready, starts loading it on first use"""
+        if name in self.scheduler.stages:
+            return True
+        loader = self.loaders[name]
+        if loader.state == "idle":
+            loader.start()
+        if loader.state != "ready":
+            return False
+
+        model = loader.model
+        if name == "detector":
+            if isinstance(model, InferenceWorker):
+                self.detector_worker = model
+            else:
+                self.detector = model
+                if not model.resizable:
+                    self.governor.sizes = [self.detection_size[0]]
+                self.governor.size = self.detection_size[0]
+                if self.region_detection:
+                    self.region_detector = RegionDetector(model)
+            if self.region_detector is not None:
+                run = self.run_region_detector
+            else:
+                run = None if self.detector is None else self.run_detector
+            self.scheduler.add_stage(
+                "detector", run=run, worker=self.detector_worker, priority=1, max_wait=1.0
+            )
+        else:
+            if isinstance(model, InferenceWorker):
+                self.hands_worker = model
+            else:
+                self.hands = model
+            self.scheduler.add_stage(
+                "hands", run=None if self.hands is None else self.run_hands,
+                worker=self.hands_worker, priority=0, max_wait=0.1, budget=0.05
+            )
+        return True
+
+    def warm_up_detector(self, detector):
+        detector.detect(np.zeros(self.display_size[::-1] + (3,), dtype=np.uint8))
+
+    def load_hands(self):
+        return HandTracker(**self.hand_options)
+
+    def warm_up_hands(self, hands):
+        # MediaPipe builds its graph on the first frame
+        hands.process(np.zeros(self.display_size[::-1] + (3,), dtype=np.uint8))
+        hands.reset()
+
+    def start_hands_worker(self):
+        """Run MediaPipe Hands in a separate process fed from shared memory"""
+        worker = InferenceWorker("hands", self.display_size[::-1] + (3,), **self.hand_options)
+        worker.start()
+        worker.wait_ready()
+        print("Hands running in worker process")
+        return worker
+
+    def run_detector(self, frame, input_size=None):
+        """Detector stage, runs on a scheduler thread"""
+        start = time.perf_counter()
+        outs = self.detector.infer(frame)
+        inferred = time.perf_counter()
+        detections = self.detector.decode(outs, frame)
+        self.metrics.observe("inference", inferred - start)
+        self.metrics.observe("postprocess", time.perf_counter() - inferred)
+        return detections
+
+    def run_region_detector(self, frame, input_size=None):
+        """Detector stage on a native frame or its JPEG bytes, boxes come back in display pixels"""
+        if frame.ndim == 1:
+            start = time.perf_counter()
+            frame = cv2.imdecode(frame, cv2.IMREAD_COLOR)
+            self.metrics.observe("native_decode", time.perf_counter() - start)
+            if frame is None:
+                return None
+        height, width = frame.shape[:2]
+        scale = np.array([width / self.display_size[0], height / self.display_size[1]] * 2)
+        target_box = self.target_box
+        if target_box is not None:
+            target_box = tuple(np.asarray(target_box) * scale)
+        target_class = (self.classes.index(self.target_label)
+                        if self.target_label in self.classes else None)
+
+        start = time.perf_counter()
+        detections = self.region_detector.detect(frame, target_box, target_class)
+        self.metrics.observe("inference", time.perf_counter() - start)
+        return Detections((detections.boxes / scale).astype(np.int32),
+                          detections.confidences, detections.class_ids)
+
+    def native_frame(self, frame):
+        """The frame at the source's own resolution for region detection.
+
+        MjpegStream decodes at reduced scale, so its JPEG is handed over
+        instead and decoded in full on the detector thread.
+        """
+        if isinstance(self.grabber, MjpegStream) and self.grabber.decode_factor > 1:
+            jpeg = self.grabber.last_jpeg()
+            if jpeg is not None:
+                return np.frombuffer(jpeg, dtype=np.uint8)
+        return frame
+
+    def run_hands(self, frame, input_size=None):
+        """Hand stage, runs on a scheduler thread"""
+        return self.hands.process(frame)
+
+    def start_detector_worker(self):
+        """Run the detector in a separate process fed from shared memory"""
+        preset = self.detector_model
+        if preset == "auto":
+            print("Auto detector selection is not supported in process mode, using yolov3")
+            preset = "yolov3"
+        worker = InferenceWorker(
+            "detector",
+            self.display_size[::-1] + (3,),
+            preset=preset,
+            **self.engine_options()
+        )
+        worker.start()
+        worker.wait_ready()
+        print("Detector running in worker process")
+        return worker
+
+    # Capture
+
+    def connect(self, source):
+        """Open a webcam index or stream URL and start the capture thread"""
+        try:
+            self.stop_capture()
+            self.source = source
+            if isinstance(source, str) and os.path.isdir(source):
+                # A directory written by SessionRecorder
+                self.cap = None
+                self.grabber = SessionReplay(source, self.replay_realtime, metrics=self.metrics)
+                self.grabber.start()
+                print(f"Replaying {source} ({len(self.grabber.reader)} frames)")
+                return True
+            if self.native_mjpeg and str(source).startswith(("http://", "https://")):
+                # Parse the multipart stream ourselves and decode only the
+                # newest JPEG, at reduced scale when display_size allows
+                stream = MjpegStream(source, target_size=self.display_size, metrics=self.metrics)
+                if stream.open():
+                    print(f"Successfully connected to {source}")
+                    self.cap = None
+                    self.grabber = stream
+                    self.grabber.start()
+                    self.stream_governor.reset()
+                    return True
+                print("Falling back to cv2.VideoCapture")
+
+            self.cap = cv2.VideoCapture(source)
+
+            if not self.cap.isOpened():
+                print(f"Error: Could not open {source}")
+                return False
+
+            # Try to get a frame
+            ret, frame = self.cap.read()
+            if ret and frame is not None:
+                print(f"Successfully connected to {source}")
+                # Hand frame reading over to the capture thread
+                self.grabber = FrameGrabber(self.cap, metrics=self.metrics)
+                self.grabber.start()
+                return True
+
+            print("Error: Could not read frame")
+            self.cap.release()
+            return False
+
+        except Exception as e:
+            print(f"Error in connect: {str(e)}")
+            if self.cap is not None:
+                self.cap.release()
+            return False
+
+    def connect_in_background(self, source):
+        """Run connect(source) on a thread, returns False if an attempt is already running"""
+        if self.connecting:
+            return False
+        self.connecting = True
+
+        def run():
+            try:
+                self.connect(source)
+            finally:
+                self.connecting = False
+
+        threading.Thread(target=run, name="connect", daemon=True).start()
+        return True
+
+    def is_connected(self):
+        return self.grabber is not None and not self.grabber.failed
+
+    def stop_capture(self):
+        """Stop the capture thread and release the camera"""
+        if self.grabber is not None:
+            self.grabber.release()
+            self.grabber = None
+        elif self.cap is not None:
+            self.cap.release()
+
+    # Control
+
+    def send_command(self, command):
+        """Queue command on the dispatcher, repeats of the current command are dropped"""
+        if not self.send_commands:
+            return False
+        if command == '1' and self.safety_stop and self.hand_following:
+            command = '3'  # Someone is right in front of the rover
+            self.controller.pop_change('1')  # Its latency would be measured from this frame
+        queued = self.dispatcher.send(command)
+        if queued and self.recorder is not None:
+            self.recorder.record_event("command", command=command)
+        return queued
+
+    def control_robot(self, target_x, frame_width):
+        # Simple control logic based on target position
+        center = frame_width // 2
+        margin = frame_width // 6  # Tolerance margin
+
+        if target_x < (center - margin):
+            self.send_command('2')  # Turn left
+        elif target_x > (center + margin):
+            self.send_command('4')  # Turn right
+        else:
+            self.send_command('1')  # Move forward
+
+    def set_motor_speed(self, speed):
+        """Queue a motor speed on the dispatcher, it goes out ahead of the next command"""
+        if not self.send_commands:
+            return False
+        return self.dispatcher.set_speed(speed)
+
+    def set_speed(self, speed):
+        """User speed setting: the motor speed, and the top speed when following"""
+        self.speed = int(speed)
+        self.controller.max_speed = self.speed
+        return self.set_motor_speed(self.speed)
+
+    def sync_controller(self):
+        """Engage the follow controller while a follow mode is on"""
+        active = self.use_controller and (self.auto_control or self.hand_following)
+        if active and not self.controller.enabled:
+            self.controller.engage()
+        elif not active and self.controller.enabled:
+            self.controller.disengage()
+            self.set_motor_speed(self.speed)  # Back to the user's speed for manual driving
+
+    def set_hand_following(self, enabled):
+        """Switch hand following on or off, object detection keeps running as a safety monitor"""
+        self.hand_following = enabled
+        self.safety_stop = False
+        self.palm = None
+        if enabled:
+            self.auto_control = False
+            self.tracker.reset()
+            self.target_box = None
+            self.target_track_id = None
+            self.detector_result = None
+            self.motion_gate.reset()
+            if self.hands is not None:
+                self.hands.reset()  # The hand may be anywhere by now
+        else:
+            # Stop the robot when disabling hand following
+            self.send_command('3')
+
+    # Frame processing
+
+    def step(self):
+        """Process the newest frame and return it, or None if there is no new frame"""
+        self.sync_controller()
+        if not self.is_connected():
+            return None
+
+        # Only ever process the newest frame, stale ones are dropped by the grabber
+        frame = self.grabber.read()
+        if frame is None:
+            return None
+        self.frame_arrival = self.result_arrival = self.grabber.frame_time or time.time()
+        if self.use_stream_governor and isinstance(self.grabber, MjpegStream):
+            self.update_stream_quality()
+        if self.recorder is not None:
+            with self.metrics.timer("record"):
+                self.record_frame()
+
+        # Resize frame immediately for faster processing
+        native = frame
+        with self.metrics.timer("resize"):
+            frame = cv2.resize(frame, self.display_size)
+
+        # Queue the frame for the stages that want it, results come back asynchronously
+        stages = []
+        detections = None
+        if self.hand_following and not self.require("hands"):
+            self.status_buffer = "LOADING"
+        elif self.hand_following and self.frame_count % 2 == 0:
+            stages.append("hands")
+        if self.is_detecting and self.require("detector"):
+            run_detector = self.frame_count % self.process_every_n_frames == 0
+            if run_detector and self.use_motion_gate and self.detector_result is not None:
+                # Nothing moved since the last detector pass, reuse its result
+                with self.metrics.timer("motion_gate"):
+                    run_detector = self.motion_gate.should_infer(frame)
+                if not run_detector:
+                    self.metrics.increment("inference_skipped")
+                    detections = self.detector_result
+            if run_detector:
+                stages.append("detector")
+        if "detector" in self.scheduler.stages:
+            self.scheduler.stages["detector"].interval = (
+                self.safety_interval if self.hand_following else 0.0
+            )
+        if "detector" in stages and self.region_detector is not None:
+            # The detector gets the full resolution frame, the other stages the resized one
+            stages.remove("detector")
+            self.submit_to_scheduler(self.native_frame(native), ["detector"])
+        if stages:
+            self.submit_to_scheduler(frame, stages)
+
+        if self.render and (self.hand_following or self.is_detecting):
+            draw_overlay_band(frame, self.overlay_alpha, self.overlay_color)
+
+        detection_arrival = self.frame_arrival
+        for result in self.scheduler.poll():
+            arrival = self.submitted_arrivals.get(result.frame_id, self.frame_arrival)
+            if result.kind == "hands":
+                self.metrics.observe("hands", result.elapsed)
+                if self.hand_following:
+                    self.result_arrival = arrival
+                    self.handle_hand(frame, result.payload)
+            else:
+                if self.detector_worker is not None:
+                    self.metrics.observe("inference", result.elapsed)
+                self.record_inference_time(result.elapsed)
+                if result.payload is not None and self.is_detecting:
+                    detections = self.detector_result = result.payload
+                    if not self.use_tracker:
+                        detection_arrival = arrival  # The tracker predicts to this frame
+
+        if self.is_detecting:
+            self.result_arrival = detection_arrival
+            if self.use_tracker:
+                # Predict every frame, correct whenever YOLO produced a result
+                now = time.time()
+                with self.metrics.timer("tracking"):
+                    if detections is not None:
+                        tracks = self.tracker.update(detections, now)
+                    else:
+                        tracks = self.tracker.predict(now)
+                self.handle_detections(frame, tracks)
+            elif detections is not None:
+                self.handle_detections(frame, detections)
+
+        # Update frame counter
+        self.frame_count += 1
+        self.metrics.increment("frames_processed")
+        self.governor.record_frame()
+
+        # How old the frame is now that every decision on it has been made
+        frame_age = time.time() - self.frame_arrival
+        self.latency.record_frame_age(frame_age)
+        self.metrics.observe("frame_age", frame_age)
+        self.controller.command_delay = self.latency.command_delay
+        return frame
+
+    def submit_to_scheduler(self, frame, stages):
+        """Queue a frame for the given stages, remembering when it arrived"""
+        frame_id = self.scheduler.submit(frame, stages, input_size=self.detection_size)
+        if frame_id is not None:
+            while len(self.submitted_arrivals) >= 64:
+                # Oldest first, their results never came back
+                del self.submitted_arrivals[next(iter(self.submitted_arrivals))]
+            self.submitted_arrivals[frame_id] = self.frame_arrival
+        return frame_id
+
+    def record_inference_time(self, seconds):
+        """Feed a detector run time to the governor and apply any new settings"""
+        if self.use_governor and self.governor.record_inference(seconds):
+            self.process_every_n_frames = self.governor.interval
+            self.detection_size = self.governor.input_size
+            if self.detector is not None:
+                self.detector.input_size = self.detection_size
+            print(f"Governor: {self.governor.decision}")
+
+    def update_stream_quality(self):
+        """Feed the stream governor the newest arrivals and apply any new camera settings"""
+        governor = self.stream_governor
+        arrivals = self.grabber.arrivals
+        while arrivals:
+            governor.record_arrival(*arrivals.popleft())
+        if self.grabber.last_decode_time is not None:
+            governor.record_decode(self.grabber.last_decode_time)
+        stage = self.scheduler.stages.get("detector")
+        if stage is not None and self.is_detecting:
+            governor.record_inference(stage.submitted, stage.dropped)
+        if not governor.seeded and self.settings.loaded:
+            # Step from the rung the rover is on, not from the default guess
+            governor.seed(self.settings.get("framesize", governor.framesize),
+                          self.settings.get("quality", governor.quality))
+        if governor.update():
+            self.apply_stream_settings()
+
+    def apply_stream_settings(self, settle=False):
+        """Send the governor's frame size and quality, together in one request"""
+        self.settings.set("framesize", self.stream_governor.framesize, settle=settle)
+        self.settings.set("quality", self.stream_governor.quality, settle=settle)
+        print(f"Stream: {self.stream_governor.decision}")
+
+    def set_stream_bounds(self, max_framesize=None, best_quality=None):
+        """User limits for the stream governor: the largest frame size and the best quality"""
+        governor = self.stream_governor
+        framesizes = qualities = None
+        if max_framesize is not None:
+            low = min(governor.framesizes[0], max_framesize)
+            framesizes = range(low, max_framesize + 1)
+        if best_quality is not None:
+            qualities = (best_quality, max(best_quality, governor.qualities[1]))
+        if governor.set_bounds(framesizes, qualities):
+            governor.decision = f"{governor.framesize}/q{governor.quality} - user bounds"
+            self.apply_stream_settings(settle=True)  # Sliders call this on every tick
+
+    def handle_detections(self, frame, detections):
+        """Draw a detection or tracker result, update the buffer and steer if following"""
+        height, width = frame.shape[:2]
+        self.last_detections = detections
+        if self.recorder is not None:
+            self.recorder.record_detections(detections)
+
+        if self.render:
+            # Draw boxes and labels with better visibility
+            draw_detections(frame, detections, self.classes, self.target_label)
+
+        if self.hand_following:
+            self.safety_stop = self.person_in_path(detections, width, height)
+
+        # After processing detections, update detection buffer
+        current_detections = detection_labels(detections, self.classes, limit=3)
+        if current_detections:
+            self.detection_buffer = current_detections  # Keep top 3 detections
+
+        # Steer towards the followed track, or the most confident target
+        target = find_target(detections, self.classes, self.target_label, self.target_track_id)
+        self.target_box = None if target is None else tuple(detections.boxes[target])
+        if self.auto_control:
+            if target is not None:
+                if hasattr(detections, "track_ids"):
+                    track_id = int(detections.track_ids[target])
+                    if track_id != self.target_track_id:
+                        self.controller.new_target()
+                    self.target_track_id = track_id
+                x, y, w, h = detections.boxes[target]
+                if self.use_controller:
+                    self.controller.update_target(
+                        (x + w / 2 - width / 2) / (width / 2), captured=self.result_arrival
+                    )
+                else:
+                    self.control_robot(x + w // 2, width)
+            else:
+                self.target_track_id = None
+                if self.use_controller:
+                    self.controller.clear_target()
+                else:
+                    self.send_command('3')  # Target lost
+
+    def person_in_path(self, detections, width, height):
+        """A safety label box covering safety_area of the frame, other than the hand's owner"""
+        for (x, y, w, h), class_id in zip(detections.boxes, detections.class_ids):
+            if self.classes[class_id] not in self.safety_labels:
+                continue
+            if w * h < self.safety_area * width * height:
+                continue
+            if self.palm is not None and x <= self.palm[0] <= x + w and y <= self.palm[1] <= y + h:
+                continue  # The person showing the hand
+            return True
+        return False
+
+    def handle_hand(self, frame, landmarks):
+        """Steer from the palm position and draw the hand, landmarks may be None"""
+        try:
+            height, width = frame.shape[:2]
+            center_x = width // 2
+            margin = width // 6
+
+            if landmarks is not None:
+                palm_x = int(landmarks[PALM_LANDMARK][0] * width)
+                palm_y = int(landmarks[PALM_LANDMARK][1] * height)
+                if self.recorder is not None:
+                    self.recorder.record_event("hand", palm=[palm_x, palm_y])
+
+                if self.use_controller:
+                    self.controller.update_target(
+                        (palm_x - center_x) / center_x, backward=palm_y > height * 0.6,
+                        captured=self.result_arrival
+                    )
+                    status = self.controller.status
+                elif palm_y > height * 0.6:
+                    self.send_command('5')
+                    status = "BACKWARD"
+                else:
+                    if palm_x < (center_x - margin):
+                        self.send_command('2')
+                        status = "LEFT"
+                    elif palm_x > (center_x + margin):
+                        self.send_command('4')
+                        status = "RIGHT"
+                    else:
+                        self.send_command('1')
+                        status = "FORWARD"
+
+                if self.render:
+                    # Draw minimal hand landmarks
+                    draw_hand_landmarks(frame, landmarks)
+                    cv2.circle(frame, (palm_x, palm_y), 5, (0, 255, 255), -1)
+                self.palm = (palm_x, palm_y)
+                if self.safety_stop:
+                    status += " (person ahead)"
+            else:
+                if self.use_controller:
+                    self.controller.clear_target()
+                else:
+                    self.send_command('3')
+                self.palm = None
+                status = "NO HAND"
+
+            if self.render:
+                # Draw status on frame with better visibility
+                cv2.putText(frame, status, (10, 30),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+            self.status_buffer = status
+
+        except Exception as e:
+            print(f"Error in hand detection: {e}")
+            self.status_buffer = "ERROR"
+
+    # Recording
+
+    def start_recording(self, directory):
+        """Record raw stream JPEGs, commands and detections to directory"""
+        self.stop_recording()
+        self.recorder = SessionRecorder(directory)
+        self.recorder.start()
+        self.recording_warned = False
+
+    def stop_recording(self):
+        if self.recorder is not None:
+            recorder, self.recorder = self.recorder, None
+            recorder.close()
+            stats = recorder.stats()
+            print(f"Recorded {stats['frames']} frames ({stats['dropped']} dropped) "
+                  f"to {recorder.directory}")
+
+    def record_frame(self):
+        """Hand the raw JPEG of the frame just read to the recorder, never re-encodes"""
+        last_jpeg = getattr(self.grabber, "last_jpeg", None)
+        jpeg = last_jpeg() if last_jpeg is not None else None
+        if jpeg is None:
+            if not self.recording_warned:
+                print("Recording needs an MJPEG stream source, this source has no raw JPEGs")
+                self.recording_warned = True
+            return None
+        return self.recorder.record_frame(jpeg, self.grabber.frame_time or time.time())
+
+    # Metrics
+
+    def on_command_sent(self, command, ok, latency):
+        """Dispatcher listener, runs on the dispatcher thread"""
+        if ok:
+            self.metrics.observe("command", latency)
+            self.metrics.increment("commands_sent")
+            self.latency.record_command(latency)
+            captured = self.controller.pop_change(command)
+            if captured is not None:
+                # Frame arrival to the rover acknowledging what it decided
+                end_to_end = time.time() - captured
+                self.latency.record_end_to_end(end_to_end)
+                self.metrics.observe("end_to_end", end_to_end)
+        else:
+            self.metrics.increment("commands_failed")
+
+    def collect_metrics(self):
+        """Counters owned by other components, read when metrics are exported"""
+        values = {
+            "detection_interval": self.process_every_n_frames,
+            "detection_size": self.detection_size[0],
+            "fps": self.governor.frame_rate(),
+            "commands_skipped": self.dispatcher.duplicates,
+            "commands_coalesced": self.dispatcher.coalesced,
+            "settings_batches": self.settings.batches,
+            "settings_unchanged": self.settings.unchanged,
+            "motion_gate_skip_ratio": self.motion_gate.stats()["skip_ratio"],
+            "controller_output": self.controller.output,
+            "controller_deadman_stops": self.controller.deadman_stops,
+            "latency_estimate_seconds": self.latency.estimate(),
+        }
+        if self.motion_gate.last_changed is not None:
+            values["motion_changed_fraction"] = self.motion_gate.last_changed
+        if self.grabber is not None:
+            values["frames_received"] = self.grabber.frames_received
+            values["frames_dropped"] = self.grabber.frames_dropped
+            values["failed_reads"] = self.grabber.failed_reads
+            if isinstance(self.grabber, MjpegStream):
+                values["frame_bytes"] = self.grabber.last_part_size
+                values["decode_factor"] = self.grabber.decode_factor
+        if self.use_stream_governor:
+            values["stream_framesize"] = self.stream_governor.framesize
+            values["stream_quality"] = self.stream_governor.quality
+            for name in ("fps", "jitter", "throughput"):
+                if name in self.stream_governor.measured:
+                    values[f"stream_{name}"] = self.stream_governor.measured[name]
+        if self.recorder is not None:
+            values["frames_recorded"] = self.recorder.frames_recorded
+            values["frames_record_dropped"] = self.recorder.frames_dropped
+        for name, stage in self.scheduler.stages.items():
+            values[f"{name}_stage_dropped"] = stage.dropped
+            values[f"{name}_stage_deferred"] = stage.deferred
+        values["safety_stop"] = self.safety_stop
+        if self.hands is not None:
+            values["hand_roi_ratio"] = self.hands.stats()["roi_ratio"]
+        if self.region_detector is not None:
+            values["detector_roi_ratio"] = self.region_detector.stats()["roi_ratio"]
+        for name, loader in self.loaders.items():
+            if loader.state == "ready":
+                values[f"{name}_load_seconds"] = loader.import_seconds + loader.load_seconds
+                values[f"{name}_warmup_seconds"] = loader.warmup_seconds
+        return values
+
+    def start_metrics_export(self, port=None, jsonl_path=None, interval=5.0):
+        """Serve Prometheus text on localhost:port and/or append snapshots to jsonl_path"""
+        if port:
+            self.metrics_server = MetricsServer(self.metrics, port)
+            if not self.metrics_server.start():
+                self.metrics_server = None
+        if jsonl_path:
+            self.metrics_writer = JsonlMetricsWriter(self.metrics, jsonl_path, interval)
+            self.metrics_writer.start()
+
+    # Shutdown
+
+    def close(self):
+        """Stop the robot and release the camera, models and workers"""
+        self.is_detecting = False
+        self.auto_control = False
+        self.hand_following = False
+
+        # Send stop command to robot and wait for it to go out
+        self.controller.close()
+        self.settings.close()
+        self.send_command('3')
+        self.dispatcher.close()
+
+        # Stop capture thread and release camera
+        self.stop_recording()
+        self.stop_capture()
+
+        # Stop the stages and inference workers, releasing the MediaPipe resources
+        self.scheduler.close()
+        for loader in self.loaders.values():
+            loader.close()
+
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+        if self.metrics_writer is not None:
+            self.metrics_writer.stop()
+
+    def stats(self):
+        """Snapshot of the capture, command, inference and governor counters"""
+        stats = {
+            "frames": self.frame_count,
+            "commands": self.dispatcher.stats(),
+            "settings": self.settings.stats(),
+            "governor": self.governor.stats(),
+            "stream": self.stream_governor.stats(),
+            "motion_gate": self.motion_gate.stats(),
+            "controller": self.controller.stats(),
+            "latency": self.latency.stats(),
+        }
+        if self.grabber is not None:
+            stats["capture"] = self.grabber.stats()
+        if self.recorder is not None:
+            stats["recording"] = self.recorder.stats()
+        if self.detector_worker is not None:
+            stats["detector_worker"] = self.detector_worker.stats()
+        if self.hands_worker is not None:
+            stats["hands_worker"] = self.hands_worker.stats()
+        if self.hands is not None:
+            stats["hands"] = self.hands.stats()
+        if self.region_detector is not None:
+            stats["regions"] = self.region_detector.stats()
+        stats["stages"] = self.scheduler.stats()
+        stats["models"] = {name: loader.stats() for name, loader in self.loaders.items()}
+        return stats
@@ -8,6 +8,7 @@
 #include "soc/rtc_cntl_reg.h"
 #include "driver/ledc.h"
 #include "globals.h"
+#include "commands.h"
 
 const char* ssid = "atrash";
 const char* password = "12345678";
@@ -123,6 +124,49 @@ void stopMotors() {
     }
 }
 
+// Channels driven for each command: forward, left, stop, right, backward
+const bool DIRECTION_CHANNELS[6][4] = {
+    {false, false, false, false},  // 0 - unused
+    {false, true,  true,  false},  // 1 - Forward
+    {true,  false, true,  false},  // 2 - Left
+    {false, false, false, false},  // 3 - Stop
+    {false, true,  false, true },  // 4 - Right
+    {true,  false, false, true },  // 5 - Backward
+};
+
+static int currentDirection = 3;
+static int currentDuty = 0;
+static portMUX_TYPE motorMux = portMUX_INITIALIZER_UNLOCKED;
+
+void driveMotors(int direction, int duty) {
+    // Called from the HTTP server, the UDP control task and Serial
+    if (direction < 1 || direction > 5) {
+        return;
+    }
+    portENTER_CRITICAL(&motorMux);
+    bool unchanged = direction == currentDirection && duty == currentDuty;
+    currentDirection = direction;
+    currentDuty = duty;
+    portEXIT_CRITICAL(&motorMux);
+    if (unchanged) {
+        return;  // Repeated commands don't touch the PWM at all
+    }
+
+    // Channels that go off first, then the new ones on, with no full stop in between
+    for (int channel = 0; channel < 4; channel++) {
+        if (!DIRECTION_CHANNELS[direction][channel]) {
+            ledc_set_duty(LEDC_HIGH_SPEED_MODE, (ledc_channel_t)channel, 0);
+            ledc_update_duty(LEDC_HIGH_SPEED_MODE, (ledc_channel_t)channel);
+        }
+    }
+    for (int channel = 0; channel < 4; channel++) {
+        if (DIRECTION_CHANNELS[direction][channel]) {
+            ledc_set_duty(LEDC_HIGH_SPEED_MODE, (ledc_channel_t)channel, duty);
+            ledc_update_duty(LEDC_HIGH_SPEED_MODE, (ledc_channel_t)channel);
+        }
+    }
+}
+
 void setup(){
   WRITE_PERI_REG(RTC_CNTL_BROWN_OUT_REG, 0); // prevent brownouts by silencing them
 
@@ -191,6 +235,7 @@ void setup(){
   Serial.printf("Ready! Stream: http://%s:81/stream\n", WiFi.softAPIP().toString().c_str());
   
   startCameraServer();
+  startControlChannel();
 }
 
 void loop() {
@@ -212,39 +257,17 @@ void handleCommand(String command) {
     Serial.print("Received command: ");
     Serial.println(command);
 
-    // Stop all motors first
-    stopMotors();
-
-    if (command == "1") {  // Forward
+    int direction = command.toInt();
+    if (direction == 1) {
         Serial.println("Moving Forward");
-        ledc_set_duty(LEDC_HIGH_SPEED_MODE, LEDC_CHANNEL_1, speed);
-        ledc_update_duty(LEDC_HIGH_SPEED_MODE, LEDC_CHANNEL_1);
-        ledc_set_duty(LEDC_HIGH_SPEED_MODE, LEDC_CHANNEL_2, speed);
-        ledc_update_duty(LEDC_HIGH_SPEED_MODE, LEDC_CHANNEL_2);
-    } 
-    else if (command == "2") {  // Left
+    } else if (direction == 2) {
         Serial.println("Turning Left");
-        ledc_set_duty(LEDC_HIGH_SPEED_MODE, LEDC_CHANNEL_0, speed);
-        ledc_update_duty(LEDC_HIGH_SPEED_MODE, LEDC_CHANNEL_0);
-        ledc_set_duty(LEDC_HIGH_SPEED_MODE, LEDC_CHANNEL_2, speed);
-        ledc_update_duty(LEDC_HIGH_SPEED_MODE, LEDC_CHANNEL_2);
-    } 
-    else if (command == "3") {  // Stop
+    } else if (direction == 3) {
         Serial.println("Stopping");
-        stopMotors();
-    } 
-    else if (command == "4") {  // Right
+    } else if (direction == 4) {
         Serial.println("Turning Right");
-        ledc_set_duty(LEDC_HIGH_SPEED_MODE, LEDC_CHANNEL_1, speed);
-        ledc_update_duty(LEDC_HIGH_SPEED_MODE, LEDC_CHANNEL_1);
-        ledc_set_duty(LEDC_HIGH_SPEED_MODE, LEDC_CHANNEL_3, speed);
-        ledc_update_duty(LEDC_HIGH_SPEED_MODE, LEDC_CHANNEL_3);
-    } 
-    else if (command == "5") {  // Backward
+    } else if (direction == 5) {
         Serial.println("Moving Backward");
-        ledc_set_duty(LEDC_HIGH_SPEED_MODE, LEDC_CHANNEL_0, speed);
-        ledc_update_duty(LEDC_HIGH_SPEED_MODE, LEDC_CHANNEL_0);
-        ledc_set_duty(LEDC_HIGH_SPEED_MODE, LEDC_CHANNEL_3, speed);
-        ledc_update_duty(LEDC_HIGH_SPEED_MODE, LEDC_CHANNEL_3);
     }
+    driveMotors(direction, speed);
 }
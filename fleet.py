@@ -0,0 +1,332 @@
+"""Drive several camera/rover pairs from one process with one shared detector.
+
+The YOLO weights are loaded once. Every inference tick the newest frame
+of each rover that has one is stacked into a single blobFromImages batch,
+and the per-frame results go back to that rover's tracker and command
+dispatcher. Each stream keeps its own health and FPS counters.
+
+Usage:
+    python fleet.py --rover alpha=192.168.4.1 --rover beta=192.168.4.2 --follow
+    python fleet.py --config fleet.json --model yolov4-tiny
+
+fleet.json lists the rovers:
+    [{"name": "alpha", "stream_url": "http://192.168.4.1:81/stream",
+      "control_url": "http://192.168.4.1:80/control"}, ...]
+"""
+import argparse
+import json
+import re
+import sys
+import time
+from collections import deque
+
+import cv2
+
+from capture import FrameGrabber
+from command_dispatcher import STOP_COMMAND, CommandDispatcher
+from detection import detection_labels, find_target
+from detectors import MODEL_PRESETS, create_engine, load_classes
+from metrics import Metrics, MetricsServer
+from mjpeg_stream import MjpegStream
+from tracker import MultiObjectTracker
+
+
+class Rover:
+    """One camera/rover pair: its stream, command dispatcher, tracker and health counters"""
+
+    def __init__(self, name, stream_url, control_url, display_size=(640, 480),
+                 send_commands=True, reconnect_interval=2.0):
+        self.name = name
+        self.stream_url = stream_url
+        self.control_url = control_url
+        self.display_size = display_size
+        self.send_commands = send_commands
+        self.reconnect_interval = reconnect_interval
+
+        self.grabber = None
+        self.last_connect_attempt = 0.0
+        self.connected_once = False
+        self.reconnects = 0  # Connects after the first one
+
+        self.dispatcher = CommandDispatcher(control_url)
+        self.dispatcher.start()
+        self.tracker = MultiObjectTracker()
+        self.target_track_id = None
+
+        # Newest resized frame waiting for the next inference tick
+        self.frame = None
+        self.frame_time = None
+        self.frame_times = deque(maxlen=30)
+        self.frames = 0
+        self.inferences = 0
+        self.last_detections = None
+        self.detection_buffer = []
+
+    def connect(self):
+        """Open the stream, MJPEG over http if possible, returns True on success"""
+        self.last_connect_attempt = time.time()
+        self.release_stream()
+        source = int(self.stream_url) if str(self.stream_url).isdigit() else self.stream_url
+        if str(source).startswith(("http://", "https://")):
+            stream = MjpegStream(source, target_size=self.display_size)
+            if stream.open():
+                self.grabber = stream
+                self.grabber.start()
+                return True
+        cap = cv2.VideoCapture(source)
+        if not cap.isOpened():
+            cap.release()
+            return False
+        self.grabber = FrameGrabber(cap)
+        self.grabber.start()
+        return True
+
+    def is_connected(self):
+        return self.grabber is not None and not self.grabber.failed
+
+    def poll(self):
+        """Fetch the newest frame if there is one, reconnecting a dead stream now and then"""
+        if not self.is_connected():
+            if time.time() - self.last_connect_attempt >= self.reconnect_interval:
+                if self.connect():
+                    if self.connected_once:
+                        self.reconnects += 1
+                    self.connected_once = True
+                    print(f"{self.name}: connected to {self.stream_url}")
+            return None
+        frame = self.grabber.read()
+        if frame is None:
+            return None
+        frame = cv2.resize(frame, self.display_size)
+        self.frame = frame
+        self.frame_time = time.time()
+        self.frame_times.append(self.frame_time)
+        self.frames += 1
+        return frame
+
+    def send_command(self, command):
+        if not self.send_commands:
+            return False
+        return self.dispatcher.send(command)
+
+    def steer(self, detections, classes, target_label):
+        """Turn towards the followed track, or stop when the target is lost"""
+        target = find_target(detections, classes, target_label, self.target_track_id)
+        if target is None:
+            self.target_track_id = None
+            self.send_command(STOP_COMMAND)
+            return
+        if hasattr(detections, "track_ids"):
+            self.target_track_id = int(detections.track_ids[target])
+        x, y, w, h = detections.boxes[target]
+        width = self.display_size[0]
+        center, margin = width // 2, width // 6
+        target_x = x + w // 2
+        if target_x < center - margin:
+            self.send_command('2')  # Turn left
+        elif target_x > center + margin:
+            self.send_command('4')  # Turn right
+        else:
+            self.send_command('1')  # Move forward
+
+    def fps(self):
+        if len(self.frame_times) < 2:
+            return 0.0
+        span = self.frame_times[-1] - self.frame_times[0]
+        return (len(self.frame_times) - 1) / span if span > 0 else 0.0
+
+    def health(self):
+        """Per-stream health snapshot"""
+        stats = {
+            "connected": self.is_connected(),
+            "fps": self.fps(),
+            "frame_age_s": time.time() - self.frame_time if self.frame_time else None,
+            "frames": self.frames,
+            "inferences": self.inferences,
+            "reconnects": self.reconnects,
+            "commands": self.dispatcher.stats(),
+        }
+        if self.grabber is not None:
+            stats["capture"] = self.grabber.stats()
+        return stats
+
+    def release_stream(self):
+        if self.grabber is not None:
+            self.grabber.release()
+            self.grabber = None
+
+    def close(self):
+        self.send_command(STOP_COMMAND)
+        self.dispatcher.close()
+        self.release_stream()
+
+
+class FleetEngine:
+    """Runs one detector for many rovers, batching their newest frames per tick"""
+
+    def __init__(self, rovers, detector_model="yolov3", detector_backend="opencv",
+                 detector_target="cpu", detector_threads=None, detection_size=(320, 320),
+                 detection_interval=0.2, confidence_threshold=0.5, nms_threshold=0.4,
+                 classes_path="coco.names"):
+        self.rovers = rovers
+        self.detection_interval = detection_interval  # Seconds between batched passes
+        self.follow = False
+        self.target_label = "person"
+
+        self.classes = load_classes(classes_path)
+        self.detector = create_engine(
+            detector_model, backend=detector_backend, target=detector_target,
+            threads=detector_threads, input_size=detection_size,
+            confidence_threshold=confidence_threshold, nms_threshold=nms_threshold
+        )
+        self.detector.load()
+        print(f"Using detector: {self.detector.name} for {len(rovers)} rovers")
+
+        self.last_batch_time = 0.0
+        self.batches = 0
+        self.metrics = Metrics()
+        self.metrics.add_collector(self.collect_metrics)
+        self.metrics_server = None
+
+    def step(self):
+        """Poll every stream and run a batched pass when one is due, returns frames handled"""
+        fresh = [rover for rover in self.rovers if rover.poll() is not None]
+        handled = len(fresh)
+
+        now = time.time()
+        if now - self.last_batch_time >= self.detection_interval:
+            # Every rover whose newest frame hasn't been through the detector yet
+            batch = [rover for rover in self.rovers
+                     if rover.frame is not None and rover.frame_time > self.last_batch_time]
+            if batch:
+                self.last_batch_time = now
+                with self.metrics.timer("inference"):
+                    results = self.detector.detect_batch([rover.frame for rover in batch])
+                self.metrics.set_gauge("batch_size", len(batch))
+                self.batches += 1
+                for rover, detections in zip(batch, results):
+                    rover.inferences += 1
+                    self.handle(rover, rover.tracker.update(detections, now))
+                fresh = [rover for rover in fresh if rover not in batch]
+
+        # Between passes the trackers carry the boxes forward
+        for rover in fresh:
+            self.handle(rover, rover.tracker.predict(now))
+        return handled
+
+    def handle(self, rover, detections):
+        rover.last_detections = detections
+        labels = detection_labels(detections, self.classes, limit=3)
+        if labels:
+            rover.detection_buffer = labels
+        if self.follow:
+            rover.steer(detections, self.classes, self.target_label)
+
+    def collect_metrics(self):
+        values = {"batches": self.batches}
+        for rover in self.rovers:
+            key = re.sub(r"\W", "_", rover.name)
+            values[f"{key}_fps"] = rover.fps()
+            values[f"{key}_connected"] = rover.is_connected()
+            values[f"{key}_inferences"] = rover.inferences
+            values[f"{key}_commands_sent"] = rover.dispatcher.sent
+        return values
+
+    def start_metrics_export(self, port):
+        self.metrics_server = MetricsServer(self.metrics, port)
+        if not self.metrics_server.start():
+            self.metrics_server = None
+
+    def stats(self):
+        return {rover.name: rover.health() for rover in self.rovers}
+
+    def close(self):
+        for rover in self.rovers:
+            rover.close()
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+
+
+def parse_rovers(args):
+    """Rover definitions from --config and --rover name=host arguments"""
+    definitions = []
+    if args.config:
+        with open(args.config) as f:
+            definitions.extend(json.load(f))
+    for spec in args.rover:
+        name, _, host = spec.partition("=")
+        if not host:
+            raise SystemExit(f"--rover expects name=host, got {spec}")
+        definitions.append({
+            "name": name,
+            "stream_url": f"http://{host}:81/stream",
+            "control_url": f"http://{host}:80/control",
+        })
+    return definitions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run several rovers with one batched detector")
+    parser.add_argument("--rover", action="append", default=[], metavar="NAME=HOST",
+                        help="rover name and ESP32 address, can be repeated")
+    parser.add_argument("--config", help="JSON list of {name, stream_url, control_url}")
+    parser.add_argument("--model", default="yolov3", choices=sorted(MODEL_PRESETS))
+    parser.add_argument("--backend", default="opencv")
+    parser.add_argument("--device", default="cpu", help="DNN target (default: cpu)")
+    parser.add_argument("--size", type=int, default=320, help="detector input size (default: 320)")
+    parser.add_argument("--interval", type=float, default=0.2,
+                        help="seconds between batched detector passes (default: 0.2)")
+    parser.add_argument("--follow", action="store_true",
+                        help="steer every rover towards the target object")
+    parser.add_argument("--target", default="person",
+                        help="object class to follow (default: person)")
+    parser.add_argument("--no-control", action="store_true", help="never send motor commands")
+    parser.add_argument("--duration", type=float, default=None,
+                        help="stop after this many seconds")
+    parser.add_argument("--stats-interval", type=float, default=5.0,
+                        help="seconds between printed stats (default: 5)")
+    parser.add_argument("--metrics-port", type=int, default=9108,
+                        help="Prometheus endpoint port, 0 to disable (default: 9108)")
+    args = parser.parse_args(argv)
+
+    definitions = parse_rovers(args)
+    if not definitions:
+        parser.error("no rovers given, use --rover or --config")
+
+    rovers = [Rover(d["name"], d["stream_url"], d["control_url"],
+                    send_commands=not args.no_control) for d in definitions]
+    fleet = FleetEngine(
+        rovers, detector_model=args.model, detector_backend=args.backend,
+        detector_target=args.device, detection_size=(args.size, args.size),
+        detection_interval=args.interval
+    )
+    fleet.follow = args.follow
+    fleet.target_label = args.target
+    if args.metrics_port:
+        fleet.start_metrics_export(args.metrics_port)
+
+    start = time.time()
+    last_stats = start
+    try:
+        while args.duration is None or time.time() - start < args.duration:
+            if fleet.step() == 0:
+                time.sleep(0.002)  # No new frames yet
+
+            now = time.time()
+            if now - last_stats >= args.stats_interval:
+                for rover in rovers:
+                    health = rover.health()
+                    state = "up" if health["connected"] else "down"
+                    print(f"{rover.name}: {state} {health['fps']:.1f} FPS | "
+                          f"{health['inferences']} inferences | "
+                          f"{', '.join(rover.detection_buffer) or '-'}")
+                last_stats = now
+    except KeyboardInterrupt:
+        pass
+    finally:
+        fleet.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,329 @@
+import threading
+import time
+from collections import deque
+
+from command_dispatcher import STOP_COMMAND
+
+FORWARD = '1'
+LEFT = '2'
+RIGHT = '4'
+BACKWARD = '5'
+
+STATE_NAMES = {
+    FORWARD: "FORWARD",
+    LEFT: "LEFT",
+    RIGHT: "RIGHT",
+    BACKWARD: "BACKWARD",
+    STOP_COMMAND: "STOP",
+}
+
+
+class TargetPredictor:
+    """Extrapolates the target offset forward in time from its recent motion.
+
+    Keeps (capture time, offset) samples from the last history seconds and
+    fits a straight line through them; the lead is capped at max_lead so a
+    noisy fit can't throw the estimate far off.
+    """
+
+    def __init__(self, history=0.6, max_lead=0.5, min_samples=3):
+        self.history = history
+        self.max_lead = max_lead
+        self.min_samples = min_samples
+        self.samples = deque(maxlen=32)
+
+    def add(self, timestamp, offset):
+        if self.samples and timestamp <= self.samples[-1][0]:
+            return  # Same frame reported twice
+        self.samples.append((timestamp, offset))
+        while timestamp - self.samples[0][0] > self.history:
+            self.samples.popleft()
+
+    def reset(self):
+        self.samples.clear()
+
+    def velocity(self):
+        """Least-squares slope in offset units per second, None without enough history"""
+        if len(self.samples) < self.min_samples:
+            return None
+        t0 = self.samples[0][0]
+        n = len(self.samples)
+        mean_t = sum(t - t0 for t, _ in self.samples) / n
+        mean_o = sum(o for _, o in self.samples) / n
+        var = sum((t - t0 - mean_t) ** 2 for t, _ in self.samples)
+        if var <= 0:
+            return None
+        return sum((t - t0 - mean_t) * (o - mean_o) for t, o in self.samples) / var
+
+    def predict(self, at):
+        """Offset expected at time at, or the last known offset if motion is unknown"""
+        if not self.samples:
+            return None
+        timestamp, offset = self.samples[-1]
+        velocity = self.velocity()
+        if velocity is None:
+            return offset
+        lead = max(0.0, min(self.max_lead, at - timestamp))
+        return max(-1.0, min(1.0, offset + velocity * lead))
+
+
+class FollowController:
+    """Closed-loop steering on a fixed-rate tick, independent of the frame rate.
+
+    The perception side only reports where the target is with
+    update_target(offset), offset being the horizontal error in [-1, 1]
+    (0 = centered, positive = target to the right). Every 1 / rate
+    seconds the controller runs a PID on that error and picks forward,
+    left or right. Turning starts when the output exceeds deadband +
+    hysteresis and ends when it falls below deadband - hysteresis, so a
+    target sitting on the edge of the deadband doesn't make the rover
+    oscillate. The turn speed grows with the error, between
+    min_turn_speed and max_speed (the user's speed setting).
+
+    With compensate on, the error fed to the PID is not the last reported
+    offset but where the target should be once a command sent now reaches
+    the motors: its motion over recent frames is extrapolated from the
+    frame's capture time to now + command_delay.
+
+    If no target update arrives for target_timeout seconds the rover is
+    stopped (deadman), even if the frame loop itself has stalled.
+    """
+
+    def __init__(self, send_command, set_speed=None, rate=10.0, kp=1.0, ki=0.0, kd=0.05,
+                 deadband=0.33, hysteresis=0.08, max_speed=255, min_turn_speed=140,
+                 speed_step=16, target_timeout=0.5, compensate=True, history=0.6,
+                 max_lead=0.5):
+        self.send_command = send_command  # callable(command)
+        self.set_speed = set_speed  # callable(speed) or None to leave speed alone
+        self.rate = rate
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.deadband = deadband
+        self.hysteresis = hysteresis
+        self.max_speed = max_speed
+        self.min_turn_speed = min_turn_speed
+        self.speed_step = speed_step  # Speed changes smaller than this are not sent
+        self.target_timeout = target_timeout
+
+        # Latency compensation, command_delay is kept current by the owner
+        self.compensate = compensate
+        self.command_delay = 0.0
+        self.predictor = TargetPredictor(history, max_lead)
+        self.predicted_offset = None
+
+        self._lock = threading.Lock()  # Target state shared with the perception side
+        # Held for a whole tick and by engage/disengage, so no tick can send
+        # a movement after the stop disengage() sends
+        self._control_lock = threading.Lock()
+        self._offset = None
+        self._backward = False
+        self._target_time = 0.0
+        self._captured = 0.0
+        self._change = None  # (command, capture time) of the last state change
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        self.enabled = False
+        self.state = STOP_COMMAND
+        self.speed = None
+        self.output = 0.0
+        self._integral = 0.0
+        self._derivative = 0.0
+        self._last_error = None
+        self._last_tick = None
+
+        # Counters
+        self.ticks = 0
+        self.deadman_stops = 0
+        self.commands = 0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="FollowController", daemon=True)
+        self._thread.start()
+
+    def close(self, timeout=1.0):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def engage(self):
+        """Start steering, the rover stays stopped until a target is reported"""
+        with self._control_lock:
+            if not self.enabled:
+                self._reset()
+                self.enabled = True
+
+    def disengage(self):
+        """Stop steering and stop the rover"""
+        with self._control_lock:
+            if self.enabled:
+                self.enabled = False
+                self._reset()
+                self._command(STOP_COMMAND)
+
+    def update_target(self, offset, backward=False, timestamp=None, captured=None):
+        """Report the latest target position, called from the perception side.
+
+        captured is when the frame the position came from arrived; it
+        defaults to timestamp, the time of the report.
+        """
+        now = time.time() if timestamp is None else timestamp
+        captured = now if captured is None else captured
+        offset = max(-1.0, min(1.0, float(offset)))
+        with self._lock:
+            self._offset = offset
+            self._backward = backward
+            self._target_time = now
+            self._captured = captured
+            self.predictor.add(captured, offset)
+
+    def clear_target(self):
+        """The target is known to be gone, stop on the next tick"""
+        with self._lock:
+            self._offset = None
+            self.predictor.reset()
+
+    def new_target(self):
+        """A different target is being followed, forget the old one's motion"""
+        with self._lock:
+            self.predictor.reset()
+
+    def pop_change(self, command):
+        """Capture time of the frame that caused command, once, if it was a controller decision"""
+        change = self._change
+        if change is not None and change[0] == command:
+            self._change = None
+            return change[1]
+        return None
+
+    def _reset(self):
+        with self._lock:
+            self._offset = None
+            self.predictor.reset()
+        self._integral = 0.0
+        self._derivative = 0.0
+        self._last_error = None
+        self._last_tick = None
+        self.output = 0.0
+
+    def _run(self):
+        period = 1.0 / self.rate
+        next_tick = time.perf_counter()
+        while not self._stop_event.is_set():
+            if self.enabled:
+                try:
+                    self.tick()
+                except Exception as e:
+                    print(f"Error in follow controller: {e}")
+            next_tick += period
+            delay = next_tick - time.perf_counter()
+            if delay < 0:
+                next_tick = time.perf_counter()  # Fell behind, don't try to catch up
+                delay = 0
+            self._stop_event.wait(delay)
+
+    def tick(self, now=None):
+        """One control step, returns the command the rover should be executing"""
+        with self._control_lock:
+            if not self.enabled:
+                return self.state  # Disengaged while this tick was waiting
+            return self._tick(time.time() if now is None else now)
+
+    def _tick(self, now):
+        self.ticks += 1
+        with self._lock:
+            offset, backward, target_time = self._offset, self._backward, self._target_time
+            captured = self._captured
+            if offset is not None and self.compensate:
+                # Where the target will be once a command sent now takes effect
+                offset = self.predictor.predict(now + self.command_delay)
+        self.predicted_offset = offset
+
+        if offset is None or now - target_time > self.target_timeout:
+            if offset is not None:
+                self.deadman_stops += 1
+                self.clear_target()
+            self._integral = 0.0
+            self._derivative = 0.0
+            self._last_error = None
+            self._last_tick = None
+            return self._command(STOP_COMMAND)
+
+        if backward:
+            self._apply_speed(self.max_speed)
+            return self._command(BACKWARD, captured)
+
+        # PID on the horizontal error
+        dt = now - self._last_tick if self._last_tick is not None else 1.0 / self.rate
+        dt = max(dt, 1e-3)
+        self._integral = max(-1.0, min(1.0, self._integral + offset * dt))
+        if self._last_error is not None:
+            # Low-passed, detection boxes jitter from pass to pass
+            raw = (offset - self._last_error) / dt
+            self._derivative += 0.3 * (raw - self._derivative)
+        derivative = self._derivative
+        self._last_error = offset
+        self._last_tick = now
+        output = self.kp * offset + self.ki * self._integral + self.kd * derivative
+        self.output = output = max(-1.0, min(1.0, output))
+
+        # Hysteresis around the deadband
+        enter = self.deadband + self.hysteresis
+        leave = self.deadband - self.hysteresis
+        state = self.state if self.state in (LEFT, RIGHT) else FORWARD
+        if output > enter:
+            state = RIGHT
+        elif output < -enter:
+            state = LEFT
+        elif state == RIGHT and output < leave:
+            state = FORWARD
+        elif state == LEFT and output > -leave:
+            state = FORWARD
+
+        if state == FORWARD:
+            self._apply_speed(self.max_speed)
+        else:
+            # Turn harder the further off-center the target is
+            strength = min(1.0, (abs(output) - leave) / max(1e-6, 1.0 - leave))
+            self._apply_speed(self.min_turn_speed
+                              + (self.max_speed - self.min_turn_speed) * strength)
+        return self._command(state, captured)
+
+    def _apply_speed(self, speed):
+        if self.set_speed is None:
+            return
+        speed = int(min(self.max_speed, max(0, speed)))
+        if self.speed is None or abs(speed - self.speed) >= self.speed_step or speed == self.max_speed:
+            if speed != self.speed:
+                self.speed = speed
+                self.set_speed(speed)
+
+    def _command(self, command, captured=None):
+        if command != self.state:
+            self.commands += 1
+            self._change = (command, captured) if captured is not None else None
+        self.state = command
+        self.send_command(command)
+        return command
+
+    @property
+    def status(self):
+        return STATE_NAMES.get(self.state, self.state)
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "state": self.status,
+            "output": self.output,
+            "predicted_offset": self.predicted_offset,
+            "command_delay_ms": self.command_delay * 1000,
+            "speed": self.speed,
+            "ticks": self.ticks,
+            "commands": self.commands,
+            "deadman_stops": self.deadman_stops,
+        }
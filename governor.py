@@ -0,0 +1,363 @@
+import time
+from collections import deque
+
+import numpy as np
+
+
+class DetectionGovernor:
+    """Tunes the detection interval and input size to a latency and FPS budget.
+
+    Two things are kept in check:
+      - a single inference must finish within target_latency seconds, so
+        detections are never too old to steer on
+      - inference averaged over the interval may use at most load_fraction
+        of the frame budget (1 / target_fps), so the frame loop keeps up
+
+    When over budget it first drops the input size (for latency) or runs
+    detection less often (for load). When comfortably under budget it does
+    the reverse. A change is only made when a budget is missed or beaten by
+    more than the hysteresis margin, and after each change the governor
+    waits for min_samples fresh measurements before deciding again.
+    """
+
+    def __init__(self, target_latency=0.12, target_fps=20.0, load_fraction=0.5,
+                 sizes=(224, 320, 416), size=320, interval=2, min_interval=1,
+                 max_interval=10, hysteresis=0.2, min_samples=10):
+        self.target_latency = target_latency
+        self.target_fps = target_fps
+        self.load_fraction = load_fraction
+        self.sizes = sorted(sizes)
+        self.size = size if size in self.sizes else self.sizes[len(self.sizes) // 2]
+        self.interval = interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.hysteresis = hysteresis
+        self.min_samples = min_samples
+
+        self.inference_times = deque(maxlen=min_samples)
+        self.frame_times = deque(maxlen=60)
+        self.last_change = None
+        self.decision = "warming up"
+
+    @property
+    def input_size(self):
+        return (self.size, self.size)
+
+    def record_frame(self, timestamp=None):
+        """Call once per processed frame"""
+        self.frame_times.append(time.time() if timestamp is None else timestamp)
+
+    def record_inference(self, seconds):
+        """Call with the duration of every detector run, returns True if the settings changed"""
+        self.inference_times.append(seconds)
+        if len(self.inference_times) < self.min_samples:
+            return False
+        return self._decide()
+
+    def frame_rate(self):
+        if len(self.frame_times) < 2:
+            return 0.0
+        span = self.frame_times[-1] - self.frame_times[0]
+        return (len(self.frame_times) - 1) / span if span > 0 else 0.0
+
+    def _decide(self):
+        latency = sorted(self.inference_times)[len(self.inference_times) // 2]
+        frame_budget = 1.0 / self.target_fps
+        load_budget = self.load_fraction * frame_budget
+        upper = 1 + self.hysteresis
+        lower = 1 - self.hysteresis
+        index = self.sizes.index(self.size)
+        changed = None
+
+        if latency > self.target_latency * upper and index > 0:
+            self.size = self.sizes[index - 1]
+            changed = "size down (latency)"
+        elif latency / self.interval > load_budget * upper:
+            if self.interval < self.max_interval:
+                self.interval += 1
+                changed = "interval up (load)"
+            elif index > 0:
+                self.size = self.sizes[index - 1]
+                changed = "size down (load)"
+        elif latency < self.target_latency * lower:
+            if (self.interval > self.min_interval
+                    and latency / (self.interval - 1) < load_budget * lower):
+                self.interval -= 1
+                changed = "interval down"
+            elif index + 1 < len(self.sizes):
+                # Inference cost grows roughly with the input area
+                scale = (self.sizes[index + 1] / self.size) ** 2
+                predicted = latency * scale
+                if (predicted < self.target_latency * lower
+                        and predicted / self.interval < load_budget * lower):
+                    self.size = self.sizes[index + 1]
+                    changed = "size up"
+
+        summary = f"{self.size}px every {self.interval} ({latency * 1000:.0f} ms)"
+        if changed:
+            self.decision = f"{summary} - {changed}"
+            self.last_change = time.time()
+            self.inference_times.clear()
+            return True
+        self.decision = summary
+        return False
+
+    def stats(self):
+        return {
+            "size": self.size,
+            "interval": self.interval,
+            "fps": self.frame_rate(),
+            "decision": self.decision,
+        }
+
+
+class StreamGovernor:
+    """Steps the camera frame size and JPEG quality to what the link and CPU sustain.
+
+    The settings form a ladder from the largest frame size at the best
+    quality down to the smallest at the worst, within the user's bounds.
+    Every window seconds the last window of frames is checked:
+      - link: the arrival rate must reach target_fps and the arrival
+        jitter (p90 - p50 of the gaps between parts, relative to p50)
+        must stay under jitter_limit
+      - CPU: the median JPEG decode must fit in decode_fraction of the
+        frame budget, the frame loop must consume most of the frames that
+        arrive, and the detector stage may drop at most inference_drop_limit
+        of the frames queued for it
+    Any check failing by more than the hysteresis margin moves one rung
+    down at once, two when it is over twice its limit. Moving up takes
+    up_windows clean windows in a row, with every check beaten by the
+    margin. A rung that had to be left again soon after moving up to it
+    is held off for twice as long each time, so the governor doesn't keep
+    probing a level the link can't carry.
+
+    A camera that can't reach target_fps even on small frames would
+    otherwise fail the rate check on every rung. When stepping down for
+    the rate has halved the bytes per frame without raising the rate,
+    the rate is taken to be the source's limit: the governor returns to
+    the rung it started from and from then on checks the rate against
+    that limit instead of target_fps.
+
+    framesize and quality are only a starting guess; seed() moves to the
+    rung closest to what the camera actually reports.
+    """
+
+    def __init__(self, framesizes=(5, 6, 7, 8, 9, 10), qualities=(10, 40), quality_steps=3,
+                 framesize=8, quality=12, target_fps=15.0, jitter_limit=0.5,
+                 decode_fraction=0.5, skip_limit=0.3, inference_drop_limit=0.5, hysteresis=0.2,
+                 window=2.0, min_samples=10, up_windows=3, hold_off=10.0):
+        self.framesizes = sorted(framesizes)  # Firmware framesize values, larger is bigger
+        self.qualities = tuple(sorted(qualities))  # (best, worst), lower is better
+        self.quality_steps = quality_steps
+        self.target_fps = target_fps
+        self.jitter_limit = jitter_limit
+        self.decode_fraction = decode_fraction
+        self.skip_limit = skip_limit
+        self.inference_drop_limit = inference_drop_limit
+        self.hysteresis = hysteresis
+        self.window = window
+        self.min_samples = min_samples
+        self.up_windows = up_windows
+        self.hold_off = hold_off
+
+        self.levels = []
+        self.level = 0
+        self._build_levels(framesize, quality)
+        self.seeded = False  # Started from the camera's reported settings
+
+        self.arrivals = deque(maxlen=256)  # (time, bytes) per received part
+        self.decode_times = deque(maxlen=256)
+        self.consumed = 0
+        self.inference_counts = None  # Detector stage (submitted, dropped) at the window start
+        self.inference_latest = None
+        self.window_start = None
+        self.clean_windows = 0
+        self.upgraded_at = None  # When the current level was reached by moving up
+        self.held = {}  # level -> (until, hold-off seconds)
+        self.source_fps = None  # Frame rate the camera itself can't exceed, once learned
+        # (fps, frame bytes, level) before stepping down for the rate
+        self._fps_probe = None
+        self.last_change = None
+        self.decision = "warming up"
+        self.measured = {}
+
+    @property
+    def framesize(self):
+        return self.levels[self.level][0]
+
+    @property
+    def quality(self):
+        return self.levels[self.level][1]
+
+    def _build_levels(self, framesize, quality):
+        best, worst = self.qualities
+        steps = max(1, self.quality_steps)
+        qualities = sorted({round(best + (worst - best) * i / max(1, steps - 1))
+                            for i in range(steps)})
+        self.levels = [(size, q) for size in reversed(self.framesizes) for q in qualities]
+        # Start on the rung closest to the current settings
+        self.level = min(range(len(self.levels)),
+                         key=lambda i: (abs(self.levels[i][0] - framesize),
+                                        abs(self.levels[i][1] - quality)))
+
+    def seed(self, framesize, quality):
+        """Start from the rung closest to the camera's current settings"""
+        self._build_levels(framesize, quality)
+        self.seeded = True
+        self.reset()
+
+    def set_bounds(self, framesizes=None, qualities=None):
+        """Change the user bounds, the current level is moved inside them"""
+        framesize, quality = self.framesize, self.quality
+        if framesizes is not None:
+            self.framesizes = sorted(framesizes)
+        if qualities is not None:
+            self.qualities = tuple(sorted(qualities))
+        self._build_levels(framesize, quality)
+        self.held.clear()
+        self._fps_probe = None
+        self._reset_window()
+        return (self.framesize, self.quality) != (framesize, quality)
+
+    def reset(self):
+        """Start over with a fresh window, e.g. after reconnecting"""
+        self.window_start = None
+        self.clean_windows = 0
+        self.upgraded_at = None
+        self.source_fps = None
+        self._fps_probe = None
+
+    def record_arrival(self, timestamp, size):
+        """Call for every part received from the stream, consumed or not"""
+        self.arrivals.append((timestamp, size))
+
+    def record_decode(self, seconds):
+        """Call for every frame the loop decoded"""
+        self.decode_times.append(seconds)
+        self.consumed += 1
+
+    def record_inference(self, submitted, dropped):
+        """Call with the detector stage's running submitted and dropped counts"""
+        self.inference_latest = (submitted, dropped)
+        if self.inference_counts is None:
+            self.inference_counts = self.inference_latest
+
+    def _reset_window(self, now=None):
+        self.window_start = time.time() if now is None else now
+        self.arrivals.clear()
+        self.decode_times.clear()
+        self.consumed = 0
+        self.inference_counts = self.inference_latest
+
+    def update(self, now=None):
+        """Check the window if it is complete, returns True if the settings changed"""
+        now = time.time() if now is None else now
+        if self.window_start is None:
+            self._reset_window(now)
+            return False
+        if now - self.window_start < self.window or len(self.arrivals) < self.min_samples:
+            return False
+
+        times = [t for t, _ in self.arrivals]
+        gaps = np.diff(times)
+        span = times[-1] - times[0]
+        fps = (len(times) - 1) / span if span > 0 else 0.0
+        p50, p90 = np.percentile(gaps, [50, 90])
+        jitter = (p90 - p50) / p50 if p50 > 0 else 0.0
+        frame_bytes = sum(size for _, size in self.arrivals) / len(self.arrivals)
+        decode = float(np.median(self.decode_times)) if self.decode_times else 0.0
+        skipped = 1.0 - min(1.0, self.consumed / len(self.arrivals))
+        inference_dropped = 0.0
+        if self.inference_counts is not None:
+            submitted = self.inference_latest[0] - self.inference_counts[0]
+            dropped = self.inference_latest[1] - self.inference_counts[1]
+            if submitted > 0:
+                inference_dropped = dropped / submitted
+        self.measured = {
+            "fps": fps,
+            "jitter": float(jitter),
+            "frame_bytes": frame_bytes,
+            "throughput": frame_bytes * fps,
+            "decode_ms": decode * 1000,
+            "skipped": skipped,
+            "inference_dropped": inference_dropped,
+        }
+
+        previous = f"{self.framesize}/q{self.quality}"
+        summary = f"{fps:.1f} fps, {frame_bytes / 1024:.0f} KB, jitter {jitter:.2f}"
+        if self._fps_probe is not None:
+            probe_fps, probe_bytes, probe_level = self._fps_probe
+            if fps >= probe_fps * (1 + self.hysteresis):
+                self._fps_probe = None  # Smaller frames came faster, the link was the limit
+            elif frame_bytes <= probe_bytes / 2:
+                # Half the bytes and no faster, the camera is the limit
+                self._fps_probe = None
+                self.source_fps = max(probe_fps, fps)
+                self.level = probe_level
+                self.clean_windows = 0
+                self._reset_window(now)
+                self.decision = (f"{previous} -> {self.framesize}/q{self.quality}, {summary}"
+                                 f" - source limited to {self.source_fps:.1f} fps")
+                self.last_change = now
+                return True
+        if self.source_fps is not None and fps > self.source_fps:
+            self.source_fps = fps
+        fps_target = self.target_fps
+        if self.source_fps is not None:
+            # Well under the source's own rate still means the link is struggling
+            fps_target = min(fps_target, self.source_fps * (1 - 2 * self.hysteresis))
+
+        # Each check as measured / limit, above 1 is over budget
+        load = {
+            "fps": fps_target / fps if fps > 0 else float("inf"),
+            "jitter": jitter / self.jitter_limit,
+            "decode": decode / (self.decode_fraction / self.target_fps),
+            "skipped": skipped / self.skip_limit,
+            "inference": inference_dropped / self.inference_drop_limit,
+        }
+        worst = max(load, key=load.get)
+        changed = None
+
+        if load[worst] > 1 + self.hysteresis:
+            self.clean_windows = 0
+            if self.level + 1 < len(self.levels):
+                if self.upgraded_at is not None and now - self.upgraded_at < self.window * 3:
+                    # The level we just probed couldn't be sustained
+                    _, seconds = self.held.get(self.level, (0.0, self.hold_off / 2))
+                    self.held[self.level] = (now + seconds * 2, seconds * 2)
+                rungs = 2 if load[worst] > 2 else 1
+                if worst == "fps" and self._fps_probe is None:
+                    self._fps_probe = (fps, frame_bytes, self.level)
+                self.level = min(len(self.levels) - 1, self.level + rungs)
+                self.upgraded_at = None
+                changed = f"down ({worst})"
+        elif load[worst] < 1 - self.hysteresis:
+            self.clean_windows += 1
+            up = self.level - 1
+            if (up >= 0 and self.clean_windows >= self.up_windows
+                    and now >= self.held.get(up, (0.0, 0.0))[0]):
+                self.level = up
+                self.upgraded_at = now
+                self.clean_windows = 0
+                changed = "up"
+        else:
+            self.clean_windows = 0
+
+        self._reset_window(now)
+        if changed:
+            self.decision = f"{previous} -> {self.framesize}/q{self.quality}, {summary} - {changed}"
+            self.last_change = now
+            return True
+        self.decision = f"{previous}, {summary}"
+        return False
+
+    def stats(self):
+        return {
+            "framesize": self.framesize,
+            "quality": self.quality,
+            "level": self.level,
+            "levels": len(self.levels),
+            "decision": self.decision,
+            "source_fps": self.source_fps,
+            **self.measured,
+        }
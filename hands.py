@@ -0,0 +1,145 @@
+import cv2
+import numpy as np
+
+# Same as mediapipe.solutions.hands.HAND_CONNECTIONS, so drawing doesn't
+# need mediapipe, which is only imported once a HandDetector is created
+HAND_CONNECTIONS = frozenset([
+    (0, 1), (1, 2), (2, 3), (3, 4),
+    (0, 5), (5, 6), (6, 7), (7, 8),
+    (5, 9), (9, 10), (10, 11), (11, 12),
+    (9, 13), (13, 14), (14, 15), (15, 16),
+    (13, 17), (0, 17), (17, 18), (18, 19), (19, 20),
+])
+PALM_LANDMARK = 9  # Middle finger MCP, used as the palm position
+
+
+class HandDetector:
+    """MediaPipe Hands tuned for following a single hand.
+
+    process() returns the landmarks of the first hand as a (21, 3) float32
+    array of normalized x, y, z, or None when no hand is found.
+    """
+
+    def __init__(self, max_num_hands=1, min_detection_confidence=0.5,
+                 min_tracking_confidence=0.3, model_complexity=0):
+        import mediapipe as mp
+
+        self.hands = mp.solutions.hands.Hands(
+            static_image_mode=False,
+            max_num_hands=max_num_hands,
+            min_detection_confidence=min_detection_confidence,
+            min_tracking_confidence=min_tracking_confidence,  # Lower tracking confidence for better performance
+            model_complexity=model_complexity  # Use simpler model (0, 1, or 2)
+        )
+
+    def process(self, frame):
+        # Convert BGR to RGB without copying
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        rgb_frame.flags.writeable = False  # Performance optimization
+        results = self.hands.process(rgb_frame)
+
+        if not results.multi_hand_landmarks:
+            return None
+        return np.array(
+            [(lm.x, lm.y, lm.z) for lm in results.multi_hand_landmarks[0].landmark],
+            dtype=np.float32
+        )
+
+    def close(self):
+        self.hands.close()
+
+
+class HandTracker:
+    """HandDetector that only searches around the hand it is following.
+
+    Once a hand is found, the next frame is cropped to a square around the
+    palm (landmark 9), padding times the size of the hand, and shrunk to at
+    most roi_size pixels before it goes to MediaPipe. The crop follows the
+    palm, so the hand stays near the middle of what MediaPipe sees and its
+    own frame-to-frame tracking keeps working. When the hand is not found
+    in the crop, the same frame is searched in full and the tracker stays
+    on full frames until the hand is back.
+
+    process() returns landmarks normalized to the full frame, like
+    HandDetector.
+    """
+
+    def __init__(self, track_roi=True, roi_size=224, padding=2.2, min_roi=96, **options):
+        self.detector = HandDetector(**options)
+        self.track_roi = track_roi
+        self.roi_size = roi_size  # Input size of the landmark model, smaller crops pass as they are
+        self.padding = padding
+        self.min_roi = min_roi
+        self.roi = None  # (x, y, side) in pixels of the next crop, None to search the full frame
+
+        self.roi_passes = 0
+        self.full_passes = 0
+        self.losses = 0
+
+    def process(self, frame):
+        height, width = frame.shape[:2]
+        landmarks = None
+        if self.roi is not None:
+            landmarks = self._process_roi(frame, width, height)
+            if landmarks is None:
+                self.losses += 1
+        if landmarks is None:
+            self.full_passes += 1
+            landmarks = self.detector.process(frame)
+
+        self.roi = self._next_roi(landmarks, width, height) if self.track_roi else None
+        return landmarks
+
+    def _process_roi(self, frame, width, height):
+        self.roi_passes += 1
+        x, y, side = self.roi
+        crop = frame[y:y + side, x:x + side]
+        if side > self.roi_size:
+            crop = cv2.resize(crop, (self.roi_size, self.roi_size), interpolation=cv2.INTER_AREA)
+        landmarks = self.detector.process(crop)
+        if landmarks is None:
+            return None
+        # Crop coordinates back to full-frame coordinates
+        landmarks[:, 0] = (x + landmarks[:, 0] * side) / width
+        landmarks[:, 1] = (y + landmarks[:, 1] * side) / height
+        landmarks[:, 2] *= side / width
+        return landmarks
+
+    def _next_roi(self, landmarks, width, height):
+        if landmarks is None:
+            return None
+        points = landmarks[:, :2] * (width, height)
+        span = float(np.max(points.max(axis=0) - points.min(axis=0)))
+        side = int(min(max(span * self.padding, self.min_roi), width, height))
+        palm_x, palm_y = points[PALM_LANDMARK]
+        x = int(min(max(palm_x - side / 2, 0), width - side))
+        y = int(min(max(palm_y - side / 2, 0), height - side))
+        return x, y, side
+
+    def reset(self):
+        """Search the full frame on the next call"""
+        self.roi = None
+
+    def close(self):
+        self.detector.close()
+
+    def stats(self):
+        passes = self.roi_passes + self.full_passes
+        return {
+            "roi_passes": self.roi_passes,
+            "full_passes": self.full_passes,
+            "losses": self.losses,
+            "roi_ratio": self.roi_passes / passes if passes else 0.0,
+            "roi": self.roi,
+        }
+
+
+def draw_hand_landmarks(frame, landmarks):
+    """Draw minimal hand landmarks and connections onto a BGR frame"""
+    height, width = frame.shape[:2]
+    points = (landmarks[:, :2] * (width, height)).astype(np.int32)
+    for start, end in HAND_CONNECTIONS:
+        cv2.line(frame, tuple(points[start]), tuple(points[end]), (0, 0, 255), 1)
+    for point in points:
+        cv2.circle(frame, tuple(point), 1, (0, 255, 0), -1)
+    return frame
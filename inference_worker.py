@@ -0,0 +1,215 @@
+import multiprocessing as mp
+import queue
+import time
+from collections import namedtuple
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# One finished job coming back from a worker process
+#   payload: Detections for "detector", (21, 3) landmarks or None for "hands"
+InferenceResult = namedtuple("InferenceResult", ["kind", "frame_id", "payload", "elapsed"])
+
+
+class SharedFrameRing:
+    """Fixed number of frame-sized slots in shared memory, indexed by slot number"""
+
+    def __init__(self, frame_shape, slots, name=None):
+        self.frame_shape = tuple(frame_shape)
+        self.slots = slots
+        size = int(np.prod(self.frame_shape)) * slots
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.frames = np.ndarray((slots,) + self.frame_shape, dtype=np.uint8, buffer=self.shm.buf)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def write(self, slot, frame):
+        self.frames[slot][...] = frame
+
+    def close(self):
+        self.frames = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _worker_main(kind, ring_name, frame_shape, slots, tasks, results, options):
+    """Child process: load the model once, then serve frames out of the ring"""
+    ring = SharedFrameRing(frame_shape, slots, name=ring_name)
+    start = time.perf_counter()
+    try:
+        if kind == "detector":
+            from detectors import create_engine
+
+            preset = options.pop("preset")
+            model = create_engine(preset, **options)
+            model.load()
+            run = model.detect
+        elif kind == "hands":
+            from hands import HandTracker
+
+            model = HandTracker(**options)
+            run = model.process
+        else:
+            raise ValueError(f"Unknown worker kind: {kind}")
+        # Warmup pass on the still empty slot, the first real frame isn't slower
+        loaded = time.perf_counter()
+        run(ring.frames[0])
+        if kind == "hands":
+            model.reset()
+    except Exception as e:
+        results.put(("error", None, str(e), 0.0))
+        ring.close()
+        return
+
+    print(f"{kind} worker ready: load {(loaded - start) * 1000:.0f} ms, "
+          f"warmup {(time.perf_counter() - loaded) * 1000:.0f} ms")
+    results.put(("ready", None, None, 0.0))
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        frame_id, slot, input_size = task
+        if input_size is not None and getattr(model, "resizable", False):
+            model.input_size = input_size
+        start = time.perf_counter()
+        try:
+            payload = run(ring.frames[slot])
+        except Exception as e:
+            print(f"Error in {kind} worker: {e}")
+            payload = None
+        # Results are small NumPy arrays, frames themselves never get pickled
+        results.put((kind, frame_id, (slot, payload), time.perf_counter() - start))
+
+    if kind == "hands":
+        model.close()
+    ring.close()
+
+
+class InferenceWorker:
+    """Runs a detector or MediaPipe Hands in child processes.
+
+    Frames are copied into shared-memory slots and only (frame_id, slot) goes
+    over the task queue. When every slot is busy the new frame is dropped,
+    so the caller never blocks and results are never older than a few frames.
+    """
+
+    def __init__(self, kind, frame_shape, slots=2, processes=1, **options):
+        self.kind = kind
+        self.frame_shape = tuple(frame_shape)
+        self.slots = slots
+        self.processes = processes
+        self.options = options
+
+        self.ring = None
+        self._ctx = mp.get_context("spawn")  # Don't fork the Tk process
+        self._tasks = None
+        self._results = None
+        self._workers = []
+        self._free_slots = []
+        self._next_frame_id = 0
+
+        self.ready = False
+        self.error = None
+        self.submitted = 0
+        self.dropped = 0
+        self.completed = 0
+        self.last_elapsed = None
+
+    def start(self):
+        self.ring = SharedFrameRing(self.frame_shape, self.slots)
+        self._free_slots = list(range(self.slots))
+        self._tasks = self._ctx.Queue()
+        self._results = self._ctx.Queue()
+        for i in range(self.processes):
+            process = self._ctx.Process(
+                target=_worker_main,
+                args=(self.kind, self.ring.name, self.frame_shape, self.slots,
+                      self._tasks, self._results, dict(self.options)),
+                name=f"{self.kind}-worker-{i}",
+                daemon=True
+            )
+            process.start()
+            self._workers.append(process)
+
+    def wait_ready(self, timeout=120.0):
+        """Block until a worker has loaded its model, raises RuntimeError if it failed"""
+        deadline = time.perf_counter() + timeout
+        while not self.ready:
+            self.poll()
+            if self.error is not None:
+                raise RuntimeError(self.error)
+            if time.perf_counter() > deadline:
+                raise RuntimeError(f"{self.kind} worker not ready after {timeout:.0f} s")
+            time.sleep(0.05)
+
+    def is_alive(self):
+        return any(process.is_alive() for process in self._workers)
+
+    def submit(self, frame, input_size=None):
+        """Hand a frame to the workers, returns its frame_id or None if dropped.
+
+        input_size optionally changes the detector input size from this frame on.
+        """
+        if self.error is not None or not self._free_slots or frame.shape != self.frame_shape:
+            self.dropped += 1
+            return None
+        slot = self._free_slots.pop()
+        self.ring.write(slot, frame)
+        frame_id = self._next_frame_id
+        self._next_frame_id += 1
+        self._tasks.put((frame_id, slot, input_size))
+        self.submitted += 1
+        return frame_id
+
+    def busy(self):
+        return len(self._free_slots) < self.slots
+
+    def poll(self):
+        """Return all results that have arrived, without blocking"""
+        finished = []
+        while True:
+            try:
+                kind, frame_id, payload, elapsed = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "ready":
+                self.ready = True
+                continue
+            if kind == "error":
+                self.error = payload
+                print(f"{self.kind} worker failed to start: {payload}")
+                continue
+            slot, payload = payload
+            self._free_slots.append(slot)
+            self.completed += 1
+            self.last_elapsed = elapsed
+            finished.append(InferenceResult(kind, frame_id, payload, elapsed))
+        return finished
+
+    def close(self, timeout=2.0):
+        for _ in self._workers:
+            self._tasks.put(None)
+        for process in self._workers:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self._workers = []
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+
+    def stats(self):
+        return {
+            "submitted": self.submitted,
+            "dropped": self.dropped,
+            "completed": self.completed,
+            "last_ms": self.last_elapsed * 1000 if self.last_elapsed is not None else None,
+        }
+
@@ -0,0 +1,61 @@
+from collections import deque
+
+
+def _median(values):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[len(ordered) // 2]
+
+
+class LatencyTracker:
+    """Rolling estimates of how stale perception is by the time the rover reacts.
+
+    Three things are measured, all in seconds:
+      frame_age   frame arrival -> end of processing (decision made)
+      command     command round trip to the rover (request -> HTTP ack)
+      end_to_end  frame arrival -> ack of the command that frame caused
+
+    Arrival is when the frame was received, so camera exposure, JPEG
+    encoding and Wi-Fi transfer before that are not included; add them
+    as camera_delay if known.
+    """
+
+    def __init__(self, window=50, camera_delay=0.0):
+        self.camera_delay = camera_delay
+        self.frame_ages = deque(maxlen=window)
+        self.command_times = deque(maxlen=window)
+        self.end_to_end_times = deque(maxlen=window)
+
+    def record_frame_age(self, seconds):
+        self.frame_ages.append(seconds)
+
+    def record_command(self, seconds):
+        self.command_times.append(seconds)
+
+    def record_end_to_end(self, seconds):
+        self.end_to_end_times.append(seconds)
+
+    @property
+    def frame_age(self):
+        return _median(self.frame_ages) or 0.0
+
+    @property
+    def command_delay(self):
+        """One-way delay until a command reaches the motors, half the round trip"""
+        round_trip = _median(self.command_times)
+        return round_trip / 2 if round_trip is not None else 0.0
+
+    def estimate(self):
+        """Age of the target position when the motors act on it"""
+        return self.camera_delay + self.frame_age + self.command_delay
+
+    def stats(self):
+        def ms(value):
+            return value * 1000 if value is not None else None
+        return {
+            "frame_age_ms": ms(_median(self.frame_ages)),
+            "command_ms": ms(_median(self.command_times)),
+            "end_to_end_ms": ms(_median(self.end_to_end_times)),
+            "estimate_ms": ms(self.estimate()),
+        }
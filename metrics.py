@@ -0,0 +1,218 @@
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+
+class RollingHistogram:
+    """Keeps the most recent samples for quantiles, plus lifetime count and sum"""
+
+    def __init__(self, window=500):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+
+    def quantiles(self, quantiles=QUANTILES):
+        values = sorted(self.samples)
+        if not values:
+            return {q: None for q in quantiles}
+        return {q: values[min(len(values) - 1, int(q * len(values)))] for q in quantiles}
+
+    def mean(self):
+        return sum(self.samples) / len(self.samples) if self.samples else None
+
+
+class Metrics:
+    """Stage timings, counters and gauges for the hot path.
+
+    Stage durations are in seconds. Collectors are callables returning a
+    dict of extra values (e.g. capture or command counters) and are read
+    only when metrics are exported, so they cost nothing per frame.
+    """
+
+    def __init__(self, window=500):
+        self.window = window
+        self._lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self.collectors = []
+        self.started = time.time()
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = RollingHistogram(self.window)
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def increment(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def set_gauge(self, name, value):
+        self.gauges[name] = value
+
+    def add_collector(self, collector):
+        self.collectors.append(collector)
+
+    def _collected(self):
+        values = {}
+        for collector in self.collectors:
+            try:
+                values.update(collector())
+            except Exception as e:
+                print(f"Error in metrics collector: {e}")
+        return values
+
+    def snapshot(self):
+        """Plain dict of everything, stage latencies in milliseconds"""
+        with self._lock:
+            stages = {}
+            for stage, histogram in self.histograms.items():
+                quantiles = histogram.quantiles()
+                stages[stage] = {
+                    "count": histogram.count,
+                    "mean_ms": _ms(histogram.mean()),
+                    "p50_ms": _ms(quantiles[0.5]),
+                    "p95_ms": _ms(quantiles[0.95]),
+                    "p99_ms": _ms(quantiles[0.99]),
+                }
+            counters = dict(self.counters)
+        gauges = dict(self.gauges)
+        gauges.update(self._collected())
+        return {
+            "time": time.time(),
+            "uptime_s": time.time() - self.started,
+            "stages": stages,
+            "counters": counters,
+            "gauges": gauges,
+        }
+
+    def prometheus_text(self, prefix="rover"):
+        """Render everything in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            if self.histograms:
+                name = f"{prefix}_stage_seconds"
+                lines.append(f"# HELP {name} Per-stage latency over the recent window")
+                lines.append(f"# TYPE {name} summary")
+                for stage, histogram in sorted(self.histograms.items()):
+                    for q, value in histogram.quantiles().items():
+                        if value is not None:
+                            lines.append(f'{name}{{stage="{stage}",quantile="{q}"}} {value:.6f}')
+                    lines.append(f'{name}_sum{{stage="{stage}"}} {histogram.total:.6f}')
+                    lines.append(f'{name}_count{{stage="{stage}"}} {histogram.count}')
+            for counter, value in sorted(self.counters.items()):
+                lines.append(f"# TYPE {prefix}_{counter}_total counter")
+                lines.append(f"{prefix}_{counter}_total {value}")
+        gauges = dict(self.gauges)
+        gauges.update(self._collected())
+        for gauge, value in sorted(gauges.items()):
+            if isinstance(value, bool):
+                value = int(value)
+            if isinstance(value, (int, float)):
+                lines.append(f"# TYPE {prefix}_{gauge} gauge")
+                lines.append(f"{prefix}_{gauge} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _ms(seconds):
+    return seconds * 1000 if seconds is not None else None
+
+
+class MetricsServer:
+    """Serves Metrics.prometheus_text() on http://host:port/metrics from a daemon thread"""
+
+    def __init__(self, metrics, port=9108, host="127.0.0.1"):
+        self.metrics = metrics
+        self.port = port
+        self.host = host
+        self.server = None
+        self._thread = None
+
+    def start(self):
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Don't print every scrape
+
+        try:
+            self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        except OSError as e:
+            print(f"Metrics endpoint not started on port {self.port}: {e}")
+            return False
+        self._thread = threading.Thread(
+            target=self.server.serve_forever, name="MetricsServer", daemon=True
+        )
+        self._thread.start()
+        print(f"Metrics at http://{self.host}:{self.port}/metrics")
+        return True
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+class JsonlMetricsWriter:
+    """Appends a Metrics.snapshot() line to a JSONL file every interval seconds"""
+
+    def __init__(self, metrics, path, interval=5.0):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="JsonlMetricsWriter", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def write(self):
+        try:
+            with open(self.path, "a") as f:
+                f.write(json.dumps(self.metrics.snapshot()) + "\n")
+        except Exception as e:
+            print(f"Error writing metrics: {e}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(1.0)
+            self._thread = None
+        self.write()  # Final snapshot
@@ -0,0 +1,322 @@
+import http.client
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+import cv2
+import numpy as np
+
+# cv2.imdecode flags for libjpeg DCT-domain downscaling, largest factor first
+REDUCED_DECODE_FLAGS = [
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+]
+
+
+def reduced_decode_flag(frame_size, target_size):
+    """Pick the largest JPEG scale factor that still covers target_size.
+
+    Both sizes are (width, height). Returns (factor, imdecode flag);
+    factor 1 means a full-size decode.
+    """
+    if frame_size is None or target_size is None:
+        return 1, cv2.IMREAD_COLOR
+    width, height = frame_size
+    target_width, target_height = target_size
+    for factor, flag in REDUCED_DECODE_FLAGS:
+        if width // factor >= target_width and height // factor >= target_height:
+            return factor, flag
+    return 1, cv2.IMREAD_COLOR
+
+
+class _PartBuffer:
+    """Growable byte buffer that keeps its allocation between frames"""
+
+    def __init__(self, capacity=64 * 1024):
+        self.data = bytearray(capacity)
+        self.length = 0
+        self.time = 0.0
+
+    def store(self, view):
+        size = len(view)
+        if size > len(self.data):
+            self.data = bytearray(max(size, len(self.data) * 2))
+        self.data[:size] = view
+        self.length = size
+
+    def view(self):
+        return memoryview(self.data)[:self.length]
+
+
+class MjpegStream:
+    """Multipart MJPEG client for the ESP32 /stream endpoint.
+
+    A receive thread splits the multipart/x-mixed-replace body into JPEG
+    parts, rotating three reusable buffers (filling, newest, decoding).
+    Nothing is decoded on the receive thread: read() decodes only the
+    newest part, and parts that arrive in between are dropped undecoded.
+    With a target_size the JPEG is decoded at 1/2, 1/4 or 1/8 scale
+    whenever that is still at least target_size.
+
+    Drop-in for FrameGrabber: start/stop/release/read/is_running/stats
+    and the failed flag behave the same way.
+    """
+
+    def __init__(self, url, target_size=None, timeout=5.0, max_reconnects=5,
+                 chunk_size=32 * 1024, metrics=None):
+        self.url = url
+        self.target_size = target_size  # (width, height) the frames get resized to
+        self.timeout = timeout
+        self.max_reconnects = max_reconnects
+        self.chunk_size = chunk_size
+        self.metrics = metrics  # Optional Metrics, gets a "capture" timing per decode
+
+        self._connection = None
+        self._response = None
+        self._boundary = None
+        self._receive = bytearray()
+        self._filling = _PartBuffer()
+        self._newest = _PartBuffer()
+        self._decoding = _PartBuffer()
+
+        self._lock = threading.Lock()
+        self._has_new_frame = False
+        self._frame_time = 0.0
+        self.frame_time = None  # Arrival time of the part last returned by read()
+        self._running = False
+        self._thread = None
+
+        # Native size of the stream, learned from decoded frames
+        self.frame_size = None
+        self.decode_factor = 1
+
+        # Counters
+        self.frames_received = 0
+        self.frames_dropped = 0
+        self.frames_consumed = 0
+        self.failed_reads = 0  # Undecodable parts and dropped connections
+        self.bytes_received = 0
+        self.last_part_size = 0
+        self.arrivals = deque(maxlen=256)  # (time, bytes) of every part received, oldest first
+        self.last_decode_time = None
+        self.failed = False  # Set when the source stops delivering frames
+
+    def open(self):
+        """Connect and check that the server sends a multipart stream"""
+        self._close_connection()
+        parts = urlsplit(self.url)
+        connection_class = (http.client.HTTPSConnection if parts.scheme == "https"
+                            else http.client.HTTPConnection)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        try:
+            connection = connection_class(parts.hostname, parts.port, timeout=self.timeout)
+            connection.request("GET", path)
+            response = connection.getresponse()
+        except (OSError, http.client.HTTPException) as e:
+            print(f"MJPEG stream: could not connect to {self.url}: {e}")
+            return False
+
+        content_type = response.getheader("Content-Type", "")
+        if response.status != 200 or not content_type.startswith("multipart/"):
+            print(f"MJPEG stream: {self.url} is not a multipart stream "
+                  f"({response.status} {content_type})")
+            connection.close()
+            return False
+
+        boundary = None
+        for param in content_type.split(";")[1:]:
+            key, _, value = param.strip().partition("=")
+            if key.lower() == "boundary":
+                boundary = value.strip('"')
+        if boundary is None:
+            print(f"MJPEG stream: no boundary in {content_type}")
+            connection.close()
+            return False
+
+        self._connection = connection
+        self._response = response
+        self._boundary = b"--" + (boundary[2:] if boundary.startswith("--") else boundary).encode()
+        self._receive.clear()
+        return True
+
+    def isOpened(self):
+        return self._response is not None
+
+    def start(self):
+        """Start the receive thread, opening the connection first if needed"""
+        if self._running:
+            return
+        if self._response is None and not self.open():
+            self.failed = True
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="MjpegStream", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        """Stop the receive thread"""
+        self._running = False
+        if self._thread is not None:
+            # Closing the socket unblocks a pending read
+            self._close_connection()
+            self._thread.join(timeout)
+            self._thread = None
+
+    def release(self):
+        """Stop the thread and close the connection"""
+        self.stop()
+        self._close_connection()
+
+    def _close_connection(self):
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except OSError:
+                pass
+        self._connection = None
+        self._response = None
+
+    def _run(self):
+        reconnects = 0
+        while self._running:
+            try:
+                chunk = self._response.read1(self.chunk_size)
+            except (OSError, ValueError, AttributeError, http.client.HTTPException) as e:
+                chunk = None
+                if self._running:
+                    print(f"MJPEG stream: read error: {e}")
+            if not chunk:
+                if not self._running:
+                    break
+                # Connection dropped, reconnect a few times before giving up
+                self.failed_reads += 1
+                reconnects += 1
+                if reconnects > self.max_reconnects:
+                    print("MJPEG stream: source stopped delivering frames")
+                    self.failed = True
+                    self._running = False
+                    break
+                time.sleep(0.5)
+                self.open()
+                continue
+
+            self.bytes_received += len(chunk)
+            self._receive += chunk
+            if self._extract_parts():
+                reconnects = 0
+
+    def _extract_parts(self):
+        """Move every complete JPEG part out of the receive buffer, returns the count"""
+        buffer = self._receive
+        found = 0
+        while True:
+            start = buffer.find(self._boundary)
+            if start < 0:
+                # Keep a tail in case the boundary is split across reads
+                keep = len(self._boundary)
+                if len(buffer) > keep:
+                    del buffer[:len(buffer) - keep]
+                return found
+            header_end = buffer.find(b"\r\n\r\n", start)
+            if header_end < 0:
+                if start:
+                    del buffer[:start]
+                return found
+            body_start = header_end + 4
+
+            length = self._content_length(buffer, start, header_end)
+            if length is not None:
+                body_end = body_start + length
+                if len(buffer) < body_end:
+                    if start:
+                        del buffer[:start]
+                    return found
+            else:
+                # No Content-Length, the part ends at the next boundary
+                body_end = buffer.find(self._boundary, body_start)
+                if body_end < 0:
+                    if start:
+                        del buffer[:start]
+                    return found
+                while body_end > body_start and buffer[body_end - 1] in b"\r\n":
+                    body_end -= 1
+
+            self._publish(memoryview(buffer)[body_start:body_end])
+            found += 1
+            del buffer[:body_end]
+
+    @staticmethod
+    def _content_length(buffer, start, header_end):
+        headers = bytes(buffer[start:header_end]).lower()
+        index = headers.find(b"content-length:")
+        if index < 0:
+            return None
+        value = headers[index + 15:].split(b"\r\n", 1)[0].strip()
+        return int(value) if value.isdigit() else None
+
+    def _publish(self, view):
+        self._filling.store(view)
+        view.release()
+        self._filling.time = time.time()
+        with self._lock:
+            # Latest part wins, an undecoded older part is dropped
+            if self._has_new_frame:
+                self.frames_dropped += 1
+            self._filling, self._newest = self._newest, self._filling
+            self._frame_time = self._newest.time
+            self._has_new_frame = True
+            self.frames_received += 1
+            self.last_part_size = self._newest.length
+            self.arrivals.append((self._newest.time, self._newest.length))
+
+    def read(self):
+        """Decode and return the newest part not yet consumed, or None if there is none"""
+        with self._lock:
+            if not self._has_new_frame:
+                return None
+            self._has_new_frame = False
+            self._newest, self._decoding = self._decoding, self._newest
+        self.frame_time = self._decoding.time
+
+        start = time.perf_counter()
+        factor, flag = reduced_decode_flag(self.frame_size, self.target_size)
+        frame = cv2.imdecode(np.frombuffer(self._decoding.view(), dtype=np.uint8), flag)
+        elapsed = time.perf_counter() - start
+        if frame is None:
+            self.failed_reads += 1
+            return None
+
+        # Keep the native size current so a resolution change picks a new factor
+        height, width = frame.shape[:2]
+        self.frame_size = (width * factor, height * factor)
+        self.decode_factor = factor
+        self.last_decode_time = elapsed
+        self.frames_consumed += 1
+        if self.metrics is not None:
+            self.metrics.observe("capture", elapsed)
+        return frame
+
+    def last_jpeg(self):
+        """Raw bytes of the part last returned by read(), valid until the next read()"""
+        return self._decoding.view() if self.frames_consumed else None
+
+    def is_running(self):
+        return self._running
+
+    def stats(self):
+        """Return a snapshot of the stream counters"""
+        return {
+            "received": self.frames_received,
+            "dropped": self.frames_dropped,
+            "consumed": self.frames_consumed,
+            "failed_reads": self.failed_reads,
+            "bytes": self.bytes_received,
+            "last_part_bytes": self.last_part_size,
+            "decode_factor": self.decode_factor,
+            "decode_ms": (self.last_decode_time * 1000
+                          if self.last_decode_time is not None else None),
+        }
@@ -0,0 +1,83 @@
+import importlib
+import threading
+import time
+
+
+class BackgroundLoader:
+    """Loads a model on a background thread the first time it is needed.
+
+    Optional imports (e.g. "mediapipe") are done first and timed on their
+    own. After load() returns, warmup(model) runs one throwaway pass so
+    the first real frame doesn't pay for lazy allocations and graph setup.
+    state goes idle -> loading -> ready or failed; model is only set once
+    the warmup is done.
+    """
+
+    def __init__(self, name, load, warmup=None, close=None, imports=()):
+        self.name = name
+        self.load = load  # callable() -> model
+        self.warmup = warmup  # callable(model)
+        self.close_model = close  # callable(model)
+        self.imports = imports
+
+        self.state = "idle"
+        self.model = None
+        self.error = None
+        self.import_seconds = None
+        self.load_seconds = None
+        self.warmup_seconds = None
+        self._thread = None
+
+    def start(self):
+        if self.state != "idle":
+            return
+        self.state = "loading"
+        self._thread = threading.Thread(target=self._run, name=f"load-{self.name}", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            start = time.perf_counter()
+            for module in self.imports:
+                importlib.import_module(module)
+            loading = time.perf_counter()
+            self.import_seconds = loading - start
+            model = self.load()
+            warming = time.perf_counter()
+            self.load_seconds = warming - loading
+            if self.warmup is not None:
+                self.warmup(model)
+            self.warmup_seconds = time.perf_counter() - warming
+        except Exception as e:
+            self.error = str(e)
+            self.state = "failed"
+            print(f"Failed to load {self.name}: {e}")
+            return
+        self.model = model
+        self.state = "ready"
+        print(f"{self.name} ready: import {self.import_seconds * 1000:.0f} ms, "
+              f"load {self.load_seconds * 1000:.0f} ms, warmup {self.warmup_seconds * 1000:.0f} ms")
+
+    def wait(self, timeout=None):
+        """Block until loading has finished, returns True if the model is ready"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.state == "ready"
+
+    def close(self, timeout=5.0):
+        """Release the model, waiting for a load in progress to finish first"""
+        self.wait(timeout)
+        if self.model is not None and self.close_model is not None:
+            self.close_model(self.model)
+        self.model = None
+
+    def stats(self):
+        def ms(value):
+            return value * 1000 if value is not None else None
+        return {
+            "state": self.state,
+            "import_ms": ms(self.import_seconds),
+            "load_ms": ms(self.load_seconds),
+            "warmup_ms": ms(self.warmup_seconds),
+            "error": self.error,
+        }
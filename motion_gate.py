@@ -0,0 +1,79 @@
+import time
+
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """Decides whether a detector pass is worth running on the current frame.
+
+    Each candidate frame is shrunk to a small grayscale thumbnail and
+    compared against the thumbnail of the last frame the detector saw.
+    If fewer than changed_fraction of the pixels moved by more than
+    pixel_threshold gray levels, the scene is considered static and the
+    previous detections can be reused. A pass is still forced once the
+    previous result is max_staleness seconds old, so a slow change or a
+    person standing perfectly still is never missed for long.
+    """
+
+    def __init__(self, size=(64, 48), pixel_threshold=20, changed_fraction=0.01,
+                 max_staleness=2.0):
+        self.size = size
+        self.pixel_threshold = pixel_threshold
+        self.changed_fraction = changed_fraction
+        self.max_staleness = max_staleness
+
+        self.reference = None  # Thumbnail of the last frame that was inferred
+        self.reference_time = 0.0
+        self._diff = np.empty(size[::-1], dtype=np.uint8)
+
+        self.last_changed = None  # Changed pixel fraction of the last check
+        self.decision = "warming up"
+        self.runs = 0
+        self.skips = 0
+
+    def thumbnail(self, frame):
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+
+    def should_infer(self, frame, timestamp=None):
+        """Return True if the detector should run on frame.
+
+        A True answer assumes the detector does run, the frame becomes the
+        new reference.
+        """
+        now = time.time() if timestamp is None else timestamp
+        thumbnail = self.thumbnail(frame)
+
+        if self.reference is None:
+            run, self.decision = True, "first frame"
+        elif now - self.reference_time >= self.max_staleness:
+            run, self.decision = True, "stale"
+        else:
+            cv2.absdiff(thumbnail, self.reference, self._diff)
+            changed = np.count_nonzero(self._diff > self.pixel_threshold) / self._diff.size
+            self.last_changed = float(changed)
+            run = self.last_changed >= self.changed_fraction
+            self.decision = f"{'motion' if run else 'static'} {self.last_changed:.1%}"
+
+        if run:
+            self.reference = thumbnail
+            self.reference_time = now
+            self.runs += 1
+        else:
+            self.skips += 1
+        return run
+
+    def reset(self):
+        """Force a detector pass on the next frame"""
+        self.reference = None
+
+    def stats(self):
+        checked = self.runs + self.skips
+        return {
+            "runs": self.runs,
+            "skips": self.skips,
+            "skip_ratio": self.skips / checked if checked else 0.0,
+            "changed": self.last_changed,
+            "decision": self.decision,
+        }
@@ -0,0 +1,331 @@
+"""Session recording and replay without decoding or re-encoding frames.
+
+A session is a directory holding:
+    segment-00000.jpegs  raw JPEGs exactly as they came off the stream, back to back
+    segment-00000.idx    one INDEX_RECORD per frame (frame id, arrival time, offset, length)
+    events.jsonl         motor commands, detections and hand positions, tagged with frame ids
+                         (null for events that belong to a frame that was dropped)
+
+Segments are plain concatenated JPEGs, so benchmark.py can replay them
+directly. SessionReader memory-maps the segments for random access and
+SessionReplay plays a session back as a capture source for the engine.
+"""
+import glob
+import json
+import mmap
+import os
+import queue
+import threading
+import time
+
+import cv2
+import numpy as np
+
+INDEX_RECORD = np.dtype([
+    ("frame_id", "<u8"),
+    ("timestamp", "<f8"),
+    ("offset", "<u8"),
+    ("length", "<u4"),
+    ("reserved", "<u4"),
+])
+
+
+class SessionRecorder:
+    """Appends raw JPEG frames and per-frame events to a session directory.
+
+    The hot path only copies the JPEG bytes onto a queue; a writer thread
+    does all file I/O. If the disk can't keep up, frames are dropped (and
+    counted) rather than slowing the pipeline down.
+    """
+
+    def __init__(self, directory, segment_bytes=256 * 1024 * 1024, queue_size=120):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        os.makedirs(directory, exist_ok=True)
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._segment = None
+        self._index = None
+        self._segment_number = -1
+        self._events = None
+
+        self.frame_id = -1  # Id of the most recent recorded frame
+        self.latest_dropped = False  # The most recent frame offered was dropped
+        self.frames_recorded = 0
+        self.frames_dropped = 0
+        self.events_recorded = 0
+        self.bytes_written = 0
+
+    def start(self):
+        # Appending to an existing session, carry on after its last frame id
+        # so new events can't land on old frames
+        for index_path in glob.glob(os.path.join(self.directory, "segment-*.idx")):
+            index = np.fromfile(index_path, dtype=INDEX_RECORD)
+            if len(index):
+                self.frame_id = max(self.frame_id, int(index["frame_id"].max()))
+        self._events = open(os.path.join(self.directory, "events.jsonl"), "a")
+        self._thread = threading.Thread(target=self._run, name="SessionRecorder", daemon=True)
+        self._thread.start()
+        print(f"Recording to {self.directory}")
+
+    def record_frame(self, jpeg, timestamp):
+        """Queue one raw JPEG (bytes-like), returns its frame id or None if dropped"""
+        frame_id = self.frame_id + 1
+        try:
+            self._queue.put_nowait(("frame", frame_id, timestamp, bytes(jpeg)))
+        except queue.Full:
+            self.frames_dropped += 1
+            self.latest_dropped = True
+            return None
+        self.frame_id = frame_id
+        self.latest_dropped = False
+        return frame_id
+
+    def record_event(self, kind, frame_id=None, **fields):
+        """Log an event (command, detections, hand...) against a frame.
+
+        frame_id defaults to the most recent frame offered to record_frame;
+        if that one was dropped the event is logged with frame None, so
+        replay doesn't show it on an earlier image.
+        """
+        if frame_id is None and not self.latest_dropped:
+            frame_id = self.frame_id
+        event = {"frame": frame_id, "t": time.time(), "type": kind}
+        event.update(fields)
+        try:
+            self._queue.put_nowait(("event", event))
+        except queue.Full:
+            pass
+
+    def record_detections(self, detections, frame_id=None):
+        fields = {
+            "boxes": detections.boxes.tolist(),
+            "confidences": [round(float(c), 3) for c in detections.confidences],
+            "class_ids": detections.class_ids.tolist(),
+        }
+        if hasattr(detections, "track_ids"):
+            fields["track_ids"] = detections.track_ids.tolist()
+        self.record_event("detections", frame_id, **fields)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            try:
+                if item[0] == "frame":
+                    self._write_frame(*item[1:])
+                else:
+                    self._events.write(json.dumps(item[1]) + "\n")
+                    self.events_recorded += 1
+            except OSError as e:
+                print(f"Error in session recorder: {e}")
+
+    def _write_frame(self, frame_id, timestamp, jpeg):
+        if self._segment is None or self._segment.tell() >= self.segment_bytes:
+            self._open_segment()
+        offset = self._segment.tell()
+        self._segment.write(jpeg)
+        record = np.zeros(1, dtype=INDEX_RECORD)
+        record[0] = (frame_id, timestamp, offset, len(jpeg), 0)
+        self._index.write(record.tobytes())
+        self.frames_recorded += 1
+        self.bytes_written += len(jpeg)
+
+    def _open_segment(self):
+        self._close_segment()
+        self._segment_number += 1
+        base = os.path.join(self.directory, f"segment-{self._segment_number:05d}")
+        while os.path.exists(base + ".jpegs"):
+            # Appending to an existing session, keep the old segments intact
+            self._segment_number += 1
+            base = os.path.join(self.directory, f"segment-{self._segment_number:05d}")
+        self._segment = open(base + ".jpegs", "wb")
+        self._index = open(base + ".idx", "wb")
+
+    def _close_segment(self):
+        if self._segment is not None:
+            self._segment.close()
+            self._index.close()
+            self._segment = None
+            self._index = None
+
+    def close(self, timeout=5.0):
+        """Flush everything queued so far and close the files"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout)
+            self._thread = None
+        self._close_segment()
+        if self._events is not None:
+            self._events.close()
+            self._events = None
+
+    def stats(self):
+        return {
+            "frames": self.frames_recorded,
+            "dropped": self.frames_dropped,
+            "events": self.events_recorded,
+            "bytes": self.bytes_written,
+        }
+
+
+class SessionReader:
+    """Random access to a recorded session through memory-mapped segments"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._files = []
+        self._maps = []
+        indices = []
+        for index_path in sorted(glob.glob(os.path.join(directory, "segment-*.idx"))):
+            index = np.fromfile(index_path, dtype=INDEX_RECORD)
+            segment_path = index_path[:-len(".idx")] + ".jpegs"
+            if len(index) == 0 or not os.path.getsize(segment_path):
+                continue
+            f = open(segment_path, "rb")
+            self._files.append(f)
+            self._maps.append(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+            indices.append((np.full(len(index), len(self._maps) - 1, dtype=np.int32), index))
+        if not indices:
+            raise IOError(f"No recorded frames in {directory}")
+        self.segments = np.concatenate([segments for segments, _ in indices])
+        self.index = np.concatenate([index for _, index in indices])
+        self._events = None
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def duration(self):
+        return float(self.index["timestamp"][-1] - self.index["timestamp"][0])
+
+    def timestamp(self, i):
+        return float(self.index["timestamp"][i])
+
+    def jpeg(self, i):
+        """Raw JPEG bytes of frame i, a zero-copy view into the mapped segment"""
+        record = self.index[i]
+        offset = int(record["offset"])
+        return memoryview(self._maps[self.segments[i]])[offset:offset + int(record["length"])]
+
+    def frame(self, i, flags=cv2.IMREAD_COLOR):
+        return cv2.imdecode(np.frombuffer(self.jpeg(i), dtype=np.uint8), flags)
+
+    def seek(self, timestamp):
+        """Index of the first frame at or after timestamp"""
+        return int(np.searchsorted(self.index["timestamp"], timestamp))
+
+    def events(self):
+        """Events grouped by frame id, loaded on first use"""
+        if self._events is None:
+            self._events = {}
+            path = os.path.join(self.directory, "events.jsonl")
+            if os.path.exists(path):
+                with open(path) as f:
+                    for line in f:
+                        event = json.loads(line)
+                        self._events.setdefault(event["frame"], []).append(event)
+        return self._events
+
+    def replay(self, realtime=True, start=0):
+        """Yield (index, frame, events) for every frame, paced like the original run"""
+        events = self.events()
+        wall_start = time.perf_counter()
+        first = self.timestamp(start) if len(self) else 0.0
+        for i in range(start, len(self)):
+            if realtime:
+                delay = (self.timestamp(i) - first) - (time.perf_counter() - wall_start)
+                if delay > 0:
+                    time.sleep(delay)
+            frame_id = int(self.index["frame_id"][i])
+            yield i, self.frame(i), events.get(frame_id, [])
+
+    def close(self):
+        for m in self._maps:
+            m.close()
+        for f in self._files:
+            f.close()
+        self._maps = []
+        self._files = []
+
+
+class SessionReplay:
+    """Plays a recorded session as a capture source, drop-in for FrameGrabber.
+
+    Frames are released at their recorded pace (or as fast as they are
+    read with realtime=False) and only the newest due frame is decoded.
+    """
+
+    def __init__(self, directory, realtime=True, metrics=None):
+        self.reader = SessionReader(directory)
+        self.realtime = realtime
+        self.metrics = metrics
+        self._position = 0
+        self._wall_start = None
+        self._running = False
+        self.frame_time = None  # Replay arrival time of the last frame read (wall clock)
+
+        self.frames_received = 0
+        self.frames_dropped = 0
+        self.frames_consumed = 0
+        self.failed_reads = 0
+        self.failed = False  # Set at the end of the recording
+
+    def start(self):
+        self._running = True
+        self._wall_start = time.perf_counter()
+
+    def stop(self, timeout=1.0):
+        self._running = False
+
+    def release(self):
+        self.stop()
+        self.reader.close()
+
+    def read(self):
+        """Decode and return the newest frame that is due, or None"""
+        if not self._running or self.failed:
+            return None
+        if self._position >= len(self.reader):
+            self.failed = True
+            return None
+
+        index = self._position
+        if self.realtime:
+            elapsed = time.perf_counter() - self._wall_start
+            due = self.reader.seek(self.reader.timestamp(0) + elapsed)
+            if due <= index and self.reader.timestamp(index) - self.reader.timestamp(0) > elapsed:
+                return None
+            # Frames that fell due while the consumer was busy are skipped
+            index = max(index, min(due, len(self.reader)) - 1)
+            self.frames_dropped += index - self._position
+
+        start = time.perf_counter()
+        frame = self.reader.frame(index)
+        if self.metrics is not None:
+            self.metrics.observe("capture", time.perf_counter() - start)
+        self._position = index + 1
+        # Latency is measured against the replay clock, not the recording's
+        self.frame_time = time.time()
+        self.frames_received = self._position
+        if frame is None:
+            self.failed_reads += 1
+            return None
+        self.frames_consumed += 1
+        return frame
+
+    def last_jpeg(self):
+        return self.reader.jpeg(self._position - 1) if self._position else None
+
+    def is_running(self):
+        return self._running
+
+    def stats(self):
+        return {
+            "received": self.frames_received,
+            "dropped": self.frames_dropped,
+            "consumed": self.frames_consumed,
+            "failed_reads": self.failed_reads,
+        }
@@ -0,0 +1,105 @@
+"""Detection on native-resolution regions of large frames.
+
+Squashing a UXGA frame into a 320x320 network input shrinks a distant
+person to a few pixels. RegionDetector instead crops around the target
+it is following, so the crop is seen at (close to) native resolution.
+Every full_interval seconds, or when there is no target to crop around,
+it runs a full pass instead: the frame is cut into overlapping tiles of
+about twice the input size, plus one downscaled overview of the whole
+frame for objects too large for a tile. All of them go through the
+network as one batch and are merged through a single global NMS.
+"""
+import math
+import time
+
+
+class RegionDetector:
+    """Chooses the regions a DetectorEngine runs on for each frame"""
+
+    def __init__(self, detector, tiles=None, overlap=0.15, full_interval=1.0, padding=2.5,
+                 max_tiles=3):
+        self.detector = detector
+        self.tiles = tiles  # (columns, rows), None picks them from the frame size
+        self.overlap = overlap  # Fraction of a tile shared with its neighbour
+        self.full_interval = full_interval  # Seconds between full passes while following
+        self.padding = padding  # ROI side as a multiple of the target's longer side
+        self.max_tiles = max_tiles  # Per axis, when picked automatically
+
+        self.last_full = 0.0
+        self.force_full = True  # Target lost or not yet found
+        self.last_regions = []
+        self.roi_passes = 0
+        self.full_passes = 0
+
+    def tile_grid(self, width, height):
+        """(columns, rows) so each tile is at most about twice the input size"""
+        if self.tiles is not None:
+            return self.tiles
+        input_width, input_height = self.detector.input_size
+        columns = max(1, min(self.max_tiles, round(width / (2 * input_width))))
+        rows = max(1, min(self.max_tiles, round(height / (2 * input_height))))
+        return columns, rows
+
+    def full_regions(self, width, height):
+        """Overlapping tiles covering the frame, then the whole frame"""
+        columns, rows = self.tile_grid(width, height)
+        regions = []
+        if columns > 1 or rows > 1:
+            tile_width = math.ceil(width / (columns - self.overlap * (columns - 1)))
+            tile_height = math.ceil(height / (rows - self.overlap * (rows - 1)))
+            for row in range(rows):
+                for column in range(columns):
+                    x = min(width - tile_width, round(column * tile_width * (1 - self.overlap)))
+                    y = min(height - tile_height, round(row * tile_height * (1 - self.overlap)))
+                    regions.append((x, y, tile_width, tile_height))
+        regions.append((0, 0, width, height))
+        return regions
+
+    def roi_region(self, box, width, height):
+        """Square crop around box, at least the network input size, inside the frame"""
+        x, y, w, h = box
+        side = max(self.padding * max(w, h), *self.detector.input_size)
+        side = int(min(side, width, height))
+        center_x, center_y = x + w / 2, y + h / 2
+        left = int(min(max(0, center_x - side / 2), width - side))
+        top = int(min(max(0, center_y - side / 2), height - side))
+        return left, top, side, side
+
+    def detect(self, frame, target_box=None, target_class=None):
+        """Detections in frame pixels.
+
+        target_box (x, y, w, h in frame pixels) is the region to follow; when
+        given with target_class, a pass that doesn't find that class inside
+        the crop makes the next pass a full one.
+        """
+        height, width = frame.shape[:2]
+        now = time.perf_counter()
+        full = (target_box is None or self.force_full
+                or now - self.last_full >= self.full_interval)
+        if full:
+            regions = self.full_regions(width, height)
+            self.last_full = now
+            self.full_passes += 1
+        else:
+            regions = [self.roi_region(target_box, width, height)]
+            self.roi_passes += 1
+        self.last_regions = regions
+
+        detections = self.detector.detect_regions(frame, regions)
+        if full:
+            self.force_full = False
+        elif target_class is not None and target_class not in detections.class_ids:
+            self.force_full = True  # Lost in the crop, look everywhere next time
+        return detections
+
+    def reset(self):
+        self.force_full = True
+
+    def stats(self):
+        passes = self.roi_passes + self.full_passes
+        return {
+            "roi_passes": self.roi_passes,
+            "full_passes": self.full_passes,
+            "roi_ratio": self.roi_passes / passes if passes else 0.0,
+            "regions": len(self.last_regions),
+        }
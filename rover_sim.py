@@ -0,0 +1,254 @@
+"""Stand-in for the rover's control endpoints, for testing without hardware.
+
+Serves the same control API as the firmware:
+    GET /control?command=N        motor command (1 forward, 2 left, 3 stop, 4 right, 5 backward)
+    GET /control?var=speed&val=N  motor speed, applied with the next command
+    GET /control?var=NAME&val=N   flash, framesize or quality
+    GET /settings?NAME=N&...      several settings at once, answers with /status
+    GET /status                   settings and counters as JSON
+    UDP control channel           binary frames, see control_channel.py
+
+and keeps the motor state the rover would be in. --delay and --loss add
+processing time and UDP packet loss to see how the client copes.
+
+Usage:
+    python rover_sim.py --http-port 8080 --udp-port 8082
+    python app.py --headless ...  with CONTROL_URL = "http://127.0.0.1:8080/control"
+
+    python rover_sim.py --bench 2000   # command throughput and latency, UDP vs HTTP
+"""
+import argparse
+import json
+import random
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from control_channel import ACK_FLAG, CONTROL_PORT, MSG_DRIVE, STALE_FLAG, RoverClient, \
+    pack_frame, unpack_frame
+
+DIRECTIONS = {1: "forward", 2: "left", 3: "stop", 4: "right", 5: "backward"}
+
+
+class RoverSimulator:
+    """HTTP and UDP control endpoints driving a simulated pair of motors"""
+
+    def __init__(self, host="127.0.0.1", http_port=8080, udp_port=CONTROL_PORT, delay=0.0,
+                 loss=0.0, verbose=False):
+        self.host = host
+        self.delay = delay  # Seconds spent handling each command
+        self.loss = loss  # Probability of dropping a UDP frame (either way)
+        self.verbose = verbose
+
+        self._lock = threading.Lock()
+        self.direction = 3
+        self.speed = 255
+        self.camera = {"framesize": 8, "quality": 12, "flash": 0}
+        self.commands = 0  # Commands applied, over either transport
+        self.http_requests = 0
+        self.settings_requests = 0
+        self.udp_frames = 0
+        self.udp_stale = 0
+        self.udp_lost = 0
+        self._session = None
+        self._last_seq = 0
+
+        simulator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                simulator.handle_http(self)
+
+            def log_message(self, *args):
+                pass
+
+        self.http = ThreadingHTTPServer((host, http_port), Handler)
+        self.http.daemon_threads = True
+        self.udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.udp.bind((host, udp_port))
+        self._threads = []
+
+    @property
+    def http_port(self):
+        return self.http.server_port
+
+    @property
+    def udp_port(self):
+        return self.udp.getsockname()[1]
+
+    @property
+    def control_url(self):
+        return f"http://{self.host}:{self.http_port}/control"
+
+    def start(self):
+        for target, name in [(self.http.serve_forever, "sim-http"), (self._serve_udp, "sim-udp")]:
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        self.http.shutdown()
+        self.http.server_close()
+        self.udp.close()
+
+    def drive(self, direction, speed=None):
+        with self._lock:
+            if speed is not None:
+                self.speed = speed
+            if direction in DIRECTIONS:
+                self.direction = direction
+                self.commands += 1
+        if self.verbose:
+            print(f"{DIRECTIONS.get(direction, direction)} at {self.speed}")
+
+    def apply_setting(self, name, value):
+        if name == "speed":
+            self.drive(None, value)
+        elif name in self.camera:
+            self.camera[name] = value
+            if self.verbose:
+                print(f"{name} set to {value}")
+
+    def status(self):
+        return {
+            "status": 1,
+            **self.camera,
+            "direction": DIRECTIONS.get(self.direction),
+            "speed": self.speed,
+            "commands": self.commands,
+            "http_requests": self.http_requests,
+            "settings_requests": self.settings_requests,
+            "udp_frames": self.udp_frames,
+            "udp_stale": self.udp_stale,
+            "udp_lost": self.udp_lost,
+        }
+
+    def handle_http(self, request):
+        url = urlparse(request.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        self.http_requests += 1
+        if self.delay:
+            time.sleep(self.delay)
+        if url.path == "/control":
+            if "command" in query:
+                self.drive(int(query["command"]))
+            elif "var" in query and "val" in query:
+                self.apply_setting(query["var"], int(query["val"]))
+            body, content_type = b"", "text/plain"
+        elif url.path == "/settings":
+            self.settings_requests += 1
+            for name, value in query.items():
+                self.apply_setting(name, int(value))
+            body, content_type = json.dumps(self.status()).encode(), "application/json"
+        elif url.path == "/status":
+            body, content_type = json.dumps(self.status()).encode(), "application/json"
+        else:
+            request.send_error(404)
+            return
+        request.send_response(200)
+        request.send_header("Content-Type", content_type)
+        request.send_header("Content-Length", str(len(body)))
+        request.send_header("Access-Control-Allow-Origin", "*")
+        request.end_headers()
+        request.wfile.write(body)
+
+    def _serve_udp(self):
+        while True:
+            try:
+                data, address = self.udp.recvfrom(64)
+            except OSError:
+                break  # Closed
+            frame = unpack_frame(data)
+            if frame is None:
+                continue
+            if random.random() < self.loss:
+                self.udp_lost += 1
+                continue
+            self.udp_frames += 1
+            if self.delay:
+                time.sleep(self.delay)
+            reply_type = frame.type | ACK_FLAG
+            if frame.session != self._session:
+                self._session, self._last_seq = frame.session, 0
+            if frame.type == MSG_DRIVE:
+                if frame.seq > self._last_seq:
+                    self._last_seq = frame.seq
+                    self.drive(frame.direction, frame.speed)
+                else:
+                    self.udp_stale += 1
+                    reply_type |= STALE_FLAG
+            if random.random() < self.loss:
+                self.udp_lost += 1
+                continue
+            reply = pack_frame(reply_type, frame.seq, frame.timestamp, frame.direction,
+                               frame.speed, frame.session)
+            try:
+                self.udp.sendto(reply, address)
+            except OSError:
+                break
+
+
+def bench(simulator, count):
+    """Time count alternating commands over UDP, then over HTTP"""
+    results = {}
+    for transport in ("udp", "http"):
+        client = RoverClient(simulator.control_url, udp_port=simulator.udp_port,
+                             use_udp=transport == "udp")
+        latencies = []
+        start = time.perf_counter()
+        for i in range(count):
+            sent = time.perf_counter()
+            if client.send_command('2' if i % 2 else '4'):
+                latencies.append(time.perf_counter() - sent)
+        elapsed = time.perf_counter() - start
+        client.close()
+        latencies = np.array(latencies) * 1000
+        results[transport] = {
+            "commands_per_s": round(count / elapsed, 1),
+            "acknowledged": len(latencies),
+            "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+            "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+            "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+        }
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulated rover control endpoints")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--http-port", type=int, default=8080)
+    parser.add_argument("--udp-port", type=int, default=CONTROL_PORT)
+    parser.add_argument("--delay", type=float, default=0.0,
+                        help="milliseconds spent handling each command (default: 0)")
+    parser.add_argument("--loss", type=float, default=0.0,
+                        help="probability of losing a UDP frame each way (default: 0)")
+    parser.add_argument("--bench", type=int, metavar="N",
+                        help="send N commands over each transport and print the latencies")
+    args = parser.parse_args(argv)
+
+    simulator = RoverSimulator(args.host, args.http_port, args.udp_port, args.delay / 1000,
+                               args.loss, verbose=not args.bench).start()
+    if args.bench:
+        print(json.dumps(bench(simulator, args.bench), indent=2))
+        simulator.stop()
+        return 0
+
+    print(f"Rover control on {simulator.control_url} and udp://{args.host}:{simulator.udp_port}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        simulator.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+"""Runs the perception stages concurrently, by priority, without blocking the frame loop.
+
+A stage is one model the engine runs on frames (hand landmarks, object
+detection). Each has a priority (lower runs first), a minimum interval
+between frames and how long a queued frame may wait before it is too old
+to be worth running. Stages either run in-process on the scheduler's
+thread pool or are forwarded to an InferenceWorker process.
+
+submit() only queues work. Under load work is shed, never waited for:
+  - a stage holds at most one queued frame, a newer one replaces it
+  - free threads always take the highest-priority queued frame first
+  - a stage that ran over its budget last time puts lower-priority
+    stages into its gaps: they start only while it has nothing queued
+    or running, or once they have been kept waiting for half their
+    max_wait, so they slow down but never starve
+  - a queued frame older than the stage's max_wait is dropped
+"""
+import queue
+import threading
+import time
+
+from inference_worker import InferenceResult
+
+
+class Stage:
+    """One perception model and its scheduling settings"""
+
+    def __init__(self, name, run=None, worker=None, priority=0, interval=0.0, max_wait=0.25,
+                 budget=None):
+        self.name = name
+        self.run = run  # callable(frame, input_size) run on the thread pool
+        self.worker = worker  # or an InferenceWorker the frames are forwarded to
+        self.priority = priority
+        self.interval = interval  # Minimum seconds between two submitted frames
+        self.max_wait = max_wait
+        self.budget = budget  # Run time above which lower priorities are deferred
+
+        self.enabled = True
+        self.pending = None  # (frame_id, frame, input_size, queued_at)
+        self.waiting_since = 0.0  # When the stage last went from idle to having a queued frame
+        self.deferring = False
+        self.running = False
+        self.last_submit = 0.0
+        self._worker_ids = {}  # Worker frame id -> scheduler frame id
+
+        self.submitted = 0
+        self.completed = 0
+        self.dropped = 0
+        self.deferred = 0
+        self.last_elapsed = None
+
+    @property
+    def overloaded(self):
+        return self.budget is not None and self.last_elapsed is not None \
+            and self.last_elapsed > self.budget
+
+    def stats(self):
+        return {
+            "priority": self.priority,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "dropped": self.dropped,
+            "deferred": self.deferred,
+            "last_ms": self.last_elapsed * 1000 if self.last_elapsed is not None else None,
+        }
+
+
+class StageScheduler:
+    """Thread pool that runs the queued frame of the most important stage first"""
+
+    def __init__(self, workers=2):
+        self.workers = workers
+        self.stages = {}
+        self._cond = threading.Condition()
+        self._results = queue.Queue()
+        self._threads = []
+        self._stopped = False
+        self._next_frame_id = 0
+
+    def add_stage(self, name, run=None, worker=None, **options):
+        stage = Stage(name, run, worker, **options)
+        self.stages[name] = stage
+        return stage
+
+    def start(self):
+        self._stopped = False
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"StageScheduler-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, frame, names, input_size=None):
+        """Offer frame to the named stages, returns its frame id or None if no stage took it.
+
+        Stages that are disabled or whose interval hasn't passed skip it.
+        input_size is handed to stages that accept one (the detector).
+        """
+        now = time.perf_counter()
+        due = []
+        for name in names:
+            stage = self.stages.get(name)
+            if stage is not None and stage.enabled and now - stage.last_submit >= stage.interval:
+                due.append(stage)
+        if not due:
+            return None
+
+        frame_id = self._next_frame_id
+        self._next_frame_id += 1
+        taken = False
+        local = [stage for stage in due if stage.worker is None]
+        if local:
+            # One private copy, shared read-only by every stage; the caller draws on its frame
+            copy = frame.copy()
+            with self._cond:
+                for stage in local:
+                    if stage.pending is not None:
+                        stage.dropped += 1  # Never started, the newer frame replaces it
+                    else:
+                        stage.waiting_since = now
+                    stage.pending = (frame_id, copy, input_size, now)
+                    stage.last_submit = now
+                    stage.submitted += 1
+                self._cond.notify_all()
+            taken = True
+        for stage in due:
+            if stage.worker is None:
+                continue
+            worker_id = stage.worker.submit(frame, input_size=input_size)
+            if worker_id is None:
+                stage.dropped += 1
+                continue
+            if len(stage._worker_ids) > 64:
+                stage._worker_ids.clear()  # Results that never came back
+            stage._worker_ids[worker_id] = frame_id
+            stage.last_submit = now
+            stage.submitted += 1
+            taken = True
+        return frame_id if taken else None
+
+    def poll(self):
+        """Return all results that have arrived, without blocking"""
+        finished = []
+        while True:
+            try:
+                finished.append(self._results.get_nowait())
+            except queue.Empty:
+                break
+        for stage in self.stages.values():
+            if stage.worker is None:
+                continue
+            for result in stage.worker.poll():
+                stage.completed += 1
+                stage.last_elapsed = result.elapsed
+                frame_id = stage._worker_ids.pop(result.frame_id, None)
+                finished.append(InferenceResult(stage.name, frame_id, result.payload,
+                                                result.elapsed))
+        return finished
+
+    def _next_stage(self):
+        """Take the most important queued frame that may start now, called under the lock"""
+        now = time.perf_counter()
+        for stage in sorted(self.stages.values(), key=lambda s: s.priority):
+            if stage.pending is None or stage.running:
+                continue
+            if not stage.enabled or now - stage.pending[3] > stage.max_wait:
+                stage.pending = None
+                stage.dropped += 1
+                continue
+            if now - stage.waiting_since < stage.max_wait / 2 and self._deferred(stage):
+                if not stage.deferring:
+                    stage.deferring = True
+                    stage.deferred += 1
+                continue
+            return stage
+        return None
+
+    def _deferred(self, stage):
+        """An overloaded higher-priority stage has work queued or running"""
+        return any(other.priority < stage.priority and other.overloaded
+                   and (other.running or other.pending is not None)
+                   for other in self.stages.values())
+
+    def _run(self):
+        while True:
+            with self._cond:
+                stage = self._next_stage()
+                while stage is None and not self._stopped:
+                    self._cond.wait(0.1)  # Also re-checks queued frames going stale
+                    stage = self._next_stage()
+                if self._stopped:
+                    break
+                frame_id, frame, input_size, _ = stage.pending
+                stage.pending = None
+                stage.deferring = False
+                stage.running = True
+
+            start = time.perf_counter()
+            try:
+                payload = stage.run(frame, input_size)
+            except Exception as e:
+                print(f"Error in {stage.name} stage: {e}")
+                payload = None
+            elapsed = time.perf_counter() - start
+
+            with self._cond:
+                stage.running = False
+                stage.completed += 1
+                stage.last_elapsed = elapsed
+                self._cond.notify_all()
+            self._results.put(InferenceResult(stage.name, frame_id, payload, elapsed))
+
+    def busy(self):
+        return any(stage.running or stage.pending is not None for stage in self.stages.values())
+
+    def close(self, timeout=2.0):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def stats(self):
+        return {name: stage.stats() for name, stage in self.stages.items()}
@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+# The modules live at the top of the repository, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rover_sim import RoverSimulator  # noqa: E402
+
+
+@pytest.fixture
+def rover():
+    """Simulated rover control endpoints on free ports"""
+    simulator = RoverSimulator(http_port=0, udp_port=0).start()
+    yield simulator
+    simulator.stop()
@@ -0,0 +1,86 @@
+import pytest
+
+from command_dispatcher import STOP_COMMAND, CommandDispatcher
+from rover_sim import RoverSimulator
+
+
+@pytest.fixture
+def dispatcher(rover):
+    # Not started: commands stay queued until the test starts the thread
+    dispatcher = CommandDispatcher(rover.control_url, udp_port=rover.udp_port)
+    yield dispatcher
+    dispatcher.close()
+
+
+def test_only_newest_movement_waits(dispatcher, rover):
+    assert dispatcher.send("1")
+    assert dispatcher.send("2")
+    assert dispatcher.send("4")
+    assert dispatcher.coalesced == 2
+
+    dispatcher.start()
+    dispatcher.close()
+    assert dispatcher.sent == 1
+    assert rover.direction == 4
+    assert rover.commands == 1
+
+
+def test_repeats_of_latest_command_are_dropped(dispatcher, rover):
+    assert dispatcher.send("1")
+    assert not dispatcher.send("1")
+    assert dispatcher.duplicates == 1
+
+    dispatcher.start()
+    dispatcher.close()
+    assert rover.direction == 1
+    assert not dispatcher.send("1")  # The rover is already going forward
+
+
+def test_stop_cancels_waiting_movement(dispatcher, rover):
+    dispatcher.send("1")
+    assert dispatcher.stop()
+    assert dispatcher.coalesced == 1
+    assert not dispatcher.send(STOP_COMMAND)
+
+    dispatcher.start()
+    dispatcher.close()
+    # Only the stop went out, forward never reached the rover
+    assert dispatcher.sent == 1
+    assert rover.commands == 1
+    assert rover.direction == 3
+
+
+def test_back_to_active_command_sends_nothing(dispatcher):
+    dispatcher._last_sent = "1"  # The rover acknowledged forward
+    assert dispatcher.send("2")
+    assert dispatcher.send("1")
+    assert dispatcher._pending is None
+    assert not dispatcher.send("1")
+
+
+def test_speed_resends_current_movement(dispatcher, rover):
+    dispatcher._last_sent = "1"
+    rover.direction = 1
+    assert dispatcher.set_speed(120)
+    assert not dispatcher.set_speed(120)
+
+    dispatcher.start()
+    dispatcher.close()
+    assert rover.speed == 120
+    assert rover.direction == 1
+    assert rover.commands == 1
+
+
+def test_failed_send_is_counted_and_forgotten():
+    simulator = RoverSimulator(http_port=0, udp_port=0).start()
+    control_url, udp_port = simulator.control_url, simulator.udp_port
+    simulator.stop()  # Nothing answers on either port any more
+
+    dispatcher = CommandDispatcher(control_url, timeout=0.2, udp_port=udp_port)
+    dispatcher.client.channel.timeout = 0.05
+    dispatcher.send("1")
+    dispatcher.start()
+    dispatcher.close()
+    assert dispatcher.sent == 0
+    assert dispatcher.failed == 1
+    assert dispatcher._last_sent is None
@@ -0,0 +1,101 @@
+import socket
+
+import pytest
+
+from control_channel import ACK_FLAG, FRAME, MSG_DRIVE, MSG_PING, STALE_FLAG, RoverClient, \
+    UdpControlChannel, pack_frame, unpack_frame
+
+
+@pytest.fixture
+def sock(rover):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.connect(("127.0.0.1", rover.udp_port))
+    sock.settimeout(1.0)
+    yield sock
+    sock.close()
+
+
+def exchange(sock, *fields):
+    sock.send(pack_frame(*fields))
+    return unpack_frame(sock.recv(64))
+
+
+def test_frame_round_trip():
+    data = pack_frame(MSG_DRIVE, 7, 123456, direction=4, speed=200, session=0xBEEF)
+    assert len(data) == FRAME.size == 16
+    assert data[:2] == b"RC"
+    frame = unpack_frame(data)
+    assert (frame.type, frame.seq, frame.timestamp) == (MSG_DRIVE, 7, 123456)
+    assert (frame.direction, frame.speed, frame.session) == (4, 200, 0xBEEF)
+
+
+def test_seq_and_timestamp_wrap():
+    frame = unpack_frame(pack_frame(MSG_PING, 2 ** 32 + 5, 2 ** 32 + 9))
+    assert (frame.seq, frame.timestamp) == (5, 9)
+
+
+@pytest.mark.parametrize("data", [
+    b"",
+    pack_frame(MSG_DRIVE, 1, 0)[:-1],
+    pack_frame(MSG_DRIVE, 1, 0) + b"\0",
+    b"XX" + pack_frame(MSG_DRIVE, 1, 0)[2:],
+    pack_frame(MSG_DRIVE, 1, 0)[:2] + b"\x02" + pack_frame(MSG_DRIVE, 1, 0)[3:],
+])
+def test_unpack_rejects_other_data(data):
+    assert unpack_frame(data) is None
+
+
+def test_rover_ignores_older_seq(rover, sock):
+    reply = exchange(sock, MSG_DRIVE, 5, 0, 1, 255, 42)
+    assert reply.type == MSG_DRIVE | ACK_FLAG
+    assert rover.direction == 1
+
+    # A late or resent frame must not undo the newer command
+    reply = exchange(sock, MSG_DRIVE, 3, 0, 5, 255, 42)
+    assert reply.type == MSG_DRIVE | ACK_FLAG | STALE_FLAG
+    assert reply.seq == 3
+    assert rover.direction == 1
+    reply = exchange(sock, MSG_DRIVE, 5, 0, 5, 255, 42)
+    assert reply.type & STALE_FLAG
+    assert rover.udp_stale == 2
+
+
+def test_new_session_resets_seq(rover, sock):
+    exchange(sock, MSG_DRIVE, 100, 0, 1, 255, 1)
+    reply = exchange(sock, MSG_DRIVE, 1, 0, 4, 180, 2)
+    assert not reply.type & STALE_FLAG
+    assert (rover.direction, rover.speed) == (4, 180)
+
+
+def test_ping_leaves_motors_alone(rover):
+    channel = UdpControlChannel("127.0.0.1", rover.udp_port)
+    reply = channel.ping()
+    channel.close()
+    assert reply.type == MSG_PING | ACK_FLAG
+    assert rover.commands == 0
+
+
+def test_channel_sends_increasing_seq(rover):
+    channel = UdpControlChannel("127.0.0.1", rover.udp_port)
+    first = channel.request(MSG_DRIVE, 1, 255)
+    second = channel.request(MSG_DRIVE, 2, 255)
+    channel.close()
+    assert second.seq == first.seq + 1
+    assert not (first.type | second.type) & STALE_FLAG
+    assert rover.direction == 2
+
+
+def test_client_falls_back_to_http(rover):
+    unused = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    unused.bind(("127.0.0.1", 0))
+    port = unused.getsockname()[1]
+    unused.close()  # Nothing listens there, the UDP channel never answers
+
+    client = RoverClient(rover.control_url, udp_port=port, udp_timeout=0.05)
+    assert client.transport == "udp"
+    assert client.send_command("4")
+    assert client.transport == "http"
+    assert client.udp_fallbacks == 1
+    client.close()
+    assert rover.direction == 4
+    assert rover.udp_frames == 0
@@ -0,0 +1,67 @@
+from governor import DetectionGovernor
+
+
+def feed(governor, seconds, count=None):
+    """Record inference times until a decision, returns True if settings changed"""
+    for _ in range(count or governor.min_samples):
+        if governor.record_inference(seconds):
+            return True
+    return False
+
+
+def make_governor(**kwargs):
+    kwargs.setdefault("target_latency", 0.1)
+    kwargs.setdefault("target_fps", 20.0)  # 50 ms frames, 25 ms inference load budget
+    return DetectionGovernor(**kwargs)
+
+
+def test_waits_for_min_samples():
+    governor = make_governor()
+    assert not feed(governor, 0.5, count=governor.min_samples - 1)
+    assert governor.decision == "warming up"
+
+
+def test_slow_inference_drops_size_first():
+    governor = make_governor(size=320, interval=2)
+    assert feed(governor, 0.2)
+    assert (governor.size, governor.interval) == (224, 2)
+    assert "latency" in governor.decision
+
+
+def test_load_raises_interval():
+    governor = make_governor(size=320, interval=1)
+    # 80 ms fits the latency target but not 25 ms per frame
+    assert feed(governor, 0.08)
+    assert (governor.size, governor.interval) == (320, 2)
+    assert feed(governor, 0.08)
+    assert governor.interval == 3
+    assert not feed(governor, 0.08)  # 27 ms per frame is within the margin
+
+
+def test_within_hysteresis_changes_nothing():
+    governor = make_governor(size=320, interval=4)
+    # 90 ms is under the latency target, but not by the 20% margin
+    assert not feed(governor, 0.09)
+    assert not feed(governor, 0.09)
+    assert (governor.size, governor.interval) == (320, 4)
+
+
+def test_fast_inference_steps_back_up():
+    governor = make_governor(size=224, interval=3)
+    assert feed(governor, 0.008)
+    assert governor.interval == 2
+    assert feed(governor, 0.008)
+    assert governor.interval == 1
+    # 320 would cost about 16 ms, under 80% of the 25 ms load budget
+    assert feed(governor, 0.008)
+    assert governor.size == 320
+    assert feed(governor, 0.008)
+    assert governor.size == 416
+    assert not feed(governor, 0.008)  # Already at the top
+
+
+def test_size_stays_when_predicted_cost_is_too_high():
+    governor = make_governor(size=224, interval=1)
+    # 320 would cost about 20 ms, not under 80% of the load budget
+    assert not feed(governor, 0.01)
+    assert governor.size == 224
@@ -0,0 +1,52 @@
+import time
+
+import pytest
+
+from device_settings import DeviceSettings
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            raise AssertionError("Timed out")
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def settings(rover):
+    applied = []
+    settings = DeviceSettings(rover.control_url, settle=0.05, local={"speed": applied.append})
+    settings.applied = applied
+    settings.start()
+    wait_for(lambda: settings.loaded)
+    yield settings
+    settings.close()
+
+
+def test_settled_changes_go_out_in_one_batch(settings, rover):
+    for quality in range(20, 31):
+        settings.set("quality", quality)
+    settings.set("framesize", 6)
+    wait_for(lambda: settings.batches == 1 and not settings.pending())
+    assert settings.changes == 12
+    assert rover.settings_requests == 1
+    assert (rover.camera["quality"], rover.camera["framesize"]) == (30, 6)
+
+
+def test_unchanged_remote_settings_are_not_sent(settings, rover):
+    settings.set("quality", rover.camera["quality"])
+    wait_for(lambda: settings.unchanged == 1)
+    assert settings.batches == 0
+
+
+def test_local_setting_applied_even_if_cache_matches(settings, rover):
+    # The follow controller changed the speed behind the settings' back,
+    # and a camera update brought the rover's speed into the cached state
+    rover.drive(None, 140)
+    settings.set("framesize", 6)
+    wait_for(lambda: settings.batches == 1)
+    assert settings.state["speed"] == 140
+
+    settings.set("speed", 140)
+    wait_for(lambda: settings.applied == [140])
@@ -0,0 +1,108 @@
+import threading
+import time
+
+from command_dispatcher import STOP_COMMAND
+from follow_controller import BACKWARD, FORWARD, LEFT, RIGHT, FollowController
+
+
+class Recorder:
+    def __init__(self):
+        self.commands = []
+
+    def __call__(self, command):
+        self.commands.append(command)
+
+
+def make_controller(**kwargs):
+    sent = Recorder()
+    kwargs.setdefault("compensate", False)
+    controller = FollowController(sent, **kwargs)
+    controller.engage()
+    return controller, sent
+
+
+def test_no_movement_after_disengage():
+    controller, sent = make_controller()
+    controller.update_target(0.9, timestamp=100.0)
+    assert controller.tick(now=100.05) == RIGHT
+
+    controller.disengage()
+    controller.update_target(-0.9, timestamp=100.1)
+    controller.tick(now=100.15)
+    assert sent.commands[-1] == STOP_COMMAND
+    assert controller.state == STOP_COMMAND
+
+
+def test_disengage_waits_for_running_tick():
+    sending = threading.Event()
+    sent = []
+
+    def send_command(command):
+        if command != STOP_COMMAND and not sending.is_set():
+            sending.set()
+            time.sleep(0.1)  # disengage() is called while this tick is sending
+        sent.append(command)
+
+    controller = FollowController(send_command, compensate=False)
+    controller.engage()
+    controller.update_target(0.9, timestamp=100.0)
+    ticking = threading.Thread(target=controller.tick, kwargs={"now": 100.05})
+    ticking.start()
+    sending.wait(1.0)
+    controller.disengage()
+    ticking.join()
+
+    assert sent == [RIGHT, STOP_COMMAND]
+    controller.tick(now=100.1)
+    assert sent == [RIGHT, STOP_COMMAND]
+
+
+def steer(controller, offsets, start=100.0, step=0.1):
+    """Report each offset and tick once, returns the commands chosen"""
+    states = []
+    for i, offset in enumerate(offsets):
+        now = start + i * step
+        controller.update_target(offset, timestamp=now)
+        states.append(controller.tick(now=now + 0.01))
+    return states
+
+
+def test_stays_stopped_without_target():
+    controller, sent = make_controller()
+    assert controller.tick(now=100.0) == STOP_COMMAND
+    assert sent.commands == [STOP_COMMAND]
+
+
+def test_deadman_stops_when_updates_stop():
+    controller, sent = make_controller(target_timeout=0.5)
+    controller.update_target(0.0, timestamp=100.0)
+    assert controller.tick(now=100.4) == FORWARD
+    assert controller.tick(now=100.6) == STOP_COMMAND
+    assert controller.deadman_stops == 1
+    # The stale target was cleared, later ticks stay stopped
+    assert controller.tick(now=100.7) == STOP_COMMAND
+    assert controller.deadman_stops == 1
+
+
+def test_turn_hysteresis():
+    # Turning starts above 0.41 and ends below 0.25
+    controller, _ = make_controller(kd=0.0, deadband=0.33, hysteresis=0.08)
+    states = steer(controller, [0.38, 0.45, 0.30, 0.26, 0.2, 0.38, -0.45, -0.3, -0.2])
+    assert states == [FORWARD, RIGHT, RIGHT, RIGHT, FORWARD, FORWARD, LEFT, LEFT, FORWARD]
+
+
+def test_turn_speed_grows_with_error():
+    speeds = []
+    controller = FollowController(lambda command: None, speeds.append, kd=0.0,
+                                  compensate=False, min_turn_speed=140, max_speed=255)
+    controller.engage()
+    steer(controller, [0.5])
+    small = speeds[-1]
+    steer(controller, [1.0], start=101.0)
+    assert 140 <= small < speeds[-1] == 255
+
+
+def test_backward_target():
+    controller, _ = make_controller()
+    controller.update_target(0.0, backward=True, timestamp=100.0)
+    assert controller.tick(now=100.05) == BACKWARD
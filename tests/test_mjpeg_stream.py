@@ -0,0 +1,106 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+import pytest
+
+from mjpeg_stream import MjpegStream, reduced_decode_flag
+
+BOUNDARY = "123456789000000000000987654321"
+
+
+def make_jpeg(value, size=(64, 48)):
+    frame = np.full((size[1], size[0], 3), value, dtype=np.uint8)
+    return cv2.imencode(".jpg", frame)[1].tobytes()
+
+
+def multipart(jpegs, content_length=True):
+    body = b""
+    for jpeg in jpegs:
+        body += f"\r\n--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n".encode()
+        if content_length:
+            body += f"Content-Length: {len(jpeg)}\r\n".encode()
+        body += b"\r\n" + jpeg
+    return body + f"\r\n--{BOUNDARY}\r\n".encode()
+
+
+def parse(body, chunk_size):
+    """Feed body to the parser chunk_size bytes at a time, returns every part found"""
+    stream = MjpegStream("http://127.0.0.1/stream")
+    stream._boundary = b"--" + BOUNDARY.encode()
+    parts = []
+    stream._publish = lambda view: parts.append(bytes(view))
+    for i in range(0, len(body), chunk_size):
+        stream._receive += body[i:i + chunk_size]
+        stream._extract_parts()
+    return parts
+
+
+@pytest.mark.parametrize("content_length", [True, False])
+@pytest.mark.parametrize("chunk_size", [1, 7, 100, 1 << 20])
+def test_parts_split_across_reads(content_length, chunk_size):
+    jpegs = [make_jpeg(value) for value in (0, 120, 250)]
+    parts = parse(multipart(jpegs, content_length), chunk_size)
+    assert parts == jpegs
+
+
+def test_boundary_bytes_inside_a_part_with_content_length():
+    jpeg = make_jpeg(60)
+    # Content-Length lets the body contain the boundary itself
+    body = jpeg + f"--{BOUNDARY}".encode()
+    assert parse(multipart([body, jpeg]), 13) == [body, jpeg]
+
+
+def test_reduced_decode_flag():
+    assert reduced_decode_flag((1600, 1200), (320, 240)) == (4, cv2.IMREAD_REDUCED_COLOR_4)
+    assert reduced_decode_flag((1600, 1200), (200, 150)) == (8, cv2.IMREAD_REDUCED_COLOR_8)
+    assert reduced_decode_flag((640, 480), (640, 480)) == (1, cv2.IMREAD_COLOR)
+    assert reduced_decode_flag(None, (640, 480)) == (1, cv2.IMREAD_COLOR)
+
+
+@pytest.fixture
+def server():
+    jpegs = [make_jpeg(value, (320, 240)) for value in (40, 200)]
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", f"multipart/x-mixed-replace;boundary={BOUNDARY}")
+            self.end_headers()
+            body = multipart(jpegs)
+            # Small writes so parts and headers straddle reads
+            for i in range(0, len(body), 500):
+                self.wfile.write(body[i:i + 500])
+                self.wfile.flush()
+            time.sleep(1.0)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_port}/stream"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_only_newest_part_is_decoded(server):
+    stream = MjpegStream(server, target_size=(160, 120), max_reconnects=0)
+    assert stream.open()
+    stream.start()
+    try:
+        deadline = time.time() + 5.0
+        while stream.frames_received < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        frame = stream.read()
+        assert frame is not None and abs(int(frame.mean()) - 200) < 5
+        assert stream.read() is None  # Nothing newer yet
+        assert stream.frames_received == 2
+        assert stream.frames_dropped == 1
+        assert stream.frame_size == (320, 240)
+        assert stream.last_jpeg() is not None
+    finally:
+        stream.release()
@@ -0,0 +1,53 @@
+import numpy as np
+
+from motion_gate import MotionGate
+
+
+def scene(noise=0, square=None):
+    """640x480 gray frame, optionally with slight noise and a bright square at (x, y)"""
+    frame = np.full((480, 640, 3), 100, dtype=np.uint8)
+    if noise:
+        rng = np.random.default_rng(noise)
+        frame = np.clip(frame + rng.integers(-5, 6, frame.shape), 0, 255).astype(np.uint8)
+    if square is not None:
+        x, y = square
+        frame[y:y + 80, x:x + 80] = 250
+    return frame
+
+
+def test_first_frame_runs():
+    gate = MotionGate()
+    assert gate.should_infer(scene(), timestamp=0.0)
+    assert gate.decision == "first frame"
+
+
+def test_static_scene_is_skipped_despite_noise():
+    gate = MotionGate()
+    gate.should_infer(scene(), timestamp=0.0)
+    for i in range(1, 10):
+        assert not gate.should_infer(scene(noise=i), timestamp=i * 0.1)
+    assert gate.stats()["skips"] == 9
+
+
+def test_motion_runs_and_becomes_reference():
+    gate = MotionGate()
+    gate.should_infer(scene(square=(100, 100)), timestamp=0.0)
+    assert gate.should_infer(scene(square=(300, 200)), timestamp=0.1)
+    assert gate.decision.startswith("motion")
+    # The moved frame is the new reference, the same scene is static again
+    assert not gate.should_infer(scene(square=(300, 200)), timestamp=0.2)
+
+
+def test_stale_result_forces_a_pass():
+    gate = MotionGate(max_staleness=2.0)
+    gate.should_infer(scene(), timestamp=0.0)
+    assert not gate.should_infer(scene(), timestamp=1.9)
+    assert gate.should_infer(scene(), timestamp=2.0)
+    assert gate.decision == "stale"
+
+
+def test_reset_forces_a_pass():
+    gate = MotionGate()
+    gate.should_infer(scene(), timestamp=0.0)
+    gate.reset()
+    assert gate.should_infer(scene(), timestamp=0.1)
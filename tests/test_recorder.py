@@ -0,0 +1,120 @@
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from detection import Detections
+from recorder import SessionReader, SessionRecorder
+
+
+def make_jpeg(value):
+    frame = np.full((48, 64, 3), value, dtype=np.uint8)
+    return cv2.imencode(".jpg", frame)[1].tobytes()
+
+
+@pytest.fixture
+def session(tmp_path):
+    directory = str(tmp_path / "session")
+    jpegs = [make_jpeg(i * 20) for i in range(10)]
+    # Small segments so the frames are spread over several files
+    recorder = SessionRecorder(directory, segment_bytes=3 * len(jpegs[0]))
+    recorder.start()
+    for i, jpeg in enumerate(jpegs):
+        assert recorder.record_frame(jpeg, 100.0 + i * 0.1) == i
+        if i == 4:
+            recorder.record_event("command", command="1")
+            recorder.record_detections(Detections(np.array([[1, 2, 3, 4]]), np.array([0.87654]),
+                                                  np.array([0])))
+    recorder.close()
+    return directory, jpegs, recorder
+
+
+def test_round_trip(session):
+    directory, jpegs, recorder = session
+    assert recorder.stats()["frames"] == len(jpegs)
+    assert recorder.stats()["dropped"] == 0
+
+    reader = SessionReader(directory)
+    try:
+        assert len(reader) == len(jpegs)
+        assert len(set(reader.segments.tolist())) > 1
+        for i, jpeg in enumerate(jpegs):
+            assert bytes(reader.jpeg(i)) == jpeg
+            assert reader.timestamp(i) == pytest.approx(100.0 + i * 0.1)
+        assert reader.frame(3).shape == (48, 64, 3)
+        assert reader.duration == pytest.approx(0.9)
+        assert reader.seek(100.25) == 3
+    finally:
+        reader.close()
+
+
+def test_events_are_tagged_with_frame_ids(session):
+    directory, _, _ = session
+    reader = SessionReader(directory)
+    try:
+        events = reader.events()
+        assert list(events) == [4]
+        command, detections = events[4]
+        assert command["type"] == "command" and command["command"] == "1"
+        assert detections["boxes"] == [[1, 2, 3, 4]]
+        assert detections["confidences"] == [0.877]
+
+        replayed = [(i, len(frame_events)) for i, _, frame_events in reader.replay(realtime=False)]
+        assert replayed == [(i, 2 if i == 4 else 0) for i in range(10)]
+    finally:
+        reader.close()
+
+
+def test_appending_keeps_earlier_segments(session):
+    directory, jpegs, _ = session
+    recorder = SessionRecorder(directory)
+    recorder.start()
+    assert recorder.record_frame(make_jpeg(255), 200.0) == len(jpegs)
+    recorder.record_event("command", command="4")
+    recorder.close()
+
+    reader = SessionReader(directory)
+    try:
+        assert len(reader) == len(jpegs) + 1
+        assert bytes(reader.jpeg(0)) == jpegs[0]
+        assert reader.timestamp(len(jpegs)) == 200.0
+        assert int(reader.index["frame_id"][-1]) == len(jpegs)
+        events = reader.events()
+        assert 0 not in events
+        assert [event["command"] for event in events[len(jpegs)]] == ["4"]
+    finally:
+        reader.close()
+
+
+def test_events_of_dropped_frames_are_not_put_on_earlier_frames(tmp_path):
+    directory = str(tmp_path / "session")
+    recorder = SessionRecorder(directory, queue_size=2)
+    assert recorder.record_frame(make_jpeg(0), 1.0) == 0
+    assert recorder.record_frame(make_jpeg(50), 2.0) == 1
+    assert recorder.record_frame(make_jpeg(100), 3.0) is None  # Queue full
+
+    recorder.start()
+    deadline = time.time() + 5.0
+    while not recorder._queue.empty() and time.time() < deadline:
+        time.sleep(0.01)
+    recorder.record_event("command", command="2")  # Made for the dropped frame
+    assert recorder.record_frame(make_jpeg(150), 4.0) == 2
+    while not recorder._queue.empty() and time.time() < deadline:
+        time.sleep(0.01)
+    recorder.record_event("command", command="4")
+    recorder.close()
+
+    reader = SessionReader(directory)
+    try:
+        events = reader.events()
+        assert 1 not in events
+        assert [event["command"] for event in events[None]] == ["2"]
+        assert [event["command"] for event in events[2]] == ["4"]
+    finally:
+        reader.close()
+
+
+def test_empty_session_is_an_error(tmp_path):
+    with pytest.raises(IOError):
+        SessionReader(str(tmp_path))
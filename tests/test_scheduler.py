@@ -0,0 +1,118 @@
+import time
+
+import numpy as np
+
+from scheduler import StageScheduler
+
+FRAME = np.zeros((48, 64, 3), dtype=np.uint8)
+
+
+def recording_scheduler(order, **stages):
+    """One-thread scheduler whose stages append their name to order when they run"""
+    scheduler = StageScheduler(workers=1)
+    for name, options in stages.items():
+        scheduler.add_stage(name, lambda frame, size, name=name: order.append(name), **options)
+    return scheduler
+
+
+def collect(scheduler, count, timeout=2.0):
+    results = []
+    deadline = time.monotonic() + timeout
+    while len(results) < count and time.monotonic() < deadline:
+        results.extend(scheduler.poll())
+        time.sleep(0.005)
+    return results
+
+
+def test_higher_priority_runs_first():
+    order = []
+    scheduler = recording_scheduler(order, objects={"priority": 1}, hands={"priority": 0})
+    frame_id = scheduler.submit(FRAME, ["objects", "hands"])
+    assert frame_id == 0
+
+    scheduler.start()
+    results = collect(scheduler, 2)
+    scheduler.close()
+    assert order == ["hands", "objects"]
+    assert {result.frame_id for result in results} == {frame_id}
+
+
+def test_newer_frame_replaces_queued_one():
+    scheduler = recording_scheduler([], hands={})
+    scheduler.submit(FRAME, ["hands"])
+    newer = scheduler.submit(FRAME, ["hands"])
+    stage = scheduler.stages["hands"]
+    assert stage.pending[0] == newer
+    assert stage.dropped == 1
+    assert stage.submitted == 2
+
+
+def test_interval_and_disabled_stages_skip_frames():
+    scheduler = recording_scheduler([], hands={"interval": 10.0}, objects={})
+    assert scheduler.submit(FRAME, ["hands"]) is not None
+    assert scheduler.submit(FRAME, ["hands"]) is None
+    scheduler.stages["objects"].enabled = False
+    assert scheduler.submit(FRAME, ["objects", "unknown"]) is None
+    assert scheduler.stages["hands"].submitted == 1
+
+
+def test_stale_frame_is_dropped():
+    scheduler = recording_scheduler([], hands={"max_wait": 0.01})
+    scheduler.submit(FRAME, ["hands"])
+    time.sleep(0.03)
+    with scheduler._cond:
+        assert scheduler._next_stage() is None
+    stage = scheduler.stages["hands"]
+    assert stage.pending is None
+    assert stage.dropped == 1
+
+
+def test_over_budget_stage_defers_lower_priorities():
+    scheduler = recording_scheduler([], hands={"priority": 0, "budget": 0.02},
+                                    objects={"priority": 1, "max_wait": 0.5})
+    hands, objects = scheduler.stages["hands"], scheduler.stages["objects"]
+    hands.last_elapsed = 0.05
+    hands.running = True
+    scheduler.submit(FRAME, ["objects"])
+    with scheduler._cond:
+        assert scheduler._next_stage() is None
+        assert scheduler._next_stage() is None
+    assert objects.deferred == 1  # Counted once per queued frame, not per check
+
+    # Within budget again: the gap is no longer needed
+    hands.last_elapsed = 0.01
+    with scheduler._cond:
+        assert scheduler._next_stage() is objects
+
+
+def test_deferred_stage_runs_after_half_its_max_wait():
+    scheduler = recording_scheduler([], hands={"priority": 0, "budget": 0.02},
+                                    objects={"priority": 1, "max_wait": 0.5})
+    hands, objects = scheduler.stages["hands"], scheduler.stages["objects"]
+    hands.last_elapsed = 0.05
+    hands.running = True
+    scheduler.submit(FRAME, ["objects"])
+    with scheduler._cond:
+        assert scheduler._next_stage() is None
+        objects.waiting_since -= 0.3  # Kept waiting past max_wait / 2
+        assert scheduler._next_stage() is objects
+
+
+def test_overloaded_stage_idle_does_not_defer():
+    scheduler = recording_scheduler([], hands={"priority": 0, "budget": 0.02},
+                                    objects={"priority": 1})
+    scheduler.stages["hands"].last_elapsed = 0.05
+    scheduler.submit(FRAME, ["objects"])
+    with scheduler._cond:
+        assert scheduler._next_stage() is scheduler.stages["objects"]
+
+
+def test_failing_stage_still_reports_result():
+    scheduler = StageScheduler(workers=1)
+    scheduler.add_stage("broken", lambda frame, size: 1 / 0)
+    frame_id = scheduler.submit(FRAME, ["broken"])
+    scheduler.start()
+    results = collect(scheduler, 1)
+    scheduler.close()
+    assert [(r.kind, r.frame_id, r.payload) for r in results] == [("broken", frame_id, None)]
+    assert not scheduler.busy()
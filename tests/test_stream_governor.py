@@ -0,0 +1,96 @@
+from governor import StreamGovernor
+
+
+def frame_bytes_at(level):
+    return 40000 // (1 + level)  # Lower rungs, smaller frames
+
+
+def run_windows(governor, fps_at_level, windows, start=1000.0, decode=0.002):
+    """Feed steady arrivals at fps_at_level(level) for a number of windows"""
+    now = start
+    governor.update(now)
+    for _ in range(windows):
+        fps = fps_at_level(governor.level)
+        end = now + governor.window
+        while now < end:
+            now += 1.0 / fps
+            governor.record_arrival(now, frame_bytes_at(governor.level))
+            governor.record_decode(decode)
+        governor.update(now)
+    return now
+
+
+def make_governor(**kwargs):
+    governor = StreamGovernor(framesizes=range(5, 11), qualities=(10, 40), **kwargs)
+    governor.seed(10, 10)  # Top rung
+    return governor
+
+
+def test_camera_limited_rate_does_not_walk_down():
+    governor = make_governor()
+    run_windows(governor, lambda level: 10.0, 20)  # Never reaches target_fps=15
+    assert governor.level == 0
+    assert 9.5 < governor.source_fps < 10.5
+
+
+def test_link_limited_rate_steps_down():
+    governor = make_governor()
+    # The link carries 320 KB/s, smaller frames arrive faster
+    run_windows(governor, lambda level: min(30.0, 320000 / frame_bytes_at(level)), 20)
+    assert governor.level == 1
+    assert governor.source_fps is None
+
+
+def steady(level):
+    return 30.0  # The link keeps up on every rung
+
+
+def test_far_over_budget_drops_two_rungs():
+    governor = make_governor()
+    run_windows(governor, steady, 1, decode=0.08)  # 2.4x the decode budget
+    assert governor.level == 2
+    assert governor.decision.endswith("down (decode)")
+
+
+def test_one_rung_down_and_hysteresis_band_holds():
+    governor = make_governor()
+    now = run_windows(governor, steady, 1, decode=0.05)  # 1.5x
+    assert governor.level == 1
+    # Just over the limit but within the margin: stay put and don't count it as clean
+    run_windows(governor, steady, 5, start=now, decode=0.036)
+    assert governor.level == 1
+    assert governor.clean_windows == 0
+
+
+def test_steps_up_after_up_windows_clean_windows():
+    governor = make_governor()
+    governor.seed(10, 40)  # Top frame size, worst quality
+    assert governor.level == 2
+    now = run_windows(governor, steady, 2)
+    assert governor.level == 2
+    run_windows(governor, steady, 1, start=now)
+    assert governor.level == 1
+    assert governor.decision.endswith("up")
+
+
+def test_failing_probed_level_is_held_off_longer_each_time():
+    governor = make_governor()
+    governor.seed(10, 25)
+    assert governor.level == 1
+    now = run_windows(governor, steady, 3)
+    assert governor.level == 0
+
+    # The rung it moved up to fails straight away
+    now = run_windows(governor, steady, 1, start=now, decode=0.05)
+    assert governor.level == 1
+    until, seconds = governor.held[0]
+    assert seconds == governor.hold_off
+    now = run_windows(governor, steady, 3, start=now)
+    assert governor.level == 1  # Clean, but still held off
+    while now < until:
+        now = run_windows(governor, steady, 1, start=now)
+    assert governor.level == 0
+
+    now = run_windows(governor, steady, 1, start=now, decode=0.05)
+    assert governor.level == 1
+    assert governor.held[0][1] == 2 * governor.hold_off
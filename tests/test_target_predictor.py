@@ -0,0 +1,59 @@
+import pytest
+
+from follow_controller import FORWARD, RIGHT, FollowController, TargetPredictor
+
+
+def test_no_motion_estimate_without_history():
+    predictor = TargetPredictor(min_samples=3)
+    assert predictor.predict(1.0) is None
+    predictor.add(0.0, 0.2)
+    predictor.add(0.1, 0.3)
+    assert predictor.velocity() is None
+    assert predictor.predict(1.0) == 0.3  # Last known offset
+
+
+def test_extrapolates_linear_motion():
+    predictor = TargetPredictor(max_lead=0.5)
+    for i in range(5):
+        predictor.add(i * 0.1, -0.2 + 0.1 * i)  # 1.0 per second
+    assert predictor.velocity() == pytest.approx(1.0)
+    assert predictor.predict(0.6) == pytest.approx(0.4)
+
+
+def test_lead_and_offset_are_capped():
+    predictor = TargetPredictor(max_lead=0.5)
+    for i in range(5):
+        predictor.add(i * 0.1, 0.1 * i)
+    assert predictor.predict(10.0) == pytest.approx(0.9)  # Only 0.5 s ahead
+    for i in range(5, 9):
+        predictor.add(i * 0.1, 0.1 * i)
+    assert predictor.predict(1.2) == 1.0
+
+
+def test_old_samples_and_repeats_are_dropped():
+    predictor = TargetPredictor(history=0.6)
+    for i in range(10):
+        predictor.add(i * 0.1, 0.0)
+    predictor.add(0.9, 0.5)  # Same frame reported again
+    assert len(predictor.samples) == 7
+    assert predictor.samples[-1] == (0.9, 0.0)
+
+
+def test_controller_turns_early_on_moving_target():
+    # The target is still inside the deadband, but drifting right quickly
+    sent = []
+    controller = FollowController(sent.append, kd=0.0, compensate=True)
+    controller.command_delay = 0.3
+    controller.engage()
+    states = []
+    for i in range(4):
+        now = 100.0 + i * 0.1
+        controller.update_target(0.05 + 0.08 * i, timestamp=now)
+        states.append(controller.tick(now=now))
+    assert states[-1] == RIGHT
+    assert controller.predicted_offset > 0.41
+
+    controller = FollowController(sent.append, kd=0.0, compensate=False)
+    controller.engage()
+    controller.update_target(0.29, timestamp=100.0)
+    assert controller.tick(now=100.0) == FORWARD
@@ -0,0 +1,67 @@
+import numpy as np
+
+from detection import Detections
+from tracker import MultiObjectTracker, iou_matrix
+
+
+def detections(*objects):
+    """Detections from (x, y, w, h, class_id) tuples"""
+    if not objects:
+        return Detections(np.empty((0, 4), dtype=np.int32), np.empty((0,), dtype=np.float32),
+                          np.empty((0,), dtype=np.int32))
+    return Detections(np.array([o[:4] for o in objects], dtype=np.int32),
+                      np.full(len(objects), 0.9, dtype=np.float32),
+                      np.array([o[4] for o in objects], dtype=np.int32))
+
+
+def test_iou_matrix():
+    ious = iou_matrix([[0, 0, 10, 10]], [[0, 0, 10, 10], [5, 0, 10, 10], [20, 20, 5, 5]])
+    np.testing.assert_allclose(ious, [[1.0, 50 / 150, 0.0]], atol=1e-6)
+
+
+def test_ids_persist_while_objects_move():
+    tracker = MultiObjectTracker()
+    first = tracker.update(detections((100, 100, 50, 80, 0), (300, 100, 40, 40, 2)), 0.0)
+    ids = dict(zip(first.class_ids.tolist(), first.track_ids.tolist()))
+    for step in range(1, 6):
+        tracks = tracker.update(detections((100 + 5 * step, 100, 50, 80, 0),
+                                           (300 - 5 * step, 100, 40, 40, 2)), step * 0.1)
+        assert dict(zip(tracks.class_ids.tolist(), tracks.track_ids.tolist())) == ids
+
+
+def test_prediction_follows_velocity_between_passes():
+    tracker = MultiObjectTracker()
+    for step in range(6):
+        tracker.update(detections((100 + 10 * step, 100, 50, 50, 0)), step * 0.1)
+    # 100 px/s to the right, predicted 0.2 s past the last pass at x=150
+    box = tracker.predict(0.7).boxes[0]
+    assert 160 <= box[0] <= 180
+
+
+def test_classes_are_not_matched_across():
+    tracker = MultiObjectTracker()
+    person = tracker.update(detections((100, 100, 50, 80, 0)), 0.0).track_ids[0]
+    tracks = tracker.update(detections((100, 100, 50, 80, 2)), 0.1)
+    assert person not in tracks.track_ids[tracks.class_ids == 2]
+
+
+def test_tracks_expire_after_misses():
+    tracker = MultiObjectTracker(max_misses=2, max_age=10.0)
+    tracker.update(detections((100, 100, 50, 80, 0)), 0.0)
+    for step in range(1, 3):
+        assert len(tracker.update(detections(), step * 0.1).track_ids) == 1
+    assert len(tracker.update(detections(), 0.3).track_ids) == 0
+
+
+def test_tracks_expire_after_max_age():
+    tracker = MultiObjectTracker(max_age=1.0)
+    tracker.update(detections((100, 100, 50, 80, 0)), 0.0)
+    assert len(tracker.predict(0.9).track_ids) == 1
+    assert len(tracker.predict(1.1).track_ids) == 0
+
+
+def test_new_object_gets_new_id():
+    tracker = MultiObjectTracker()
+    first = tracker.update(detections((100, 100, 50, 80, 0)), 0.0).track_ids[0]
+    tracks = tracker.update(detections((100, 100, 50, 80, 0), (400, 300, 50, 80, 0)), 0.1)
+    assert sorted(tracks.track_ids.tolist()) == [first, first + 1]
@@ -0,0 +1,169 @@
+import time
+from collections import namedtuple
+
+import numpy as np
+
+# Tracked objects, same layout as Detections plus a stable id per object
+Tracks = namedtuple("Tracks", ["boxes", "confidences", "class_ids", "track_ids"])
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """Pairwise IoU between two (N, 4) and (M, 4) arrays of x, y, w, h boxes"""
+    a = np.asarray(boxes_a, dtype=np.float32)[:, None, :]
+    b = np.asarray(boxes_b, dtype=np.float32)[None, :, :]
+    x1 = np.maximum(a[..., 0], b[..., 0])
+    y1 = np.maximum(a[..., 1], b[..., 1])
+    x2 = np.minimum(a[..., 0] + a[..., 2], b[..., 0] + b[..., 2])
+    y2 = np.minimum(a[..., 1] + a[..., 3], b[..., 1] + b[..., 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    union = a[..., 2] * a[..., 3] + b[..., 2] * b[..., 3] - intersection
+    return intersection / np.maximum(union, 1e-6)
+
+
+class KalmanBoxTrack:
+    """Constant-velocity Kalman filter over box center and size.
+
+    State is (cx, cy, w, h, vcx, vcy, vw, vh) with velocities in pixels per
+    second, so prediction works with uneven frame timing.
+    """
+
+    H = np.hstack([np.eye(4), np.zeros((4, 4))])
+
+    def __init__(self, box, confidence, class_id, track_id, timestamp,
+                 position_noise=50.0, velocity_noise=200.0, measurement_noise=4.0):
+        x, y, w, h = [float(v) for v in box]
+        self.state = np.array([x + w / 2, y + h / 2, w, h, 0, 0, 0, 0], dtype=np.float64)
+        self.covariance = np.diag([10.0, 10.0, 10.0, 10.0, 1e4, 1e4, 1e3, 1e3])
+        self.process_noise = np.diag([position_noise] * 4 + [velocity_noise] * 4)
+        self.measurement_noise = np.eye(4) * measurement_noise ** 2
+
+        self.track_id = track_id
+        self.class_id = int(class_id)
+        self.confidence = float(confidence)
+        self.timestamp = timestamp
+        self.last_update = timestamp
+        self.hits = 1
+        self.misses = 0  # Detection passes in a row without a match
+
+    def predict(self, timestamp):
+        dt = timestamp - self.timestamp
+        if dt <= 0:
+            return
+        F = np.eye(8)
+        F[:4, 4:] = np.eye(4) * dt
+        self.state = F @ self.state
+        self.covariance = F @ self.covariance @ F.T + self.process_noise * dt
+        self.state[2:4] = np.maximum(self.state[2:4], 1.0)
+        self.timestamp = timestamp
+
+    def update(self, box, confidence):
+        x, y, w, h = [float(v) for v in box]
+        measurement = np.array([x + w / 2, y + h / 2, w, h])
+        innovation = measurement - self.H @ self.state
+        S = self.H @ self.covariance @ self.H.T + self.measurement_noise
+        K = self.covariance @ self.H.T @ np.linalg.inv(S)
+        self.state = self.state + K @ innovation
+        self.covariance = (np.eye(8) - K @ self.H) @ self.covariance
+
+        self.confidence = float(confidence)
+        self.last_update = self.timestamp
+        self.hits += 1
+        self.misses = 0
+
+    @property
+    def box(self):
+        cx, cy, w, h = self.state[:4]
+        return np.array([cx - w / 2, cy - h / 2, w, h])
+
+    @property
+    def velocity(self):
+        """Center velocity (vx, vy) in pixels per second"""
+        return self.state[4:6].copy()
+
+
+class MultiObjectTracker:
+    """Keeps ids on YOLO detections and predicts their boxes between detection passes.
+
+    Call predict() on every frame and update() whenever a new detection result
+    is available. Detections are matched to tracks of the same class by IoU.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_misses=3, max_age=2.0, min_hits=1):
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses  # Unmatched detection passes before a track is dropped
+        self.max_age = max_age  # Seconds without a match before a track is dropped
+        self.min_hits = min_hits  # Matches needed before a track is reported
+        self.tracks = []
+        self._next_id = 1
+
+    def reset(self):
+        self.tracks = []
+
+    def predict(self, timestamp=None):
+        """Advance every track to timestamp and return the current Tracks"""
+        timestamp = time.time() if timestamp is None else timestamp
+        for track in self.tracks:
+            track.predict(timestamp)
+        self.tracks = [t for t in self.tracks if timestamp - t.last_update <= self.max_age]
+        return self.current()
+
+    def update(self, detections, timestamp=None):
+        """Match a fresh Detections result against the tracks and return the current Tracks"""
+        timestamp = time.time() if timestamp is None else timestamp
+        for track in self.tracks:
+            track.predict(timestamp)
+
+        unmatched = set(range(len(detections.boxes)))
+        if self.tracks and len(detections.boxes):
+            track_boxes = np.array([t.box for t in self.tracks])
+            track_classes = np.array([t.class_id for t in self.tracks])
+            ious = iou_matrix(track_boxes, detections.boxes)
+            ious[track_classes[:, None] != detections.class_ids[None, :]] = 0
+
+            # Greedy assignment, best overlap first
+            while True:
+                t, d = np.unravel_index(np.argmax(ious), ious.shape)
+                if ious[t, d] < self.iou_threshold:
+                    break
+                self.tracks[t].update(detections.boxes[d], detections.confidences[d])
+                unmatched.discard(d)
+                ious[t, :] = 0
+                ious[:, d] = 0
+
+        for track in self.tracks:
+            if track.last_update != timestamp:
+                track.misses += 1
+        self.tracks = [t for t in self.tracks if t.misses <= self.max_misses]
+
+        for d in sorted(unmatched):
+            self.tracks.append(KalmanBoxTrack(
+                detections.boxes[d], detections.confidences[d], detections.class_ids[d],
+                self._next_id, timestamp
+            ))
+            self._next_id += 1
+
+        return self.current()
+
+    def get_track(self, track_id):
+        for track in self.tracks:
+            if track.track_id == track_id:
+                return track
+        return None
+
+    def current(self):
+        """Return the confirmed tracks, most confident first"""
+        tracks = [t for t in self.tracks if t.hits >= self.min_hits]
+        tracks.sort(key=lambda t: t.confidence, reverse=True)
+        if not tracks:
+            return Tracks(
+                np.empty((0, 4), dtype=np.int32),
+                np.empty((0,), dtype=np.float32),
+                np.empty((0,), dtype=np.int32),
+                np.empty((0,), dtype=np.int32)
+            )
+        return Tracks(
+            np.array([t.box for t in tracks]).astype(np.int32),
+            np.array([t.confidence for t in tracks], dtype=np.float32),
+            np.array([t.class_id for t in tracks], dtype=np.int32),
+            np.array([t.track_id for t in tracks], dtype=np.int32)
+        )